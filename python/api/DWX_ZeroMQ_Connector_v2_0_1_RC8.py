@@ -15,14 +15,438 @@
     https://opensource.org/licenses/BSD-3-Clause
 """
 
+import os
+import sys
 import zmq
-from time import sleep
-from pandas import DataFrame, Timestamp
-from threading import Thread
+from itertools import count
+from array import array
+from bisect import bisect_left
+from operator import attrgetter
+from time import sleep, monotonic, monotonic_ns, time_ns
+from datetime import datetime, timedelta
+from threading import Thread, Lock, RLock, Condition, get_native_id
 
 # 30-07-2019 10:58 CEST
 from zmq.utils.monitor import recv_monitor_message
 
+# No quote yet: BID, ASK, TIMESTAMP, SEQUENCE
+_NO_QUOTE = (0.0, 0.0, 0, 0)
+
+# DWX_ZMQ_Tick_Series timestamps (UTC)
+_EPOCH = datetime(1970, 1, 1)
+
+# Poll loop blind time histogram: 4 buckets per power of two (ns)
+_JITTER_BUCKETS = 260
+
+class DWX_ZMQ_Quote_Board():
+
+    """
+    Latest quote per symbol, versioned, readable without locks.
+
+    Each symbol maps to an immutable (BID, ASK, TIMESTAMP, SEQUENCE) tuple
+    (TIMESTAMP from time.monotonic_ns(), SEQUENCE counting the quotes
+    published so far). The writer swaps in a new tuple per quote, so a
+    reader always sees a consistent quote and neither side ever blocks the
+    other. Only one thread writes a given symbol: the poll thread, or the
+    DWX_ZMQ_Sharded_Ingest shard owning it.
+
+        _board._read_('EURUSD')             # (1.10001, 1.10003, TS, 42)
+        _board._wait_('EURUSD', 42)         # blocks until quote 43 (or timeout)
+
+    It also reads as {SYMBOL: (BID, ASK)}, the connector's _Curr_Bid_Ask.
+    Same interface as DWX_ZMQ_Shared_Quote_Board, for quotes shared
+    between processes.
+    """
+    def __init__(self):
+
+        self._quotes = {}           # {SYMBOL: (BID, ASK, TIMESTAMP, SEQUENCE)}
+        self._conds = {}            # {SYMBOL: Condition}, waiters only
+        self._waiting = {}          # {SYMBOL: NUMBER OF WAITERS}
+
+    ##########################################################################
+
+    def _write_(self, _symbol, _bid, _ask, _ts=None):
+
+        _seq = self._quotes.get(_symbol, _NO_QUOTE)[3] + 1
+        self._quotes[_symbol] = (_bid, _ask, monotonic_ns() if _ts is None else _ts, _seq)
+
+        # Waiters register before checking the sequence: none is missed
+        if self._waiting.get(_symbol):
+            _cond = self._conds[_symbol]
+            with _cond:
+                _cond.notify_all()
+
+    def _read_(self, _symbol):
+        return self._quotes.get(_symbol, _NO_QUOTE)
+
+    """
+    Block until a quote newer than _seq arrives and return it, or None
+    after _timeout seconds
+    """
+    def _wait_(self, _symbol, _seq, _timeout=1.0):
+
+        _quote = self._quotes.get(_symbol, _NO_QUOTE)
+
+        if _quote[3] > _seq:
+            return _quote
+
+        _cond = self._conds.get(_symbol) or self._conds.setdefault(_symbol, Condition())
+        _deadline = monotonic() + _timeout
+
+        with _cond:
+
+            self._waiting[_symbol] = self._waiting.get(_symbol, 0) + 1
+
+            try:
+                while True:
+
+                    _quote = self._quotes.get(_symbol, _NO_QUOTE)
+
+                    if _quote[3] > _seq:
+                        return _quote
+
+                    _left = _deadline - monotonic()
+
+                    if _left <= 0:
+                        return None
+
+                    _cond.wait(_left)
+
+            finally:
+                self._waiting[_symbol] -= 1
+
+    ##########################################################################
+
+    # {SYMBOL: (BID, ASK)} access
+
+    def __getitem__(self, _symbol):
+        _quote = self._quotes[_symbol]
+        return (_quote[0], _quote[1])
+
+    def __setitem__(self, _symbol, _bid_ask):
+        self._write_(_symbol, _bid_ask[0], _bid_ask[1])
+
+    def get(self, _symbol, _default=None):
+        _quote = self._quotes.get(_symbol)
+        return _default if _quote is None else (_quote[0], _quote[1])
+
+    def __contains__(self, _symbol):
+        return _symbol in self._quotes
+
+    def __iter__(self):
+        return iter(list(self._quotes))
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def keys(self):
+        return list(self._quotes)
+
+    def items(self):
+        return [(_s, (_q[0], _q[1])) for _s, _q in list(self._quotes.items())]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+##############################################################################
+
+class _DWX_ZMQ_Record():
+
+    """
+    Base of the slotted record types. The fields are the __slots__, and a
+    record also reads and writes as the dict it replaces ({'_FIELD': VALUE}),
+    so _record['_lots'] = 0.02, dict(_record) and **_record keep working.
+    Unset fields are missing keys.
+
+    _symbol and _comment strings are interned: every record of a symbol (or
+    a trader's comment) holds the same string.
+    """
+    __slots__ = ()
+
+    def __init__(self, **_fields):
+
+        for _key, _value in _fields.items():
+            setattr(self, _key, _value)
+
+        self._intern_()
+
+    def _intern_(self):
+
+        for _key in ('_symbol', '_comment'):
+            _value = getattr(self, _key, None)
+            if type(_value) is str:
+                setattr(self, _key, sys.intern(_value))
+
+    ##########################################################################
+
+    # {'_FIELD': VALUE} access
+
+    def __getitem__(self, _key):
+
+        if _key in self.__slots__:
+            try:
+                return getattr(self, _key)
+            except AttributeError:
+                pass
+
+        raise KeyError(_key)
+
+    def __setitem__(self, _key, _value):
+
+        if _key not in self.__slots__:
+            raise KeyError(_key)
+
+        if _key in ('_symbol', '_comment') and type(_value) is str:
+            _value = sys.intern(_value)
+
+        setattr(self, _key, _value)
+
+    def get(self, _key, _default=None):
+        return getattr(self, _key, _default) if _key in self.__slots__ else _default
+
+    def __contains__(self, _key):
+        return _key in self.__slots__ and hasattr(self, _key)
+
+    def keys(self):
+        return [_key for _key in self.__slots__ if hasattr(self, _key)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def values(self):
+        return [getattr(self, _key) for _key in self.keys()]
+
+    def items(self):
+        return [(_key, getattr(self, _key)) for _key in self.keys()]
+
+    def copy(self):
+
+        _copy = self.__class__.__new__(self.__class__)
+
+        for _key, _value in self.items():
+            setattr(_copy, _key, _value)
+
+        return _copy
+
+    def __eq__(self, _other):
+        return dict(self.items()) == dict(_other.items()) if hasattr(_other, 'items') else NotImplemented
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class DWX_ZMQ_Order(_DWX_ZMQ_Record):
+
+    """
+    An order request, as returned by _generate_default_order_dict().
+
+    Fields are in _DWX_MTX_SEND_COMMAND_'s argument order and always set,
+    so _DWX_MTX_SEND_ORDER_ passes them positionally (values()) instead of
+    unpacking ten keywords.
+    """
+    __slots__ = ('_action', '_type', '_symbol', '_price', '_SL', '_TP',
+                 '_comment', '_lots', '_magic', '_ticket')
+
+    def __init__(self, _action='OPEN', _type=0, _symbol='EURUSD', _price=0.0,
+                 _SL=500, _TP=500, _comment='', _lots=0.01, _magic=123456,
+                 _ticket=0):
+
+        self._action = _action
+        self._type = _type
+        self._symbol = _symbol
+        self._price = _price
+        self._SL = _SL
+        self._TP = _TP
+        self._comment = _comment
+        self._lots = _lots
+        self._magic = _magic
+        self._ticket = _ticket
+
+        self._intern_()
+
+    def keys(self):
+        return self.__slots__
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def values(self):
+        return _ORDER_VALUES(self)
+
+_ORDER_VALUES = attrgetter(*DWX_ZMQ_Order.__slots__)
+
+class DWX_ZMQ_Trade(_DWX_ZMQ_Record):
+
+    """
+    One trade of an OPEN_TRADES report ({TICKET: {'_symbol': .., ..}}),
+    e.g. _trades[TICKET]['_open_price'].
+    """
+    __slots__ = ('_magic', '_symbol', '_lots', '_type', '_open_price',
+                 '_open_time', '_SL', '_TP', '_pnl', '_comment')
+
+    """
+    {TICKET: {..}} -> {TICKET: DWX_ZMQ_Trade}, or the report unchanged if
+    a trade has fields the record doesn't know
+    """
+    @classmethod
+    def _from_report_(cls, _trades):
+
+        try:
+            return {_ticket: cls(**_trade) for _ticket, _trade in _trades.items()}
+        except (AttributeError, TypeError):
+            return _trades
+
+    # All fields as a tuple, None where unset (DataFrame rows)
+    def _row_(self):
+        return tuple(getattr(self, _key, None) for _key in self.__slots__)
+
+##############################################################################
+
+class DWX_ZMQ_Tick_Series():
+
+    """
+    A symbol's ticks in three arrays (~24 bytes per tick):
+
+        _times      array('q'), ns since epoch (UTC, time.time_ns())
+        _bids       array('d')
+        _asks       array('d')
+
+    It also reads as the {TIMESTAMP: (BID, ASK)} dict it replaces in
+    _Market_Data_DB, TIMESTAMP being 'YYYY-mm-dd HH:MM:SS.ffffff' (UTC).
+    keys(), values() and items() are sequences built on demand, so
+    _series.items()[-1] is the latest tick without materialising the rest.
+
+    Only the poll thread appends; _asks is appended last, so readers never
+    see a partial tick.
+    """
+    __slots__ = ('_times', '_bids', '_asks')
+
+    def __init__(self):
+
+        self._times = array('q')
+        self._bids = array('d')
+        self._asks = array('d')
+
+    def _append_(self, _ts, _bid, _ask):
+
+        self._times.append(_ts)
+        self._bids.append(_bid)
+        self._asks.append(_ask)
+
+    # Latest (BID, ASK), or None before the first tick
+    def _last_(self):
+
+        _n = len(self._asks)
+        return (self._bids[_n - 1], self._asks[_n - 1]) if _n else None
+
+    # Always with the microseconds (str() drops them when they're 0), so
+    # every key has one format and they sort as they were received
+    @staticmethod
+    def _timestamp_(_ns):
+        return (_EPOCH + timedelta(microseconds=_ns // 1000)).isoformat(sep=' ', timespec='microseconds')
+
+    def _item_(self, _i, _kind):
+
+        if _kind == 0:
+            return self._timestamp_(self._times[_i])
+        if _kind == 1:
+            return (self._bids[_i], self._asks[_i])
+
+        return (self._timestamp_(self._times[_i]), (self._bids[_i], self._asks[_i]))
+
+    ##########################################################################
+
+    # {TIMESTAMP: (BID, ASK)} access
+
+    def __len__(self):
+        return len(self._asks)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    """
+    Bisects on the times, which the wall clock normally keeps increasing
+    """
+    def __getitem__(self, _timestamp):
+
+        try:
+            _us = (datetime.fromisoformat(_timestamp) - _EPOCH) // timedelta(microseconds=1)
+        except (TypeError, ValueError):
+            raise KeyError(_timestamp)
+
+        _n = len(self._asks)
+        _i = bisect_left(self._times, _us * 1000, 0, _n)
+
+        if _i < _n and self._times[_i] // 1000 == _us:
+            return (self._bids[_i], self._asks[_i])
+
+        raise KeyError(_timestamp)
+
+    def get(self, _timestamp, _default=None):
+
+        try:
+            return self[_timestamp]
+        except KeyError:
+            return _default
+
+    def __contains__(self, _timestamp):
+        return self.get(_timestamp) is not None
+
+    def keys(self):
+        return _DWX_ZMQ_Tick_View(self, 0)
+
+    def values(self):
+        return _DWX_ZMQ_Tick_View(self, 1)
+
+    def items(self):
+        return _DWX_ZMQ_Tick_View(self, 2)
+
+    def __repr__(self):
+
+        _n = len(self._asks)
+        _last = ', ... {!r}: {!r}'.format(*self._item_(_n - 1, 2)) if _n else ''
+
+        return '<DWX_ZMQ_Tick_Series of {} ticks{}>'.format(_n, _last)
+
+class _DWX_ZMQ_Tick_View():
+
+    """
+    keys(), values() or items() of a DWX_ZMQ_Tick_Series, as a sequence
+    (the length is fixed when iteration starts)
+    """
+    __slots__ = ('_series', '_kind')
+
+    def __init__(self, _series, _kind):
+
+        self._series = _series
+        self._kind = _kind
+
+    def __len__(self):
+        return len(self._series)
+
+    def __getitem__(self, _i):
+
+        _n = len(self._series)
+
+        if isinstance(_i, slice):
+            return [self._series._item_(_j, self._kind) for _j in range(*_i.indices(_n))]
+
+        if _i < 0:
+            _i += _n
+        if not 0 <= _i < _n:
+            raise IndexError('tick index out of range')
+
+        return self._series._item_(_i, self._kind)
+
+    def __iter__(self):
+
+        for _i in range(len(self._series)):
+            yield self._series._item_(_i, self._kind)
+
+##############################################################################
+
 class DWX_ZeroMQ_Connector():
 
     """
@@ -39,15 +463,18 @@ class DWX_ZeroMQ_Connector():
                  _verbose=True,             # String delimiter
                  _poll_timeout=10,        # ZMQ Poller Timeout (ms)
                  _sleep_delay=0.001,        # 1 ms for time.sleep()
-                 _monitor=False):           # Experimental ZeroMQ Socket Monitoring
+                 _monitor=False,            # Experimental ZeroMQ Socket Monitoring
+                 _context=None,             # Shared zmq.Context (None = create own)
+                 _busy_poll=False,          # Spin instead of sleep/poll (burns a core)
+                 _poll_cpus=None,           # CPUs to pin the poll thread to, e.g. {3}
+                 _poll_priority=None):      # Poll thread nice value, e.g. -10 (needs privileges)
     
         ######################################################################
-     
-        # Strategy Status (if this is False, ZeroMQ will not listen for data)
-        self._ACTIVE = True
         
-        # Client ID
-        self._ClientID = _ClientID
+        # Everything but the sockets
+        self._DWX_ZMQ_INIT_STATE_(_ClientID, _delimiter, _verbose,
+                                  _poll_timeout, _sleep_delay, _busy_poll,
+                                  _poll_cpus, _poll_priority)
         
         # ZeroMQ Host
         self._host = _host
@@ -55,8 +482,11 @@ class DWX_ZeroMQ_Connector():
         # Connection Protocol
         self._protocol = _protocol
 
-        # ZeroMQ Context
-        self._ZMQ_CONTEXT = zmq.Context()
+        # ZeroMQ Context (may be shared with other connectors in the same
+        # process, e.g. via DWX_ZMQ_Connection_Manager - only terminated
+        # on shutdown if this connector created it)
+        self._OWN_CONTEXT = _context is None
+        self._ZMQ_CONTEXT = zmq.Context() if _context is None else _context
         
         # TCP Connection URL Template
         self._URL = self._protocol + "://" + self._host + ":"
@@ -66,56 +496,116 @@ class DWX_ZeroMQ_Connector():
         self._PULL_PORT = _PULL_PORT
         self._SUB_PORT = _SUB_PORT
         
-        # Create Sockets
-        self._PUSH_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUSH)
-        self._PUSH_SOCKET.setsockopt(zmq.SNDHWM, 1)        
         self._PUSH_SOCKET_STATUS = {'state': True, 'latest_event': 'N/A'}
-        
-        self._PULL_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PULL)
-        self._PULL_SOCKET.setsockopt(zmq.RCVHWM, 1)
         self._PULL_SOCKET_STATUS = {'state': True, 'latest_event': 'N/A'}
         
-        self._SUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.SUB)
+        ###########################################
+        # Enable/Disable ZeroMQ Socket Monitoring #
+        ###########################################
         
-        # Bind PUSH Socket to send commands to MetaTrader
-        self._PUSH_SOCKET.connect(self._URL + str(self._PUSH_PORT))
-        print("[INIT] Ready to send commands to METATRADER (PUSH): " + str(self._PUSH_PORT))
+        # PUSH/PULL monitor sockets are polled by the main poll loop
+        self._MONITOR = _monitor
+        self._MONITOR_SOCKETS = {}                          # {MONITOR SOCKET: 'PUSH'/'PULL'}
+        self._MONITOR_EVENT_COUNTS = {'PUSH': {}, 'PULL': {}}   # {EVENT NAME: COUNT}
+        self._MONITOR_HANDLERS = []
         
-        # Connect PULL Socket to receive command responses from MetaTrader
-        self._PULL_SOCKET.connect(self._URL + str(self._PULL_PORT))
-        print("[INIT] Listening for responses from METATRADER (PULL): " + str(self._PULL_PORT))
+        # ZeroMQ Monitor Event Map
+        self._MONITOR_EVENT_MAP = {getattr(zmq, name): name
+                                   for name in dir(zmq) if name.startswith('EVENT_')}
         
-        # Connect SUB Socket to receive market data from MetaTrader
+        # Initialize POLL set, then create, connect and register sockets
+        self._poller = zmq.Poller()
+        self._DWX_ZMQ_CREATE_SOCKETS_()
+        
+        print("[INIT] Ready to send commands to METATRADER (PUSH): " + str(self._PUSH_PORT))
+        print("[INIT] Listening for responses from METATRADER (PULL): " + str(self._PULL_PORT))
         print("[INIT] Listening for market data from METATRADER (SUB): " + str(self._SUB_PORT))
-        self._SUB_SOCKET.connect(self._URL + str(self._SUB_PORT))
         
-        # Initialize POLL set and register PULL and SUB sockets
-        self._poller = zmq.Poller()
-        self._poller.register(self._PULL_SOCKET, zmq.POLLIN)
-        self._poller.register(self._SUB_SOCKET, zmq.POLLIN)
+        # Begin polling for PULL / SUB data
+        self._MarketData_Thread = Thread(target=self._DWX_ZMQ_Poll_Data_, 
+                                         args=(self._string_delimiter,
+                                               self._poll_timeout,))
+        self._MarketData_Thread.daemon = True
+        self._MarketData_Thread.start()
+        
+        if _monitor == True:
+            print("\n[KERNEL] Socket Monitoring Config -> DONE!\n")
+       
+    ##########################################################################
+    
+    """
+    Function to set up the connector's state, everything but the sockets
+    (also used by socket-less connectors, e.g. DWX_ZMQ_Remote_Connector)
+    """
+    def _DWX_ZMQ_INIT_STATE_(self,
+                             _ClientID='dwx-zeromq',
+                             _delimiter=';',
+                             _verbose=True,
+                             _poll_timeout=10,
+                             _sleep_delay=0.001,
+                             _busy_poll=False,
+                             _poll_cpus=None,
+                             _poll_priority=None):
         
-        # Start listening for responses to commands and new market data
+        # Strategy Status (if this is False, ZeroMQ will not listen for data)
+        self._ACTIVE = True
+        
+        # Client ID
+        self._ClientID = _ClientID
+        
+        # Symbols subscribed to (replayed when the sockets are rebuilt)
+        self._SUBSCRIPTIONS = set()
+        
+        # Per-shard SUB sockets and workers, which then own the market data
+        # subscriptions (set by DWX_ZMQ_Sharded_Ingest)
+        self._SUB_SHARDS = None
+        
+        # Serialises sends with socket rebuilds (DWX_ZMQ_Heartbeat)
+        self._PUSH_LOCK = Lock()
+        
+        # Terminal liveness / reconnect (set by DWX_ZMQ_Heartbeat)
+        self._HEARTBEAT = None
+        
+        # String delimiter of MetaTrader's messages
         self._string_delimiter = _delimiter
         
         # BID/ASK Market Data Subscription Threads ({SYMBOL: Thread})
         self._MarketData_Thread = None
         
-        # Socket Monitor Threads
-        self._PUSH_Monitor_Thread = None
-        self._PULL_Monitor_Thread = None
-        
         # Market Data Dictionary by Symbol (holds tick data)
-        self._Market_Data_DB = {}   # {SYMBOL: {TIMESTAMP: (BID, ASK)}}
+        self._Market_Data_DB = {}   # {SYMBOL: DWX_ZMQ_Tick_Series}, reads as {TIMESTAMP: (BID, ASK)}
                                 
-        # Current Bid Ask
-        self._Curr_Bid_Ask = {}
+        # Current Bid Ask: versioned, lock-free quote board that also reads
+        # as {SYMBOL: (BID, ASK)}
+        self._QUOTE_BOARD = DWX_ZMQ_Quote_Board()
+        self._Curr_Bid_Ask = self._QUOTE_BOARD
+        
+        # Callables notified of every tick as f(SYMBOL, BID, ASK)
+        self._TICK_HANDLERS = []
+        
+        # Outbound command queue (set by DWX_ZMQ_Command_Scheduler)
+        self._COMMAND_SCHEDULER = None
+        
+        # Pre-trade checks on every OPEN (set by DWX_ZMQ_Risk_Gate)
+        self._RISK_GATE = None
+        
+        # Raw PUSH/PULL/SUB frame capture (set by DWX_ZMQ_Flight_Recorder)
+        self._FLIGHT_RECORDER = None
         
         # Temporary Order STRUCT for convenience wrappers later.
         self.temp_order_dict = self._generate_default_order_dict()
         
+        # Batch IDs for correlating BATCH replies
+        self._batch_ids = count(1)
+        
         # Thread returns the most recently received DATA block here
         self._thread_data_output = None
         
+        # MetaTrader replies aren't tagged: one request/reply in flight at a
+        # time, across every strategy sharing this connector
+        # (DWX_ZMQ_Execution, DWX_ZMQ_Reporting)
+        self._REQUEST_LOCK = RLock()
+        
         # Verbosity
         self._verbose = _verbose
         
@@ -125,55 +615,111 @@ class DWX_ZeroMQ_Connector():
         # Global Sleep Delay
         self._sleep_delay = _sleep_delay
         
-        # Begin polling for PULL / SUB data
-        self._MarketData_Thread = Thread(target=self._DWX_ZMQ_Poll_Data_, 
-                                         args=(self._string_delimiter,
-                                               self._poll_timeout,))
-        self._MarketData_Thread.daemon = True
-        self._MarketData_Thread.start()
+        # Low latency mode: the poll thread never sleeps and polls with a 0
+        # timeout, optionally pinned to its own core(s) at a raised priority
+        self._busy_poll = _busy_poll
+        self._poll_cpus = _poll_cpus
+        self._poll_priority = _poll_priority
         
-        ###########################################
-        # Enable/Disable ZeroMQ Socket Monitoring #
-        ###########################################
-        if _monitor == True:
-            
-            # ZeroMQ Monitor Event Map
-            self._MONITOR_EVENT_MAP = {}
-            
-            print("\n[KERNEL] Retrieving ZeroMQ Monitor Event Names:\n")
-            
-            for name in dir(zmq):
-                if name.startswith('EVENT_'):
-                    value = getattr(zmq, name)
-                    print(f"{value}\t\t:\t{name}")
-                    self._MONITOR_EVENT_MAP[value] = name
-            
-            print("\n[KERNEL] Socket Monitoring Config -> DONE!\n")
+        # Time the poll thread spends between polls, i.e. not watching the
+        # sockets (see _DWX_ZMQ_JITTER_REPORT_)
+        self._POLL_JITTER = [0] * _JITTER_BUCKETS
+        self._POLL_JITTER_MAX = 0
+        
+    ##########################################################################
+    
+    """
+    Function to create the PUSH, PULL and SUB sockets, connect them and
+    register PULL/SUB with the poller (subscriptions are re-applied)
+    """
+    def _DWX_ZMQ_CREATE_SOCKETS_(self):
+        
+        self._PUSH_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUSH)
+        self._PUSH_SOCKET.setsockopt(zmq.SNDHWM, 1)
+        
+        self._PULL_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PULL)
+        self._PULL_SOCKET.setsockopt(zmq.RCVHWM, 1)
+        
+        self._SUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.SUB)
+        
+        # Connect PUSH Socket to send commands to MetaTrader
+        self._PUSH_SOCKET.connect(self._URL + str(self._PUSH_PORT))
+        
+        # Connect PULL Socket to receive command responses from MetaTrader
+        self._PULL_SOCKET.connect(self._URL + str(self._PULL_PORT))
+        
+        # Connect SUB Socket to receive market data from MetaTrader
+        self._SUB_SOCKET.connect(self._URL + str(self._SUB_PORT))
         
+        if self._SUB_SHARDS is None:
+            for _symbol in self._SUBSCRIPTIONS:
+                self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+        
+        self._poller.register(self._PULL_SOCKET, zmq.POLLIN)
+        self._poller.register(self._SUB_SOCKET, zmq.POLLIN)
+        
+        if self._MONITOR == True:
+            
             # Disable PUSH/PULL sockets and let MONITOR events control them.
             self._PUSH_SOCKET_STATUS['state'] = False
             self._PULL_SOCKET_STATUS['state'] = False
             
-            # PUSH
-            self._PUSH_Monitor_Thread = Thread(target=self._DWX_ZMQ_EVENT_MONITOR_, 
-                                               args=("PUSH",
-                                                     self._PUSH_SOCKET.get_monitor_socket(),))
+            for _name, _socket in (('PUSH', self._PUSH_SOCKET), ('PULL', self._PULL_SOCKET)):
+                _monitor_socket = _socket.get_monitor_socket()
+                self._poller.register(_monitor_socket, zmq.POLLIN)
+                self._MONITOR_SOCKETS[_monitor_socket] = _name
+        
+    ##########################################################################
+    
+    """
+    Function to stop socket monitoring and close the monitor sockets
+    """
+    def _DWX_ZMQ_CLOSE_MONITORS_(self):
+        
+        for _socket in (self._PUSH_SOCKET, self._PULL_SOCKET):
+            if self._MONITOR_SOCKETS and not _socket.closed:
+                _socket.disable_monitor()
+        
+        for _monitor_socket in self._MONITOR_SOCKETS:
+            self._poller.unregister(_monitor_socket)
+            _monitor_socket.close(0)
+        
+        self._MONITOR_SOCKETS = {}
+        
+    ##########################################################################
+    
+    """
+    Function to close and rebuild all sockets, e.g. after the terminal
+    restarted (called on the poll thread by DWX_ZMQ_Heartbeat)
+    """
+    def _DWX_ZMQ_RECONNECT_(self):
+        
+        with self._PUSH_LOCK:
+            
+            self._DWX_ZMQ_CLOSE_MONITORS_()
             
-            self._PUSH_Monitor_Thread.daemon = True
-            self._PUSH_Monitor_Thread.start()
+            self._poller.unregister(self._PULL_SOCKET)
+            self._poller.unregister(self._SUB_SOCKET)
             
-            # PULL
-            self._PULL_Monitor_Thread = Thread(target=self._DWX_ZMQ_EVENT_MONITOR_, 
-                                               args=("PULL",
-                                                     self._PULL_SOCKET.get_monitor_socket(),))
+            for _socket in (self._PUSH_SOCKET, self._PULL_SOCKET, self._SUB_SOCKET):
+                _socket.close(0)
             
-            self._PULL_Monitor_Thread.daemon = True
-            self._PULL_Monitor_Thread.start()
-       
+            self._DWX_ZMQ_CREATE_SOCKETS_()
+        
+        print("\n[KERNEL] Sockets rebuilt, {} subscription(s) replayed".format(len(self._SUBSCRIPTIONS)))
+        
     ##########################################################################
     
     def _DWX_ZMQ_SHUTDOWN_(self):
         
+        # Flush and stop the command scheduler while sockets are still open
+        if self._COMMAND_SCHEDULER is not None:
+            self._COMMAND_SCHEDULER._stop_()
+        
+        # Stop the market data shards while the context is still up
+        if self._SUB_SHARDS is not None:
+            self._SUB_SHARDS._stop_()
+        
         # Set INACTIVE
         self._ACTIVE = False
         
@@ -181,20 +727,21 @@ class DWX_ZeroMQ_Connector():
         if self._MarketData_Thread is not None:
             self._MarketData_Thread.join()
             
-        if self._PUSH_Monitor_Thread is not None:
-            self._PUSH_Monitor_Thread.join()
-            
-        if self._PULL_Monitor_Thread is not None:            
-            self._PULL_Monitor_Thread.join()
+        # Close monitor sockets and unregister sockets from Poller
+        self._DWX_ZMQ_CLOSE_MONITORS_()
         
-        # Unregister sockets from Poller
         self._poller.unregister(self._PULL_SOCKET)
         self._poller.unregister(self._SUB_SOCKET)
         print("\n++ [KERNEL] Sockets unregistered from ZMQ Poller()! ++")
         
-        # Terminate context 
-        self._ZMQ_CONTEXT.destroy(0)
-        print("\n++ [KERNEL] ZeroMQ Context Terminated.. shut down safely complete! :)")
+        # Terminate context, or only close our own sockets if shared
+        if self._OWN_CONTEXT:
+            self._ZMQ_CONTEXT.destroy(0)
+            print("\n++ [KERNEL] ZeroMQ Context Terminated.. shut down safely complete! :)")
+        else:
+            for _socket in (self._PUSH_SOCKET, self._PULL_SOCKET, self._SUB_SOCKET):
+                _socket.close(0)
+            print("\n++ [KERNEL] Sockets closed (shared ZeroMQ Context left running).. shut down safely complete! :)")
         
     ##########################################################################
     
@@ -213,13 +760,49 @@ class DWX_ZeroMQ_Connector():
     """
     def remote_send(self, _socket, _data):
         
+        # Sockets rebuilt by a reconnect since the caller read the attribute
+        if _socket.closed:
+            _socket = self._PUSH_SOCKET
+        
+        # Hand PUSH traffic over to the command scheduler, if installed
+        if self._COMMAND_SCHEDULER is not None and _socket is self._PUSH_SOCKET:
+            self._COMMAND_SCHEDULER._enqueue_(_data)
+            return
+        
+        # Terminal down: hold the command until it is back
+        if self._HEARTBEAT is not None and self._HEARTBEAT._queue_(_data):
+            return
+        
         if self._PUSH_SOCKET_STATUS['state'] == True:
-            try:
-                _socket.send_string(_data, zmq.DONTWAIT)
+            with self._PUSH_LOCK:
                 
-            except zmq.error.Again:
-                print("\nResource timeout.. please try again.")
-                sleep(self._sleep_delay)
+                if _socket.closed:
+                    _socket = self._PUSH_SOCKET
+                
+                try:
+                    _frame = _data.encode('utf-8')
+                    _sent_ns = monotonic_ns()
+                    
+                    try:
+                        _socket.send(_frame, zmq.DONTWAIT)
+                        
+                    except zmq.error.Again:
+                        # SNDHWM is 1: a command sent right after another
+                        # one (or after a reconnect) can be refused before
+                        # ZeroMQ has processed the peer's flow control
+                        # credits. Polling lets it do so; only then give up.
+                        if not _socket.poll(self._poll_timeout, zmq.POLLOUT):
+                            raise
+                        
+                        _sent_ns = monotonic_ns()
+                        _socket.send(_frame, zmq.DONTWAIT)
+                    
+                    if self._FLIGHT_RECORDER is not None:
+                        self._FLIGHT_RECORDER._record_('PUSH', _frame, _sent_ns)
+                    
+                except zmq.error.Again:
+                    print("\nResource timeout.. please try again.")
+                    sleep(self._sleep_delay)
         else:
             print('\n[KERNEL] NO HANDSHAKE ON PUSH SOCKET.. Cannot SEND data')
       
@@ -237,14 +820,20 @@ class DWX_ZeroMQ_Connector():
     
     def _valid_response_(self, _input='zmq'):
         
-        # Valid data types
-        _types = (dict,DataFrame)
-        
         # If _input = 'zmq', assume self._zmq._thread_data_output
         if isinstance(_input, str) and _input == 'zmq':
-            return isinstance(self._get_response_(), _types)
-        else:
-            return isinstance(_input, _types)
+            _input = self._get_response_()
+        
+        # Valid data types: dict, or a DataFrame from DWX_ZMQ_Reporting.
+        # pandas is never imported here - if it isn't loaded yet, _input
+        # can't be a DataFrame.
+        if isinstance(_input, dict):
+            return True
+        
+        _pandas = sys.modules.get('pandas')
+        
+        if _pandas is not None:
+            return isinstance(_input, _pandas.DataFrame)
             
         # Default
         return False
@@ -258,8 +847,12 @@ class DWX_ZeroMQ_Connector():
         
         if self._PULL_SOCKET_STATUS['state'] == True:
             try:
-                msg = _socket.recv_string(zmq.DONTWAIT)
-                return msg
+                _frame = _socket.recv(zmq.DONTWAIT)
+                
+                if self._FLIGHT_RECORDER is not None:
+                    self._FLIGHT_RECORDER._record_('PULL', _frame)
+                
+                return _frame.decode('utf-8')
             except zmq.error.Again:
                 print("\nResource timeout.. please try again.")
                 sleep(self._sleep_delay)
@@ -279,7 +872,7 @@ class DWX_ZeroMQ_Connector():
             _order = self._generate_default_order_dict()
         
         # Execute
-        self._DWX_MTX_SEND_COMMAND_(**_order)
+        self._DWX_MTX_SEND_ORDER_(_order)
         
     # MODIFY ORDER
     def _DWX_MTX_MODIFY_TRADE_BY_TICKET_(self, _ticket, _SL, _TP): # in points
@@ -291,7 +884,7 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_ticket'] = _ticket
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             print("[ERROR] Order Ticket {} not found!".format(_ticket))
@@ -304,7 +897,7 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_ticket'] = _ticket
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             print("[ERROR] Order Ticket {} not found!".format(_ticket))
@@ -318,7 +911,7 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_lots'] = _lots
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             print("[ERROR] Order Ticket {} not found!".format(_ticket))
@@ -331,7 +924,7 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_magic'] = _magic
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             pass
@@ -343,7 +936,7 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_action'] = 'CLOSE_ALL'
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             pass
@@ -355,25 +948,37 @@ class DWX_ZeroMQ_Connector():
             self.temp_order_dict['_action'] = 'GET_OPEN_TRADES'
             
             # Execute
-            self._DWX_MTX_SEND_COMMAND_(**self.temp_order_dict)
+            self._DWX_MTX_SEND_ORDER_(self.temp_order_dict)
             
         except KeyError:
             pass
         
         
     
-    # DEFAULT ORDER DICT
+    # CLOSE MANY TICKETS (one BATCH message)
+    def _DWX_MTX_CLOSE_TRADES_BY_TICKETS_(self, _tickets):
+        
+        return self._DWX_MTX_SEND_BATCH_COMMAND_([(_ticket, 'CLOSE', 0, 0, 0)
+                                                  for _ticket in _tickets])
+    
+    # MODIFY MANY TICKETS (one BATCH message), [(TICKET, SL, TP)] in points
+    def _DWX_MTX_MODIFY_TRADES_BY_TICKETS_(self, _modifications):
+        
+        return self._DWX_MTX_SEND_BATCH_COMMAND_([(_ticket, 'MODIFY', _SL, _TP, 0)
+                                                  for _ticket, _SL, _TP in _modifications])
+    
+    # DEFAULT ORDER (a DWX_ZMQ_Order, read and written like the dict it was)
     def _generate_default_order_dict(self):
-        return({'_action': 'OPEN',
-                  '_type': 0,
-                  '_symbol': 'EURUSD',
-                  '_price': 0.0,
-                  '_SL': 500, # SL/TP in POINTS, not pips.
-                  '_TP': 500,
-                  '_comment': self._ClientID,
-                  '_lots': 0.01,
-                  '_magic': 123456,
-                  '_ticket': 0})
+        return(DWX_ZMQ_Order(_action='OPEN',
+                             _type=0,
+                             _symbol='EURUSD',
+                             _price=0.0,
+                             _SL=500, # SL/TP in POINTS, not pips.
+                             _TP=500,
+                             _comment=self._ClientID,
+                             _lots=0.01,
+                             _magic=123456,
+                             _ticket=0))
     
     # DEFAULT DATA REQUEST DICT
     def _generate_default_data_dict(self):
@@ -391,9 +996,13 @@ class DWX_ZeroMQ_Connector():
                                  _symbol='EURUSD',
                                  _timeframe=1,
                                  _start='2019.01.04 17:00:00',
-                                 _end=Timestamp.now().strftime('%Y.%m.%d %H:%M:00')):
+                                 _end=None):
                                  #_end='2019.01.04 17:05:00'):
         
+        # Default to the current minute (evaluated per call, not at import)
+        if _end is None:
+            _end = datetime.now().strftime('%Y.%m.%d %H:%M:00')
+        
         _msg = "{};{};{};{};{}".format('DATA',
                                      _symbol,
                                      _timeframe,
@@ -404,6 +1013,18 @@ class DWX_ZeroMQ_Connector():
     
     
     ##########################################################################
+    """
+    Function to send an order: a DWX_ZMQ_Order, or any mapping of
+    _DWX_MTX_SEND_COMMAND_'s arguments
+    """
+    def _DWX_MTX_SEND_ORDER_(self, _order):
+        
+        # Order fields are in argument order: no keyword unpacking
+        if type(_order) is DWX_ZMQ_Order:
+            self._DWX_MTX_SEND_COMMAND_(*_order.values())
+        else:
+            self._DWX_MTX_SEND_COMMAND_(**_order)
+    
     """
     Function to construct messages for sending Trade commands to MetaTrader
     """
@@ -418,6 +1039,18 @@ class DWX_ZeroMQ_Connector():
                                                          _lots,_magic,
                                                          _ticket)
         
+        # Refused OPENs never leave: the rejection becomes the response
+        if _action == 'OPEN' and self._RISK_GATE is not None:
+            
+            _reason = self._RISK_GATE._check_(_symbol, _price, _lots, _magic)
+            
+            if _reason is not None:
+                self._set_response_({'_action': 'REJECTED', '_reason': _reason,
+                                     '_symbol': _symbol, '_type': _type,
+                                     '_lots': _lots, '_magic': _magic,
+                                     '_comment': _comment})
+                return
+        
         # Send via PUSH Socket
         self.remote_send(self._PUSH_SOCKET, _msg)
         
@@ -450,6 +1083,46 @@ class DWX_ZeroMQ_Connector():
          """
         # pass
     
+    ##########################################################################
+    """
+    Function to send several ticket commands to MetaTrader in one message.
+    
+    _items is a list of (TICKET, ACTION, SL, TP, LOTS) tuples, ACTION being
+    one of CLOSE, CLOSE_PARTIAL or MODIFY. Returns the batch ID, which the
+    single reply carries back as '_batch_id':
+    
+        {'_action': 'BATCH', '_batch_id': ID,
+         '_results': {TICKET: {..same keys as the single command reply..}}}
+    """
+    def _DWX_MTX_SEND_BATCH_COMMAND_(self, _items, _batch_id=None):
+        
+        if _batch_id is None:
+            _batch_id = next(self._batch_ids)
+        
+        _fields = []
+        
+        for _ticket, _action, _SL, _TP, _lots in _items:
+            
+            if _action not in ('CLOSE', 'CLOSE_PARTIAL', 'MODIFY'):
+                raise ValueError("[BATCH] Unsupported action {}".format(_action))
+            
+            _fields.append("{},{},{},{},{}".format(_action, _ticket, _SL, _TP, _lots))
+        
+        """
+         compArray[0] = TRADE
+         compArray[1] = BATCH
+         compArray[2] = Batch ID
+         compArray[3] = Number of items
+         compArray[4] = ACTION,TICKET,SL,TP,LOTS|ACTION,TICKET,SL,TP,LOTS|..
+        """
+        _msg = "{};{};{};{};{}".format('TRADE', 'BATCH', _batch_id,
+                                       len(_fields), '|'.join(_fields))
+        
+        # Send via PUSH Socket
+        self.remote_send(self._PUSH_SOCKET, _msg)
+        
+        return _batch_id
+    
     ##########################################################################
     
     """
@@ -460,11 +1133,33 @@ class DWX_ZeroMQ_Connector():
                            string_delimiter=';',
                            poll_timeout=10):
         
+        if self._poll_cpus is not None or self._poll_priority is not None:
+            _DWX_ZMQ_PIN_THREAD_(self._poll_cpus, self._poll_priority, 'poll thread')
+        
+        if self._busy_poll:
+            poll_timeout = 0
+        
+        _jitter = self._POLL_JITTER
+        _polled = monotonic_ns()
+        
         while self._ACTIVE:
             
-            sleep(self._sleep_delay) # poll timeout is in ms, sleep() is s.
+            if not self._busy_poll:
+                sleep(self._sleep_delay) # poll timeout is in ms, sleep() is s.
+            
+            # Heartbeats, liveness and reconnects (may rebuild the sockets)
+            if self._HEARTBEAT is not None:
+                self._HEARTBEAT._tick_()
+            
+            # Blind time since the last poll returned
+            _gap = monotonic_ns() - _polled
+            _bits = _gap.bit_length()
+            _jitter[(_bits << 2) | ((_gap >> (_bits - 3)) & 3) if _bits > 3 else _gap] += 1
+            if _gap > self._POLL_JITTER_MAX:
+                self._POLL_JITTER_MAX = _gap
             
             sockets = dict(self._poller.poll(poll_timeout))
+            _polled = monotonic_ns()
             
             # Process response to commands sent to MetaTrader
             if self._PULL_SOCKET in sockets and sockets[self._PULL_SOCKET] == zmq.POLLIN:
@@ -475,21 +1170,9 @@ class DWX_ZeroMQ_Connector():
                         # msg = self._PULL_SOCKET.recv_string(zmq.DONTWAIT)
                         msg = self.remote_recv(self._PULL_SOCKET)
                         
-                        # If data is returned, store as pandas Series
+                        # If data is returned, decode and store it
                         if msg != '' and msg != None:
-                            
-                            try: 
-                                _data = eval(msg)
-                                
-                                self._thread_data_output = _data
-                                if self._verbose:
-                                    print(_data) # default logic
-                                    
-                                    
-                            except Exception as ex:
-                                _exstr = "Exception Type {0}. Args:\n{1!r}"
-                                _msg = _exstr.format(type(ex).__name__, ex.args)
-                                print(_msg)
+                            self._DWX_ZMQ_ON_RESPONSE_(msg)
                    
                     except zmq.error.Again:
                         pass # resource temporarily unavailable, nothing to print
@@ -505,26 +1188,16 @@ class DWX_ZeroMQ_Connector():
             if self._SUB_SOCKET in sockets and sockets[self._SUB_SOCKET] == zmq.POLLIN:
                 
                 try:
-                    msg = self._SUB_SOCKET.recv_string(zmq.DONTWAIT)
+                    _frame = self._SUB_SOCKET.recv(zmq.DONTWAIT)
                     
-                    if msg != "":
-                        _symbol, _data = msg.split(" ")
-                        _bid, _ask = _data.split(string_delimiter)
-                        _timestamp = str(Timestamp.now('UTC'))[:-6]
-                        
-                        if self._verbose:
-                            print("\n[" + _symbol + "] " + _timestamp + " (" + _bid + "/" + _ask + ") BID/ASK")
+                    if self._FLIGHT_RECORDER is not None:
+                        self._FLIGHT_RECORDER._record_('SUB', _frame)
                     
-                        # Update Market Data DB
-                        if _symbol not in self._Market_Data_DB.keys():
-                            self._Market_Data_DB[_symbol] = {}
-                            
-                        # Update  Current Bid Ask also
-                        self._Market_Data_DB[_symbol][_timestamp] = (float(_bid), float(_ask))
-                        self._Curr_Bid_Ask[_symbol] = (float(_bid), float(_ask))
-                        
-                        
+                    msg = _frame.decode('utf-8')
                     
+                    # Sharded: the shards own every symbol, leftovers are stale
+                    if msg != "" and self._SUB_SHARDS is None:
+                        self._DWX_ZMQ_ON_TICK_(msg, string_delimiter)
                     
                 except zmq.error.Again:
                     pass # resource temporarily unavailable, nothing to print
@@ -532,11 +1205,104 @@ class DWX_ZeroMQ_Connector():
                     pass # No data returned, passing iteration.
                 except UnboundLocalError:
                     pass # _symbol may sometimes get referenced before being assigned.
+            
+            # Socket monitor events (PUSH/PULL handshakes, disconnects..)
+            for _monitor_socket, _name in list(self._MONITOR_SOCKETS.items()):
+                if _monitor_socket in sockets:
+                    self._DWX_ZMQ_ON_MONITOR_EVENTS_(_name, _monitor_socket)
                     
         print("\n++ [KERNEL] _DWX_ZMQ_Poll_Data_() Signing Out ++")
                 
     ##########################################################################
     
+    """
+    Function to decode a reply received on the PULL socket and make it the
+    current response
+    """
+    def _DWX_ZMQ_ON_RESPONSE_(self, msg):
+        
+        try: 
+            _data = eval(msg)
+            
+            # Heartbeat replies only prove the terminal alive
+            if self._HEARTBEAT is not None:
+                if self._HEARTBEAT._on_reply_(_data):
+                    return
+            elif isinstance(_data, dict) and _data.get('_action') == 'heartbeat':
+                return
+            
+            # One slotted record per open trade
+            if isinstance(_data, dict) and _data.get('_action') == 'OPEN_TRADES' and '_trades' in _data:
+                _data['_trades'] = DWX_ZMQ_Trade._from_report_(_data['_trades'])
+            
+            if self._RISK_GATE is not None:
+                self._RISK_GATE._on_response_(_data)
+            
+            self._thread_data_output = _data
+            if self._verbose:
+                print(_data) # default logic
+                
+        except Exception as ex:
+            _exstr = "Exception Type {0}. Args:\n{1!r}"
+            _msg = _exstr.format(type(ex).__name__, ex.args)
+            print(_msg)
+    
+    ##########################################################################
+    
+    """
+    Function to store a tick received on the SUB socket and notify the tick
+    handlers (raises ValueError on malformed messages)
+    """
+    def _DWX_ZMQ_ON_TICK_(self, msg, string_delimiter=';'):
+        
+        _symbol, _bid, _ask = self._DWX_ZMQ_PARSE_TICK_(msg, string_delimiter)
+        self._DWX_ZMQ_STORE_TICK_(_symbol, _bid, _ask)
+    
+    """
+    Function to store a parsed tick and notify the tick handlers (called by
+    the poll thread, or by the DWX_ZMQ_Sharded_Ingest shard owning _symbol)
+    """
+    def _DWX_ZMQ_STORE_TICK_(self, _symbol, _bid, _ask):
+        
+        _ts = time_ns()
+        
+        if self._verbose:
+            print("\n[" + _symbol + "] " + DWX_ZMQ_Tick_Series._timestamp_(_ts) + " (" + str(_bid) + "/" + str(_ask) + ") BID/ASK")
+    
+        # Update Market Data DB
+        _series = self._Market_Data_DB.get(_symbol)
+        if _series is None:
+            _series = self._Market_Data_DB[_symbol] = DWX_ZMQ_Tick_Series()
+            
+        # Update  Current Bid Ask also
+        _series._append_(_ts, _bid, _ask)
+        self._QUOTE_BOARD._write_(_symbol, _bid, _ask)
+        
+        # Notify tick handlers
+        for _handler in self._TICK_HANDLERS:
+            try:
+                _handler(_symbol, _bid, _ask)
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _msg = _exstr.format(type(ex).__name__, ex.args)
+                print(_msg)
+    
+    ##########################################################################
+    
+    """
+    Function to parse a SUB message "SYMBOL BID;ASK" into (SYMBOL, BID, ASK),
+    SYMBOL interned (raises ValueError on malformed messages)
+    """
+    @staticmethod
+    def _DWX_ZMQ_PARSE_TICK_(msg, string_delimiter=';'):
+        
+        _symbol, _data = msg.split(" ")
+        _bid, _ask = _data.split(string_delimiter)
+        
+        return sys.intern(_symbol), float(_bid), float(_ask)
+    
+    ##########################################################################
+    
     """
     Function to subscribe to given Symbol's BID/ASK feed from MetaTrader
     """
@@ -545,8 +1311,12 @@ class DWX_ZeroMQ_Connector():
                                        string_delimiter=';',
                                        poll_timeout=10):
         
-        # Subscribe to SYMBOL first.
-        self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+        # Subscribe to SYMBOL first (on a shard's own SUB socket if sharded).
+        if self._SUB_SHARDS is not None:
+            self._SUB_SHARDS._subscribe_(_symbol)
+        else:
+            self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+        self._SUBSCRIPTIONS.add(_symbol)
         
         print("[KERNEL] Subscribed to {} BID/ASK updates. See self._Market_Data_DB.".format(_symbol))
     
@@ -555,7 +1325,11 @@ class DWX_ZeroMQ_Connector():
     """
     def _DWX_MTX_UNSUBSCRIBE_MARKETDATA_(self, _symbol):
         
-        self._SUB_SOCKET.setsockopt_string(zmq.UNSUBSCRIBE, _symbol)
+        if self._SUB_SHARDS is not None:
+            self._SUB_SHARDS._unsubscribe_(_symbol)
+        else:
+            self._SUB_SOCKET.setsockopt_string(zmq.UNSUBSCRIBE, _symbol)
+        self._SUBSCRIPTIONS.discard(_symbol)
         print("\n**\n[KERNEL] Unsubscribing from " + _symbol + "\n**\n")
         
         
@@ -568,77 +1342,163 @@ class DWX_ZeroMQ_Connector():
         for _symbol in self._Market_Data_DB.keys():
             self._DWX_MTX_UNSUBSCRIBE_MARKETDATA_(_symbol=_symbol)
         
+    """
+    Function to register a callable f(SYMBOL, BID, ASK) run on every tick
+    (called from the poller thread, or with DWX_ZMQ_Sharded_Ingest from the
+    shard thread owning SYMBOL, so keep it short)
+    """
+    def _DWX_ZMQ_ADD_TICK_HANDLER_(self, _handler):
+        
+        self._TICK_HANDLERS.append(_handler)
+        
+    def _DWX_ZMQ_REMOVE_TICK_HANDLER_(self, _handler):
+        
+        if _handler in self._TICK_HANDLERS:
+            self._TICK_HANDLERS.remove(_handler)
+        
     ##########################################################################
     
-    def _DWX_ZMQ_EVENT_MONITOR_(self, 
-                                socket_name, 
-                                monitor_socket):
+    """
+    Function to handle the events waiting on a PUSH/PULL monitor socket
+    (called by the poll loop): updates the socket status, counts events and
+    notifies the monitor handlers
+    """
+    def _DWX_ZMQ_ON_MONITOR_EVENTS_(self, 
+                                    socket_name, 
+                                    monitor_socket):
         
-        # 05-08-2019 11:21 CEST
-        while self._ACTIVE:
+        _status = self._PUSH_SOCKET_STATUS if socket_name == "PUSH" else self._PULL_SOCKET_STATUS
+        _counts = self._MONITOR_EVENT_COUNTS[socket_name]
+        
+        while True:
             
-            sleep(self._sleep_delay) # poll timeout is in ms, sleep() is s.
+            try:
+                evt = recv_monitor_message(monitor_socket, zmq.DONTWAIT)
+            except zmq.error.Again:
+                break
             
-            # while monitor_socket.poll():
-            while monitor_socket.poll(self._poll_timeout):
-                
+            evt['description'] = self._MONITOR_EVENT_MAP.get(evt['event'], str(evt['event']))
+            _counts[evt['description']] = _counts.get(evt['description'], 0) + 1
+            
+            _state = _status['state']
+            
+            # Set socket status on HANDSHAKE, anything else disables it
+            _status['state'] = evt['event'] == zmq.EVENT_HANDSHAKE_SUCCEEDED
+            _status['latest_event'] = evt['description']
+            
+            if self._verbose or _status['state'] != _state:
+                print(f"\n[{socket_name} Socket] >> {evt['description']}")
+            
+            for _handler in self._MONITOR_HANDLERS:
                 try:
-                    evt = recv_monitor_message(monitor_socket, zmq.DONTWAIT)
-                    evt.update({'description': self._MONITOR_EVENT_MAP[evt['event']]})
-                    
-                    # print(f"\r[{socket_name} Socket] >> {evt['description']}", end='', flush=True)
-                    print(f"\n[{socket_name} Socket] >> {evt['description']}")
-                    
-                    # Set socket status on HANDSHAKE
-                    if evt['event'] == 4096:        # EVENT_HANDSHAKE_SUCCEEDED
-                        
-                        if socket_name == "PUSH":
-                            self._PUSH_SOCKET_STATUS['state'] = True
-                            self._PUSH_SOCKET_STATUS['latest_event'] = 'EVENT_HANDSHAKE_SUCCEEDED'
-                            
-                        elif socket_name == "PULL":
-                            self._PULL_SOCKET_STATUS['state'] = True
-                            self._PULL_SOCKET_STATUS['latest_event'] = 'EVENT_HANDSHAKE_SUCCEEDED'
-                            
-                        # print(f"\n[{socket_name} Socket] >> ..ready for action!\n")
-                            
-                    else:    
-                        # Update 'latest_event'
-                        if socket_name == "PUSH":
-                            self._PUSH_SOCKET_STATUS['state'] = False
-                            self._PUSH_SOCKET_STATUS['latest_event'] = evt['description']
-                            
-                        elif socket_name == "PULL":
-                            self._PULL_SOCKET_STATUS['state'] = False
-                            self._PULL_SOCKET_STATUS['latest_event'] = evt['description']
-                
-                    if evt['event'] == zmq.EVENT_MONITOR_STOPPED:
-                        
-                        # Reinitialize the socket
-                        if socket_name == "PUSH":
-                            monitor_socket = self._PUSH_SOCKET.get_monitor_socket()
-                        elif socket_name == "PULL":
-                            monitor_socket = self._PULL_SOCKET.get_monitor_socket()
-                        
+                    _handler(socket_name, evt)
                 except Exception as ex:
                     _exstr = "Exception Type {0}. Args:\n{1!r}"
                     _msg = _exstr.format(type(ex).__name__, ex.args)
                     print(_msg)
-               
-        # Close Monitor Socket
-        monitor_socket.close()
+    
+    """
+    Function to register a callable f(SOCKET_NAME, EVENT) run on every
+    PUSH/PULL monitor event (EVENT is the recv_monitor_message() dict plus
+    'description'); called from the poll thread
+    """
+    def _DWX_ZMQ_ADD_MONITOR_HANDLER_(self, _handler):
         
-        print(f"\n++ [KERNEL] {socket_name} _DWX_ZMQ_EVENT_MONITOR_() Signing Out ++")
+        self._MONITOR_HANDLERS.append(_handler)
             
     ##########################################################################
     
+    """
+    Function to report the poll thread's wake-up jitter: the time between
+    one poll returning and the next starting (sleep, tick handling,
+    heartbeats..), during which new messages wait unseen. In ns, with
+    percentiles from 4 buckets per power of two (within 25%).
+    """
+    def _DWX_ZMQ_JITTER_REPORT_(self, _reset=False):
+        
+        _hist = list(self._POLL_JITTER)
+        _total = sum(_hist)
+        
+        def _upper_(_i):
+            if _i < 8:
+                return _i
+            _bits = _i >> 2
+            return (5 + (_i & 3)) << (_bits - 3)
+        
+        def _pct_(_q):
+            _seen = 0
+            for _i, _n in enumerate(_hist):
+                _seen += _n
+                if _seen >= _q * _total:
+                    return _upper_(_i)
+            return 0
+        
+        _report = {'_mode': 'busy' if self._busy_poll else 'sleep',
+                   '_polls': _total,
+                   '_p50_ns': _pct_(0.5),
+                   '_p99_ns': _pct_(0.99),
+                   '_p999_ns': _pct_(0.999),
+                   '_max_ns': self._POLL_JITTER_MAX}
+        
+        if _reset:
+            self._POLL_JITTER[:] = [0] * _JITTER_BUCKETS
+            self._POLL_JITTER_MAX = 0
+        
+        return _report
+    
+    ##########################################################################
+    
+    """
+    Function to send a HEARTBEAT straight to the PUSH socket (bypassing
+    the command scheduler and handshake gating); returns True if sent
+    """
     def _DWX_ZMQ_HEARTBEAT_(self):
-        self.remote_send(self._PUSH_SOCKET, "HEARTBEAT;")
+        
+        with self._PUSH_LOCK:
+            try:
+                _sent_ns = monotonic_ns()
+                self._PUSH_SOCKET.send(b'HEARTBEAT;', zmq.DONTWAIT)
+                
+                if self._FLIGHT_RECORDER is not None:
+                    self._FLIGHT_RECORDER._record_('PUSH', b'HEARTBEAT;', _sent_ns)
+                return True
+            except zmq.error.Again:
+                return False
         
     ##########################################################################
 
 ##############################################################################
 
+"""
+Pin the calling thread to _cpus (e.g. {2, 3}) and/or set its nice value
+to _priority (negative = higher, needs CAP_SYS_NICE / root). Linux only:
+elsewhere, or without the privileges, a warning is printed and the
+thread runs as before. Returns True if everything asked for was applied.
+"""
+def _DWX_ZMQ_PIN_THREAD_(_cpus=None, _priority=None, _name='thread'):
+    
+    _ok = True
+    
+    if _cpus is not None:
+        try:
+            # pid 0 = the calling thread
+            os.sched_setaffinity(0, set(_cpus))
+        except (AttributeError, OSError) as ex:
+            print('[KERNEL] Could not pin {} to CPUs {}: {!r}'.format(_name, sorted(_cpus), ex))
+            _ok = False
+    
+    if _priority is not None:
+        try:
+            # On Linux, PRIO_PROCESS with a thread id sets that thread only
+            os.setpriority(os.PRIO_PROCESS, get_native_id(), _priority)
+        except (AttributeError, OSError) as ex:
+            print('[KERNEL] Could not set {} priority to {}: {!r}'.format(_name, _priority, ex))
+            _ok = False
+    
+    return _ok
+
+##############################################################################
+
 def _DWX_ZMQ_CLEANUP_(_name='DWX_ZeroMQ_Connector',
                       _globals=globals(), 
                       _locals=locals()):
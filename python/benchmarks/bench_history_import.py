@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_history_import.py
+    --
+    Import throughput of DWX_ZMQ_History_Importer, in rows/s.
+
+    Writes synthetic MT4 exports of --rows rows to a temporary directory
+    (a tick CSV: "2020.03.01 22:00:00.123,1.10002,1.10004" with CRLF line
+    ends, a bar CSV: "2020.03.01,22:00,O,H,L,C,VOLUME" and a version 401
+    HST file) and imports each into a fresh store with every worker count
+    of --workers, checking the row counts.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_history_import
+            [--rows 5000000] [--workers 1,2,4] [--chunk-mb 32] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from python.modules.DWX_ZMQ_History_Importer import DWX_ZMQ_History_Importer, _HST_401, _HST_HEADER
+
+_START = np.datetime64('2020-03-01T22:00:00', 'ms')
+
+##############################################################################
+
+def _digits_(_values, _width):
+
+    # Non-negative integers -> fixed width ASCII digits, one row per value
+    _powers = 10 ** np.arange(_width - 1, -1, -1, dtype=np.int64)
+    return (_values[:, None] // _powers % 10 + 48).astype(np.uint8)
+
+def _price_(_points):
+
+    # 110002 points -> "1.10002"
+    _d = _digits_(_points, 6)
+    return np.hstack((_d[:, :1], np.full((len(_d), 1), ord('.'), dtype=np.uint8), _d[:, 1:]))
+
+def _timestamps_(_times, _unit):
+
+    # datetime64 -> "2020.03.01 22:00:00.123" (ISO, then MT4 separators)
+    _text = np.datetime_as_string(_times, unit=_unit)
+    _text = _text.astype('S{}'.format(len(_text[0])))
+    _bytes = _text.view(np.uint8).reshape(len(_times), -1).copy()
+    _bytes[_bytes == ord('-')] = ord('.')
+    _bytes[_bytes == ord('T')] = ord(' ')
+
+    return _bytes
+
+def _column_(_n, _char):
+    return np.full((_n, 1), ord(_char), dtype=np.uint8)
+
+def _write_files_(_dir, _n):
+
+    _rng = np.random.default_rng(1)
+
+    # Ticks
+    _times = _START + np.cumsum(_rng.integers(1, 500, _n)).astype('timedelta64[ms]')
+    _bids = 110000 + np.cumsum(_rng.integers(-3, 4, _n))
+    _asks = _bids + _rng.integers(1, 4, _n)
+
+    _rows = np.hstack((_timestamps_(_times, 'ms'), _column_(_n, ','), _price_(_bids),
+                       _column_(_n, ','), _price_(_asks), _column_(_n, '\r'), _column_(_n, '\n')))
+
+    _ticks = os.path.join(_dir, 'EURUSD_ticks.csv')
+    with open(_ticks, 'wb') as _f:
+        _f.write(b'Time,Bid,Ask\r\n')
+        _f.write(_rows.tobytes())
+
+    # Bars: "2020.03.01,22:00,O,H,L,C,V"
+    _times = _START + (np.arange(_n) * 60000).astype('timedelta64[ms]')
+    _stamp = _timestamps_(_times, 'm')
+    _stamp[:, 10] = ord(',')
+
+    _close = 110000 + np.cumsum(_rng.integers(-30, 31, _n))
+    _open = np.concatenate(([110000], _close[:-1]))
+    _high = np.maximum(_open, _close) + _rng.integers(0, 10, _n)
+    _low = np.minimum(_open, _close) - _rng.integers(0, 10, _n)
+
+    _cols = [_stamp]
+    for _p in (_open, _high, _low, _close):
+        _cols += [_column_(_n, ','), _price_(_p)]
+    _cols += [_column_(_n, ','), _digits_(_rng.integers(1, 10000, _n), 5), _column_(_n, '\n')]
+
+    _bars = os.path.join(_dir, 'EURUSD1.csv')
+    with open(_bars, 'wb') as _f:
+        _f.write(np.hstack(_cols).tobytes())
+
+    # HST 401
+    _header = np.zeros(_HST_HEADER, dtype=np.uint8)
+    _header[:4] = np.frombuffer(np.int32(401).tobytes(), dtype=np.uint8)
+    _header[68:74] = np.frombuffer(b'EURUSD', dtype=np.uint8)
+    _header[80:84] = np.frombuffer(np.int32(1).tobytes(), dtype=np.uint8)
+
+    _records = np.zeros(_n, dtype=_HST_401)
+    _records['_time'] = 1583100000 + np.arange(_n) * 60
+    _records['_open'], _records['_high'] = _open / 1e5, _high / 1e5
+    _records['_low'], _records['_close'] = _low / 1e5, _close / 1e5
+    _records['_volume'] = 100
+
+    _hst = os.path.join(_dir, 'EURUSD1.hst')
+    with open(_hst, 'wb') as _f:
+        _f.write(_header.tobytes())
+        _f.write(_records.tobytes())
+
+    return [('tick csv', _ticks), ('bar csv', _bars), ('hst', _hst)]
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--rows', type=int, default=5000000, help='rows per file')
+    _parser.add_argument('--workers', default='1,2,4', help='comma separated worker counts')
+    _parser.add_argument('--chunk-mb', type=int, default=32, help='CSV chunk size (MB)')
+    _parser.add_argument('--json', help='also write the results to this file')
+    _args = _parser.parse_args()
+
+    _results = []
+
+    with tempfile.TemporaryDirectory() as _dir:
+
+        _files = _write_files_(_dir, _args.rows)
+
+        for _kind, _path in _files:
+            for _workers in [int(_w) for _w in _args.workers.split(',')]:
+
+                _store = os.path.join(_dir, 'store')
+                shutil.rmtree(_store, ignore_errors=True)
+
+                _importer = DWX_ZMQ_History_Importer(_store, _broker_gmt=2, _workers=_workers,
+                                                     _chunk_bytes=_args.chunk_mb << 20,
+                                                     _verbose=False)
+                _report = _importer._import_(_path)
+
+                if _report['_rows'] != _args.rows:
+                    raise ValueError('[{}] imported {} rows of {}'.format(_kind, _report['_rows'], _args.rows))
+
+                _results.append({'_format': _kind,
+                                 '_workers': _workers,
+                                 '_rows': _report['_rows'],
+                                 '_mb': os.path.getsize(_path) / 1e6,
+                                 '_seconds': _report['_seconds'],
+                                 '_rows_per_sec': _report['_rows_per_sec']})
+
+    print('\n{:<10} {:>8} {:>10} {:>9} {:>9} {:>14} {:>9}'.format(
+          'format', 'workers', 'rows', 'MB', 'seconds', 'rows/s', 'MB/s'))
+
+    for _r in _results:
+        print('{:<10} {:>8} {:>10} {:>9.1f} {:>9.2f} {:>14,.0f} {:>9.1f}'.format(
+              _r['_format'], _r['_workers'], _r['_rows'], _r['_mb'], _r['_seconds'],
+              _r['_rows_per_sec'], _r['_mb'] / _r['_seconds']))
+
+    if _args.json:
+        with open(_args.json, 'w') as _f:
+            json.dump({'_results': _results}, _f, indent=2)
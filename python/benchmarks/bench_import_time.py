@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_import_time.py
+    --
+    Cold import time and peak RSS of the DWX ZeroMQ core modules.
+
+    Each module is imported in a fresh interpreter, _repeat times; the
+    median wall time and peak RSS are reported together with whether pandas
+    ended up in sys.modules.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_import_time [--repeat 5]
+"""
+
+import argparse
+import subprocess
+import sys
+from statistics import median
+
+_MODULES = ['zmq',
+            'pandas',
+            'python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8',
+            'python.modules.DWX_ZMQ_Execution',
+            'python.modules.DWX_ZMQ_Reporting']
+
+_PROBE = """
+import resource, sys, time
+_t = time.perf_counter()
+import {module}
+_t = time.perf_counter() - _t
+print(_t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pandas' in sys.modules)
+"""
+
+##############################################################################
+
+def _measure_(_module, _repeat=5):
+
+    _times, _rss = [], []
+    _pandas = False
+
+    for _i in range(_repeat):
+
+        _out = subprocess.run([sys.executable, '-c', _PROBE.format(module=_module)],
+                              capture_output=True, text=True, check=True).stdout.split()
+
+        _times.append(float(_out[0]))
+        _rss.append(int(_out[1]))
+        _pandas = _out[2] == 'True'
+
+    return median(_times), median(_rss), _pandas
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--repeat', type=int, default=5)
+    _parser.add_argument('modules', nargs='*', default=_MODULES)
+    _args = _parser.parse_args()
+
+    print('{:<45} {:>10} {:>12} {:>8}'.format('module', 'ms', 'peak RSS MB', 'pandas'))
+
+    for _module in _args.modules:
+
+        try:
+            _t, _rss, _pandas = _measure_(_module, _args.repeat)
+
+        except subprocess.CalledProcessError as ex:
+            print('{:<45} import failed: {}'.format(_module, ex.stderr.strip().splitlines()[-1]))
+            continue
+
+        # ru_maxrss is in KB on Linux
+        print('{:<45} {:>10.1f} {:>12.1f} {:>8}'.format(_module, _t * 1e3, _rss / 1024.0,
+                                                       'yes' if _pandas else 'no'))
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_process_runner.py
+    --
+    Reaction latency of process-per-trader execution vs. number of symbols.
+
+    The benchmark process plays the connector: it publishes quotes for every
+    symbol on a DWX_ZMQ_Shared_Quote_Board and drains the command rings.
+    Each trader process waits for the next quote on its symbol and answers
+    with a command carrying the quote's timestamp, so
+
+        reaction latency = command seen by connector - quote published
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_process_runner [--symbols 1,2,4,8,16,32]
+"""
+
+import argparse
+from multiprocessing import Process, Event
+from time import sleep, monotonic_ns
+
+from python.modules.DWX_ZMQ_Shared_Memory import DWX_ZMQ_Shared_Quote_Board, DWX_ZMQ_Command_Ring
+from python.modules.DWX_ZMQ_Process_Runner import _trader_main_
+
+##############################################################################
+
+def _reaction_trader_(_zmq, _symbol, _stop):
+
+    _seq = 0
+
+    while not _stop.is_set():
+
+        _quote = _zmq._board._wait_(_symbol[0], _seq, _timeout=0.1)
+
+        if _quote is None:
+            continue
+
+        _bid, _ask, _ts, _seq = _quote
+        _zmq.remote_send(None, 'BENCH;{};{}'.format(_symbol[0], _ts))
+
+##############################################################################
+
+def _percentile_(_values, _p):
+
+    _values = sorted(_values)
+    return _values[min(len(_values) - 1, int(len(_values) * _p / 100.0))]
+
+##############################################################################
+
+def _run_(_n_symbols, _quotes=2000, _interval=0.0005):
+
+    _symbols = [('SYM{:02d}'.format(_i), 0.01) for _i in range(_n_symbols)]
+
+    _board = DWX_ZMQ_Shared_Quote_Board([_s[0] for _s in _symbols])
+    _rings = [(DWX_ZMQ_Command_Ring(4096, 128), DWX_ZMQ_Command_Ring(4, 128))
+              for _s in _symbols]
+    _stop = Event()
+
+    _procs = []
+
+    for _symbol, (_commands, _replies) in zip(_symbols, _rings):
+        _p = Process(target=_trader_main_,
+                     args=(_reaction_trader_, _symbol, _board,
+                           _commands, _replies, _stop, 'BENCH'))
+        _p.daemon = True
+        _p.start()
+        _procs.append(_p)
+
+    # Let every trader attach and block on its first quote
+    sleep(0.5 + 0.05 * _n_symbols)
+
+    _latencies = []
+
+    for _i in range(_quotes):
+
+        _symbol = _symbols[_i % _n_symbols][0]
+        _board._write_(_symbol, 1.0 + _i * 1e-5, 1.0001 + _i * 1e-5)
+
+        _deadline = monotonic_ns() + int(_interval * 1e9)
+
+        while monotonic_ns() < _deadline:
+
+            for _commands, _replies in _rings:
+
+                _msg = _commands._pop_()
+
+                if _msg is not None:
+                    _latencies.append(monotonic_ns() - int(_msg.split(b';')[2]))
+
+    # Collect stragglers
+    sleep(0.1)
+
+    for _commands, _replies in _rings:
+        _msg = _commands._pop_()
+        while _msg is not None:
+            _latencies.append(monotonic_ns() - int(_msg.split(b';')[2]))
+            _msg = _commands._pop_()
+
+    _stop.set()
+
+    for _p in _procs:
+        _p.join(2)
+        if _p.is_alive():
+            _p.terminate()
+
+    for _commands, _replies in _rings:
+        _commands._close_()
+        _replies._close_()
+
+    _board._close_()
+
+    return _latencies
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--symbols', default='1,2,4,8,16,32')
+    _parser.add_argument('--quotes', type=int, default=2000)
+    _parser.add_argument('--interval', type=float, default=0.0005,
+                         help='seconds between published quotes')
+    _args = _parser.parse_args()
+
+    print('{:>8} {:>8} {:>12} {:>12} {:>12}'.format('symbols', 'replies', 'p50 (us)', 'p99 (us)', 'max (us)'))
+
+    for _n in [int(_x) for _x in _args.symbols.split(',')]:
+
+        _lat = _run_(_n, _args.quotes, _args.interval)
+
+        if not _lat:
+            print('{:>8} {:>8} {:>12}'.format(_n, 0, 'n/a'))
+            continue
+
+        print('{:>8} {:>8} {:>12.1f} {:>12.1f} {:>12.1f}'.format(_n, len(_lat),
+                                                              _percentile_(_lat, 50) / 1e3,
+                                                              _percentile_(_lat, 99) / 1e3,
+                                                              max(_lat) / 1e3))
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_session_memory.py
+    --
+    Memory held by a simulated trading session, before and after the slotted
+    record types (DWX_ZMQ_Tick_Series, DWX_ZMQ_Order, DWX_ZMQ_Trade),
+    measured with tracemalloc.
+
+    The session lasts --hours. --symbols symbols tick --tick-rate times a
+    second in total, each tick kept in _Market_Data_DB. One trader per
+    symbol sends --orders orders in total (all kept, as in an order journal).
+    Every --report-every seconds each trader gets an OPEN_TRADES report of
+    --open-trades trades and keeps the latest one.
+
+    'before' is the previous representation: {TIMESTAMP: (BID, ASK)} dicts
+    keyed by str(datetime), order dicts and nested trade dicts. 'after' uses
+    the records, with interned symbols and comments.
+
+    For each part of the session it reports:
+        - the memory still held at the end and the peak (MB)
+        - the bytes held per item
+        - the GC-tracked objects still held
+        - the garbage collections run
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_session_memory
+            [--hours 24] [--symbols 28] [--tick-rate 10] [--orders 5000]
+            [--report-every 300] [--open-trades 10] [--json out.json]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import timedelta
+from time import perf_counter
+
+import numpy as np
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZMQ_Tick_Series, DWX_ZMQ_Order, \
+                                                      DWX_ZMQ_Trade, _EPOCH
+
+_START_NS = 1583100000 * 10**9
+
+##############################################################################
+
+def _symbols_(_n):
+    return ['SYM{:03d}'.format(_i) for _i in range(_n)]
+
+"""
+Tick schedule, built before tracing starts: symbol index, time (ns) and
+bid/ask in points, as lists
+"""
+def _tick_schedule_(_args):
+
+    _rng = np.random.default_rng(1)
+    _n = int(_args.hours * 3600 * _args.tick_rate)
+
+    _times = _START_NS + np.sort(_rng.integers(0, int(_args.hours * 3600e9), _n))
+    _bids = 110000 + np.cumsum(_rng.integers(-3, 4, _n))
+    _asks = _bids + _rng.integers(1, 4, _n)
+
+    return (_rng.integers(0, _args.symbols, _n).tolist(), _times.tolist(),
+            _bids.tolist(), _asks.tolist())
+
+##############################################################################
+
+def _ticks_(_legacy, _args, _schedule):
+
+    _names = _symbols_(_args.symbols)
+    _db = {}
+
+    for _s, _ts, _bid, _ask in zip(*_schedule):
+
+        # Symbols arrive as fresh strings from the SUB message
+        _symbol = (_names[_s] + ' ')[:-1]
+
+        if _legacy:
+            _timestamp = str(_EPOCH + timedelta(microseconds=_ts // 1000))
+            if _symbol not in _db:
+                _db[_symbol] = {}
+            _db[_symbol][_timestamp] = (_bid / 1e5, _ask / 1e5)
+        else:
+            _symbol = sys.intern(_symbol)
+            _series = _db.get(_symbol)
+            if _series is None:
+                _series = _db[_symbol] = DWX_ZMQ_Tick_Series()
+            _series._append_(_ts, _bid / 1e5, _ask / 1e5)
+
+    return _db, len(_schedule[0])
+
+def _orders_(_legacy, _args, _schedule):
+
+    _names = _symbols_(_args.symbols)
+    _journal = []
+
+    for _i in range(_args.orders):
+
+        _symbol = _names[_i % _args.symbols]
+
+        if _legacy:
+            _order = {'_action': 'OPEN', '_type': 0, '_symbol': 'EURUSD', '_price': 0.0,
+                      '_SL': 500, '_TP': 500, '_comment': 'dwx-zeromq', '_lots': 0.01,
+                      '_magic': 123456, '_ticket': 0}
+        else:
+            _order = DWX_ZMQ_Order(_comment='dwx-zeromq')
+
+        _order['_type'] = _i % 2
+        _order['_symbol'] = (_symbol + ' ')[:-1]
+        _order['_price'] = 1.1 + _i * 1e-5
+        _order['_comment'] = '{}_Trader'.format(_symbol)
+        _journal.append(_order)
+
+    return _journal, _args.orders
+
+def _trades_(_legacy, _args, _schedule):
+
+    _names = _symbols_(_args.symbols)
+    _latest = {}
+    _reports = int(_args.hours * 3600 / _args.report_every)
+    _ticket = 1
+
+    for _r in range(_reports):
+        for _symbol in _names:
+
+            _trades = {}
+
+            for _i in range(_args.open_trades):
+                _trades[_ticket] = {'_magic': 123456, '_symbol': _symbol, '_lots': 0.01,
+                                    '_type': _i % 2, '_open_price': 1.1 + _i * 1e-5,
+                                    '_open_time': '2020.03.02 10:00:00', '_SL': 1.09, '_TP': 1.11,
+                                    '_pnl': -0.2, '_comment': '{}_Trader'.format(_symbol)}
+                _ticket += 1
+
+            # As received: eval of the PULL reply
+            _data = eval(str({'_action': 'OPEN_TRADES', '_trades': _trades}))
+
+            if not _legacy:
+                _data['_trades'] = DWX_ZMQ_Trade._from_report_(_data['_trades'])
+
+            _latest[_symbol] = _data
+
+    return _latest, _args.symbols * _args.open_trades
+
+_PARTS = [('ticks', _ticks_), ('orders', _orders_), ('trades', _trades_)]
+
+##############################################################################
+
+def _measure_(_part, _legacy, _args, _schedule):
+
+    gc.collect()
+    _collections = [_s['collections'] for _s in gc.get_stats()]
+    _tracked = len(gc.get_objects())
+
+    tracemalloc.start()
+    _t0 = perf_counter()
+
+    _held, _items = _part(_legacy, _args, _schedule)
+
+    _seconds = perf_counter() - _t0
+    gc.collect(0)
+    _current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    _result = {'_held_mb': _current / 1e6,
+               '_peak_mb': _peak / 1e6,
+               '_items': _items,
+               '_bytes_per_item': _current / max(_items, 1),
+               '_gc_objects': len(gc.get_objects()) - _tracked,
+               '_gc_runs': sum(_s['collections'] for _s in gc.get_stats()) - sum(_collections),
+               '_seconds': _seconds}
+
+    del _held
+    return _result
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--hours', type=float, default=24, help='session length')
+    _parser.add_argument('--symbols', type=int, default=28, help='symbols (one trader each)')
+    _parser.add_argument('--tick-rate', type=float, default=10, help='ticks per second, all symbols')
+    _parser.add_argument('--orders', type=int, default=5000, help='orders sent in the session')
+    _parser.add_argument('--report-every', type=float, default=300, help='seconds between trade reports')
+    _parser.add_argument('--open-trades', type=int, default=10, help='open trades per trader')
+    _parser.add_argument('--json', help='also write the results to this file')
+    _args = _parser.parse_args()
+
+    _schedule = _tick_schedule_(_args)
+    _results = []
+
+    for _name, _part in _PARTS:
+        for _legacy in (True, False):
+            _results.append(dict(_part=_name, _version='before' if _legacy else 'after',
+                                 **_measure_(_part, _legacy, _args, _schedule)))
+
+    print('\n{:<8} {:<7} {:>10} {:>10} {:>10} {:>10} {:>12} {:>8} {:>9}'.format(
+          'part', 'version', 'items', 'held MB', 'peak MB', 'B/item', 'gc objects', 'gc runs', 'seconds'))
+
+    for _r in _results:
+        print('{:<8} {:<7} {:>10,} {:>10.1f} {:>10.1f} {:>10.0f} {:>12,} {:>8} {:>9.2f}'.format(
+              _r['_part'], _r['_version'], _r['_items'], _r['_held_mb'], _r['_peak_mb'],
+              _r['_bytes_per_item'], _r['_gc_objects'], _r['_gc_runs'], _r['_seconds']))
+
+    for _version in ('before', 'after'):
+        _total = sum(_r['_held_mb'] for _r in _results if _r['_version'] == _version)
+        print('{:<8} {:<7} {:>10} {:>10.1f}'.format('total', _version, '', _total))
+
+    if _args.json:
+        with open(_args.json, 'w') as _f:
+            json.dump({'_args': vars(_args), '_results': _results}, _f, indent=2)
@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_suite.py
+    --
+    Repeatable micro/round-trip benchmarks for the connector, execution,
+    reporting and strategy layers, with results kept per commit.
+
+    Benchmarks (name[param]):
+        sub_parse                   _DWX_ZMQ_PARSE_TICK_ on a SUB message
+        sub_tick                    SUB parse + _Market_Data_DB storage + handlers
+        quote_board[read|write]     quote board read / publish of one quote
+        quote_wait                  wake-up of a _wait_() for the next quote
+        pull_decode[execution]      PULL reply decode (OPEN confirmation)
+        pull_decode[open_trades]    PULL reply decode (100 open trades)
+        execute_roundtrip           _execute_ OPEN + CLOSE against the stand-in
+        open_trades_frame[N]        DataFrame construction from N trades
+        get_open_trades[N]          _get_open_trades_ round trip, N trades
+        strategy_step               one coin flip trader cycle (_trader_step_)
+        straddle_evaluate[N]        trailing pass over 1000 ticks, N symbols trailing
+        pnl_tick[N]                 open P&L update for a tick, N positions per symbol
+        risk_check                  risk gate check of an OPEN (all limits) + its reply
+        flight_record               flight recorder capture of one SUB frame
+
+    N is 10, 1000 and 10000 (symbols: 1, 100 and 1000, positions: 1, 10
+    and 100). Round-trip
+    benchmarks run against DWX_ZMQ_Stand_In_Server on the default ports
+    (32768-32770), so no terminal may be listening there. Commands go through
+    DWX_ZMQ_Command_Scheduler (unlimited rate), which retries the sends
+    the connector's SNDHWM=1 PUSH socket refuses when commands follow each
+    other within ~1 ms.
+
+    Each benchmark is calibrated to run for at least --min-time seconds per
+    sample, then sampled --repeat times; the median/min/max time per call
+    are written to python/benchmarks/results/<commit>.json (commit is
+    'git rev-parse --short HEAD', suffixed '-dirty' with local changes).
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_suite [--filter REGEX]
+        python -m python.benchmarks.bench_suite --compare BASE [HEAD]
+            [--threshold 0.10]
+
+    --compare prints HEAD/BASE ratios of the medians (HEAD defaults to the
+    current commit) and exits with status 1 if any benchmark got slower
+    by more than --threshold.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+from datetime import datetime, timezone
+from statistics import median
+from threading import Thread, Event
+from time import perf_counter, sleep
+
+import numpy as np
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector, DWX_ZMQ_Quote_Board
+from python.modules.DWX_ZMQ_Command_Scheduler import DWX_ZMQ_Command_Scheduler
+from python.modules.DWX_ZMQ_Execution import DWX_ZMQ_Execution
+from python.modules.DWX_ZMQ_Flight_Recorder import DWX_ZMQ_Flight_Recorder
+from python.modules.DWX_ZMQ_PnL_Engine import DWX_ZMQ_PnL_Engine
+from python.modules.DWX_ZMQ_Risk_Gate import DWX_ZMQ_Risk_Gate
+from python.modules.DWX_ZMQ_Reporting import DWX_ZMQ_Reporting
+from python.modules.DWX_ZMQ_Stand_In_Server import DWX_ZMQ_Stand_In_Server
+from python.modules.DWX_ZMQ_Straddle_Evaluator import DWX_ZMQ_Straddle_Evaluator, TRAILING
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_RESULTS = os.path.join(_HERE, 'results')
+_COIN_FLIP = os.path.join(_HERE, '..', 'strategies', 'coin_flip_trader',
+                          'coin_flip_traders_v1.0.py')
+
+_SIZES = (10, 1000, 10000)
+
+# Fast round trips: poll every 0.5 ms, give up after 5 s
+_DELAY, _WBREAK = 0.0005, 10000
+
+# [(NAME, PARAMS, FACTORY)], FACTORY(PARAM) -> (CALL, TEARDOWN)
+_BENCHMARKS = []
+
+def _benchmark_(_name, _params=(None,)):
+
+    def _register_(_factory):
+        _BENCHMARKS.append((_name, _params, _factory))
+        return _factory
+
+    return _register_
+
+##############################################################################
+
+class _Stand_In():
+
+    """
+    Shared stand-in server (started on first use) and connector factory
+    """
+    _server = None
+
+    @classmethod
+    def _server_(cls):
+
+        if cls._server is None:
+            cls._server = DWX_ZMQ_Stand_In_Server()._start_()
+            cls._server._publish_('EURUSD', 1.10000, 1.10002)
+
+        return cls._server
+
+    @classmethod
+    def _connector_(cls):
+
+        cls._server_()
+
+        _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+        DWX_ZMQ_Command_Scheduler(_zmq, _max_rate=None)
+
+        # Let PUSH/PULL connect before the first command
+        sleep(0.2)
+
+        return _zmq
+
+    @classmethod
+    def _reset_book_(cls, _trades=0, _comment='EURUSD_Trader'):
+
+        _server = cls._server_()
+
+        with _server._lock:
+            _server._trades.clear()
+            for _i in range(_trades):
+                _server._open_(_i % 2, 'EURUSD', 0.0, 100, 100, _comment, 0.01, 123456)
+
+    @classmethod
+    def _stop_(cls):
+
+        if cls._server is not None:
+            cls._server._stop_()
+            cls._server = None
+
+def _shutdown_(_zmq):
+
+    _zmq._COMMAND_SCHEDULER._stop_(_flush=False)
+    _zmq._DWX_ZMQ_SHUTDOWN_()
+
+def _trades_(_n):
+
+    return {_i: {'_magic': 123456, '_symbol': 'EURUSD', '_lots': 0.01,
+                 '_type': _i % 2, '_open_price': 1.10002, '_open_time': '2020.05.18 10:00:00',
+                 '_SL': 1.09902, '_TP': 1.10102, '_pnl': -0.2,
+                 '_comment': 'EURUSD_Trader' if _i % 2 else 'GBPUSD_Trader'}
+            for _i in range(_n)}
+
+##############################################################################
+
+@_benchmark_('sub_parse')
+def _sub_parse_(_param):
+
+    _parse = DWX_ZeroMQ_Connector._DWX_ZMQ_PARSE_TICK_
+
+    return (lambda: _parse('EURUSD 1.10001;1.10003', ';')), None
+
+@_benchmark_('sub_tick')
+def _sub_tick_(_param):
+
+    # Connector without a terminal: nothing arrives on its own sockets
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+    _zmq._DWX_ZMQ_ADD_TICK_HANDLER_(lambda _s, _b, _a: None)
+
+    _msgs = ['SYM{:02d} 1.1000{};1.1001{}'.format(_i % 8, _i % 10, _i % 10)
+             for _i in range(64)]
+    _state = {'_i': 0}
+
+    def _call():
+        _state['_i'] = (_state['_i'] + 1) & 63
+        _zmq._DWX_ZMQ_ON_TICK_(_msgs[_state['_i']], ';')
+
+    return _call, _zmq._DWX_ZMQ_SHUTDOWN_
+
+@_benchmark_('quote_board', ('read', 'write'))
+def _quote_board_(_param):
+
+    _board = DWX_ZMQ_Quote_Board()
+
+    for _i in range(100):
+        _board._write_('SYM{:02d}'.format(_i), 1.1, 1.10002)
+
+    if _param == 'read':
+        return (lambda: _board._read_('SYM42')), None
+
+    return (lambda: _board._write_('SYM42', 1.1, 1.10002)), None
+
+@_benchmark_('quote_wait')
+def _quote_wait_(_param):
+
+    # A thread waiting for each next quote, as a trader would
+    _board = DWX_ZMQ_Quote_Board()
+    _seen = [0]
+    _woken = Event()
+    _state = {'_active': True}
+
+    def _waiter():
+        while _state['_active']:
+            _quote = _board._wait_('EURUSD', _seen[0], 0.1)
+            if _quote is not None:
+                _seen[0] = _quote[3]
+                _woken.set()
+
+    _thread = Thread(target=_waiter, daemon=True)
+    _thread.start()
+
+    def _call():
+        _woken.clear()
+        _board._write_('EURUSD', 1.1, 1.10002)
+        _woken.wait()
+
+    def _teardown():
+        _state['_active'] = False
+        _thread.join()
+
+    return _call, _teardown
+
+@_benchmark_('pull_decode', ('execution', 'open_trades'))
+def _pull_decode_(_param):
+
+    if _param == 'execution':
+        _msg = str({'_action': 'EXECUTION', '_magic': 123456, '_ticket': 85051741,
+                    '_open_price': 1.10002, '_sl': 1.09902, '_tp': 1.10102})
+    else:
+        _msg = str({'_action': 'OPEN_TRADES', '_trades': _trades_(100)})
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+
+    return (lambda: _zmq._DWX_ZMQ_ON_RESPONSE_(_msg)), _zmq._DWX_ZMQ_SHUTDOWN_
+
+@_benchmark_('execute_roundtrip')
+def _execute_roundtrip_(_param):
+
+    _zmq = _Stand_In._connector_()
+    _execution = DWX_ZMQ_Execution(_zmq)
+
+    _order = _zmq._generate_default_order_dict()
+    _order['_comment'] = 'EURUSD_Trader'
+
+    def _call():
+        _ret = _execution._execute_(dict(_order), False, _DELAY, _WBREAK)
+        _execution._execute_({'_action': 'CLOSE', '_ticket': _ret['_ticket'],
+                              '_comment': 'EURUSD_Trader'}, False, _DELAY, _WBREAK)
+
+    return _call, lambda: _shutdown_(_zmq)
+
+@_benchmark_('open_trades_frame', _SIZES)
+def _open_trades_frame_(_param):
+
+    _trades = _trades_(_param)
+    _frame = DWX_ZMQ_Reporting._open_trades_frame_
+
+    return (lambda: _frame(_trades, 'EURUSD_Trader')), None
+
+@_benchmark_('get_open_trades', _SIZES)
+def _get_open_trades_(_param):
+
+    _Stand_In._reset_book_(_param)
+
+    _zmq = _Stand_In._connector_()
+    _reporting = DWX_ZMQ_Reporting(_zmq)
+
+    def _call():
+        assert len(_reporting._get_open_trades_('EURUSD_Trader', _DELAY, _WBREAK)) == _param
+
+    def _teardown():
+        _shutdown_(_zmq)
+        _Stand_In._reset_book_()
+
+    return _call, _teardown
+
+@_benchmark_('strategy_step')
+def _strategy_step_(_param):
+
+    _Stand_In._server_()
+
+    _spec = importlib.util.spec_from_file_location('coin_flip_traders_v1_0', _COIN_FLIP)
+    _module = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_module)
+
+    # One symbol, trades never expire: the steady state cycle is a
+    # GET_OPEN_TRADES round trip plus the trader's own bookkeeping
+    _trader = _module.coin_flip_traders(_symbols=[('EURUSD', 0.01)],
+                                        _delay=_DELAY, _close_t_delta=3600)
+    DWX_ZMQ_Command_Scheduler(_trader._zmq, _max_rate=None)
+    sleep(0.2)
+
+    _order = _trader._zmq._generate_default_order_dict()
+    _order['_symbol'] = 'EURUSD'
+    _order['_comment'] = 'EURUSD_Trader'
+
+    def _call():
+        with _trader._lock:
+            assert _trader._trader_step_(('EURUSD', 0.01), 1, _order)
+
+    def _teardown():
+        _trader._wheel._stop_()
+        _shutdown_(_trader._zmq)
+        _Stand_In._reset_book_()
+
+    return _call, _teardown
+
+@_benchmark_('straddle_evaluate', (1, 100, 1000))
+def _straddle_evaluate_(_param):
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+    _evaluator = DWX_ZMQ_Straddle_Evaluator(_zmq, ['SYM{}'.format(_i) for _i in range(_param)],
+                                            _interval=3600)
+
+    for _symbol in _evaluator._symbols:
+        _evaluator._arm_(_symbol, 1, 2, 1.1012, 1.0988, 0.0012)
+    _evaluator._state[:] = TRAILING
+
+    # Random walk around the straddle, so both barriers get crossed
+    _rng = np.random.default_rng(0)
+    _rows = _rng.integers(0, _param, 1000)
+    _mids = 1.1 + np.cumsum(_rng.normal(0, 0.0002, 1000))
+
+    def _teardown():
+        _evaluator._stop_()
+        _zmq._DWX_ZMQ_SHUTDOWN_()
+
+    return (lambda: _evaluator._evaluate_(_rows, _mids)), _teardown
+
+@_benchmark_('pnl_tick', (1, 10, 100))
+def _pnl_tick_(_param):
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+    _pnl = DWX_ZMQ_PnL_Engine(_zmq, _subscribe=False)
+
+    # 10 symbols, 7 magics, 10 traders
+    _pnl._load_({_i: {'_symbol': 'SYM{}'.format(_i % 10), '_type': _i % 2, '_lots': 0.01,
+                      '_open_price': 1.1, '_magic': _i % 7, '_comment': 'T{}'.format(_i % 10)}
+                 for _i in range(10 * _param)})
+
+    _state = {'_i': 0}
+
+    def _call():
+        _state['_i'] = (_state['_i'] + 1) & 1023
+        _pnl._on_tick_('SYM3', 1.1 + _state['_i'] * 1e-6, 1.10002 + _state['_i'] * 1e-6)
+
+    return _call, _zmq._DWX_ZMQ_SHUTDOWN_
+
+@_benchmark_('risk_check')
+def _risk_check_(_param):
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+    _zmq._Curr_Bid_Ask['SYM3'] = (1.1, 1.10002)
+
+    # Every limit checked, none hit; 100 positions on 10 symbols
+    _gate = DWX_ZMQ_Risk_Gate(_zmq, _max_open_trades=1000, _max_lots=100.0,
+                              _max_notional=1e12, _max_orders_per_sec=1e9)
+    _gate._load_({_i: {'_symbol': 'SYM{}'.format(_i % 10), '_lots': 0.01, '_open_price': 1.1}
+                  for _i in range(100)})
+
+    # The error reply releases the reservation again
+    _reply = {'_action': 'EXECUTION', '_response': '134', '_response_value': 'ERROR'}
+
+    def _call():
+        _gate._check_('SYM3', 0.0, 0.01, 123456)
+        _gate._on_execution_(_reply)
+
+    return _call, _zmq._DWX_ZMQ_SHUTDOWN_
+
+@_benchmark_('flight_record')
+def _flight_record_(_param):
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-suite', _verbose=False)
+
+    # Small ring, so the benchmark wraps it many times
+    _recorder = DWX_ZMQ_Flight_Recorder(_zmq, _capacity=1 << 16, _max_frames=1 << 10,
+                                        _signals=(), _on_exception=False)
+    _frame = b'EURUSD 1.10001;1.10003'
+
+    def _teardown():
+        _recorder._stop_()
+        _zmq._DWX_ZMQ_SHUTDOWN_()
+
+    return (lambda: _recorder._record_('SUB', _frame)), _teardown
+
+##############################################################################
+
+def _time_(_call, _min_time, _repeat):
+
+    # Calibrate: calls per sample so that one sample lasts >= _min_time
+    _number = 1
+
+    while True:
+
+        _t = perf_counter()
+        for _i in range(_number):
+            _call()
+        _t = perf_counter() - _t
+
+        if _t >= _min_time:
+            break
+
+        _number *= 2 if _t == 0 else max(2, min(10, int(_min_time / _t) + 1))
+
+    _samples = []
+
+    for _r in range(_repeat):
+
+        _t = perf_counter()
+        for _i in range(_number):
+            _call()
+        _samples.append((perf_counter() - _t) / _number)
+
+    return {'_median': median(_samples),
+            '_min': min(_samples),
+            '_max': max(_samples),
+            '_number': _number,
+            '_repeat': _repeat}
+
+##############################################################################
+
+def _commit_():
+
+    try:
+        _commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_HERE,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+        _dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=_HERE, capture_output=True, text=True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    return _commit + ('-dirty' if _dirty else '')
+
+def _load_(_commit):
+
+    _path = os.path.join(_RESULTS, _commit + '.json')
+
+    if not os.path.exists(_path):
+        sys.exit('No results for {} in {}'.format(_commit, _RESULTS))
+
+    with open(_path) as _f:
+        return json.load(_f)
+
+##############################################################################
+
+def _run_(_args):
+
+    _commit = _commit_()
+    _results = {}
+
+    print('{:<32} {:>12} {:>12} {:>12}'.format('benchmark', 'median', 'min', 'max'))
+
+    try:
+        for _name, _params, _factory in _BENCHMARKS:
+            for _param in _params:
+
+                _key = _name if _param is None else '{}[{}]'.format(_name, _param)
+
+                if _args.filter and not re.search(_args.filter, _key):
+                    continue
+
+                _call, _teardown = _factory(_param)
+
+                try:
+                    _call() # warm up
+                    _results[_key] = _time_(_call, _args.min_time, _args.repeat)
+                finally:
+                    if _teardown is not None:
+                        _teardown()
+
+                _r = _results[_key]
+                print('{:<32} {:>10.2f}us {:>10.2f}us {:>10.2f}us'.format(
+                      _key, _r['_median'] * 1e6, _r['_min'] * 1e6, _r['_max'] * 1e6))
+    finally:
+        _Stand_In._stop_()
+
+    os.makedirs(_RESULTS, exist_ok=True)
+
+    _path = os.path.join(_RESULTS, _commit + '.json')
+
+    # Keep results of benchmarks not run this time (--filter)
+    if os.path.exists(_path):
+        with open(_path) as _f:
+            _results = dict(json.load(_f)['_results'], **_results)
+
+    with open(_path, 'w') as _f:
+        json.dump({'_commit': _commit,
+                   '_date': datetime.now(timezone.utc).isoformat(),
+                   '_machine': {'_python': platform.python_version(),
+                                '_platform': platform.platform(),
+                                '_cpus': os.cpu_count()},
+                   '_results': _results}, _f, indent=2, sort_keys=True)
+
+    print('\nResults -> {}'.format(_path))
+
+##############################################################################
+
+def _compare_(_base, _head, _threshold):
+
+    _base, _head = _load_(_base), _load_(_head)
+    _regressions = 0
+
+    print('{:<32} {:>12} {:>12} {:>8}'.format('benchmark', _base['_commit'], _head['_commit'], 'ratio'))
+
+    for _key in sorted(set(_base['_results']) | set(_head['_results'])):
+
+        _b = _base['_results'].get(_key)
+        _h = _head['_results'].get(_key)
+
+        if _b is None or _h is None:
+            print('{:<32} {:>12} {:>12}'.format(_key, '-' if _b is None else 'ok',
+                                                '-' if _h is None else 'ok'))
+            continue
+
+        _ratio = _h['_median'] / _b['_median']
+        _flag = ''
+
+        if _ratio > 1 + _threshold:
+            _flag = '  REGRESSION'
+            _regressions += 1
+        elif _ratio < 1 - _threshold:
+            _flag = '  faster'
+
+        print('{:<32} {:>10.2f}us {:>10.2f}us {:>8.2f}{}'.format(
+              _key, _b['_median'] * 1e6, _h['_median'] * 1e6, _ratio, _flag))
+
+    return _regressions
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--filter', help='only run benchmarks matching this regex')
+    _parser.add_argument('--min-time', type=float, default=0.2, help='seconds per sample')
+    _parser.add_argument('--repeat', type=int, default=5)
+    _parser.add_argument('--compare', nargs='+', metavar='COMMIT',
+                         help='compare BASE [HEAD] results instead of running')
+    _parser.add_argument('--threshold', type=float, default=0.10,
+                         help='slowdown ratio flagged as a regression')
+    _args = _parser.parse_args()
+
+    if _args.compare:
+        _head = _args.compare[1] if len(_args.compare) > 1 else _commit_()
+        sys.exit(1 if _compare_(_args.compare[0], _head, _args.threshold) else 0)
+
+    _run_(_args)
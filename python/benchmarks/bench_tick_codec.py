@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_tick_codec.py
+    --
+    Compression ratio and speed of the DWX_ZMQ_Tick_Codec tick files.
+
+    Sessions are tick files recorded with DWX_ZMQ_Tick_Recorder (--files),
+    or, without any, a synthetic EURUSD-like session of --ticks ticks: a
+    random walk of +/-3 points, a 1-3 point spread and exponential gaps of
+    --gap-ms between ticks, timestamped at --resolution.
+
+    Each session is re-encoded at every block size of --block-ticks and
+    compared with the raw float64/int64 layout (24 bytes a tick) and with
+    zlib (level 6) of that raw layout. Reported per run:
+
+        bytes/tick, ratio       encoded size, raw size / encoded size
+        encode, decode          Mticks/s writing / reading the whole file
+        seek                    reading 100 ticks at a random time (us)
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_tick_codec
+            [--files A.ticks,B.ticks] [--ticks 5000000]
+            [--resolution ns|us|ms] [--gap-ms 5] [--block-ticks 4096,16384,65536]
+            [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import zlib
+from time import perf_counter
+
+import numpy as np
+
+from python.modules.DWX_ZMQ_Tick_Codec import DWX_ZMQ_Tick_Writer, DWX_ZMQ_Tick_Reader
+
+_UNITS = {'ns': 1, 'us': 1000, 'ms': 1000000}
+
+##############################################################################
+
+def _synthetic_(_n, _resolution, _gap_ms, _seed=1):
+
+    _rng = np.random.default_rng(_seed)
+    _unit = _UNITS[_resolution]
+
+    _gaps = (_rng.exponential(_gap_ms * 1e6, _n) // _unit * _unit).astype(np.int64) + _unit
+    _ts = 1577836800 * 10**9 + np.cumsum(_gaps)
+
+    _bids = np.round(1.10000 + np.cumsum(_rng.integers(-3, 4, _n)) * 1e-5, 5)
+    _asks = np.round(_bids + _rng.choice([1e-5, 2e-5, 3e-5], _n, p=[0.1, 0.8, 0.1]), 5)
+
+    return _ts, _bids, _asks
+
+##############################################################################
+
+def _run_(_name, _ts, _bids, _asks, _block_ticks, _dir):
+
+    _n = len(_ts)
+    _path = os.path.join(_dir, 'bench.ticks')
+
+    _t = perf_counter()
+    _writer = DWX_ZMQ_Tick_Writer(_path, _name, _block_ticks=_block_ticks)
+    _writer._write_(_ts, _bids, _asks)
+    _writer._close_()
+    _encode = perf_counter() - _t
+
+    _size = os.path.getsize(_path)
+
+    _reader = DWX_ZMQ_Tick_Reader(_path)
+
+    _t = perf_counter()
+    _out = _reader._read_()
+    _decode = perf_counter() - _t
+
+    if not (np.array_equal(_out[0], _ts) and np.array_equal(_out[1], _bids)
+            and np.array_equal(_out[2], _asks)):
+        raise ValueError('[{}] decoded ticks differ from the originals'.format(_name))
+
+    # Random access: 100 ticks from anywhere in the session
+    _rng = np.random.default_rng(2)
+    _starts = _rng.integers(0, max(_n - 100, 1), 50)
+
+    _t = perf_counter()
+    for _i in _starts:
+        _reader._read_(_ts[_i], _ts[min(_i + 100, _n - 1)])
+    _seek = (perf_counter() - _t) / len(_starts)
+
+    return {'_session': _name,
+            '_codec': 'ticks[{}]'.format(_block_ticks),
+            '_ticks': _n,
+            '_bytes_per_tick': _size / _n,
+            '_ratio': 24.0 * _n / _size,
+            '_encode_mticks_s': _n / _encode / 1e6,
+            '_decode_mticks_s': _n / _decode / 1e6,
+            '_seek_us': _seek * 1e6}
+
+def _run_zlib_(_name, _ts, _bids, _asks):
+
+    _raw = np.rec.fromarrays((_ts, _bids, _asks), names='ts,bid,ask').tobytes()
+
+    _t = perf_counter()
+    _packed = zlib.compress(_raw, 6)
+    _encode = perf_counter() - _t
+
+    _t = perf_counter()
+    zlib.decompress(_packed)
+    _decode = perf_counter() - _t
+
+    _n = len(_ts)
+
+    return {'_session': _name,
+            '_codec': 'zlib(raw)',
+            '_ticks': _n,
+            '_bytes_per_tick': len(_packed) / _n,
+            '_ratio': len(_raw) / len(_packed),
+            '_encode_mticks_s': _n / _encode / 1e6,
+            '_decode_mticks_s': _n / _decode / 1e6,
+            '_seek_us': float('nan')}             # no random access
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--files', help='comma separated recorded tick files')
+    _parser.add_argument('--ticks', type=int, default=5000000, help='synthetic session length')
+    _parser.add_argument('--resolution', choices=sorted(_UNITS), default='ns',
+                         help='synthetic timestamp resolution')
+    _parser.add_argument('--gap-ms', type=float, default=5.0, help='synthetic mean tick gap')
+    _parser.add_argument('--block-ticks', default='4096,16384,65536',
+                         help='comma separated block sizes')
+    _parser.add_argument('--json', help='also write the results to this file')
+    _args = _parser.parse_args()
+
+    if _args.files:
+        _sessions = []
+        for _file in _args.files.split(','):
+            _reader = DWX_ZMQ_Tick_Reader(_file)
+            _sessions.append((os.path.basename(_file), *_reader._read_()))
+    else:
+        _sessions = [('synthetic-{}'.format(_args.resolution),
+                      *_synthetic_(_args.ticks, _args.resolution, _args.gap_ms))]
+
+    _results = []
+
+    with tempfile.TemporaryDirectory() as _dir:
+        for _name, _ts, _bids, _asks in _sessions:
+            for _block_ticks in _args.block_ticks.split(','):
+                _results.append(_run_(_name, _ts, _bids, _asks, int(_block_ticks), _dir))
+            _results.append(_run_zlib_(_name, _ts, _bids, _asks))
+
+    print('\n{:<24} {:<14} {:>10} {:>10} {:>7} {:>10} {:>10} {:>10}'.format(
+          'session', 'codec', 'ticks', 'bytes/tick', 'ratio', 'encode', 'decode', 'seek'))
+
+    for _r in _results:
+        _seek = '-' if np.isnan(_r['_seek_us']) else '{:.0f}us'.format(_r['_seek_us'])
+
+        print('{:<24} {:<14} {:>10} {:>10.2f} {:>6.2f}x {:>6.1f}Mt/s {:>6.1f}Mt/s {:>10}'.format(
+              _r['_session'][:24], _r['_codec'], _r['_ticks'], _r['_bytes_per_tick'],
+              _r['_ratio'], _r['_encode_mticks_s'], _r['_decode_mticks_s'], _seek))
+
+    if _args.json:
+        with open(_args.json, 'w') as _f:
+            json.dump({'_results': _results}, _f, indent=2)
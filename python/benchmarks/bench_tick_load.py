@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_tick_load.py
+    --
+    Synthetic tick load against DWX_ZeroMQ_Connector's SUB socket.
+
+    A publisher process binds a PUB socket on --port and sends "SYM bid;ask"
+    messages across --symbols symbols, with Poisson or bursty (on/off)
+    inter-arrival times, at each rate of --rates in turn. A fresh connector
+    subscribes to them; a tick handler records what arrives.
+
+    The quotes are synthetic: bid carries the per-symbol sequence number
+    (gaps = drops) and ask the publisher's wall clock send time (consumer
+    lag = receive time - ask).
+
+    For each offered rate it reports the achieved publish rate, the
+    consumed rate, drop %, consumer lag p50/p99/max and the backlog
+    (published - consumed) at its peak and at the end of the run, which
+    together give the connector's saturation curve, plus the poll thread's
+    wake-up jitter (_DWX_ZMQ_JITTER_REPORT_).
+
+    --busy-poll runs the connector in its spinning low latency mode,
+    --poll-cpus / --poll-priority pin its poll thread / raise its priority.
+
+    --hot F sends a fraction F of the messages to SYM000 (a news spike),
+    the other symbols sharing the rest; 'cold p99' is then the lag of the
+    other symbols. --shards N ingests through N DWX_ZMQ_Sharded_Ingest
+    thread shards instead of the poll thread, rebalanced every second.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_tick_load
+            [--rates 1000,10000,100000] [--symbols 8] [--duration 5]
+            [--pattern poisson|bursty] [--burst 100] [--busy-poll]
+            [--poll-cpus 2,3] [--poll-priority -10] [--hot 0.8]
+            [--shards 2] [--json out.json]
+"""
+
+import argparse
+import json
+import random
+import zmq
+from multiprocessing import Process, Value, Event
+from time import sleep, time, perf_counter
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector
+from python.modules.DWX_ZMQ_Sharded_Ingest import DWX_ZMQ_Sharded_Ingest
+
+##############################################################################
+
+# Nearest rank percentile of sorted _values, never beyond the samples
+def _percentile_(_values, _p):
+    return _values[min(len(_values) - 1, int(len(_values) * _p / 100.0))]
+
+##############################################################################
+
+def _publisher_(_port, _symbols, _rate, _duration, _pattern, _burst, _hot,
+                _published, _elapsed, _ready, _go):
+
+    _context = zmq.Context()
+
+    _socket = _context.socket(zmq.PUB)
+    _socket.setsockopt(zmq.SNDHWM, 0)   # never drop on our side: drops are the consumer's
+    _socket.bind('tcp://*:{}'.format(_port))
+
+    _seq = [0] * len(_symbols)
+    _ready.set()
+    _go.wait()
+
+    _start = perf_counter()
+    _next = _start
+    _end = _start + _duration
+    _sent = 0
+
+    while True:
+
+        # Next arrival time: Poisson = exponential gaps at _rate, bursty =
+        # _burst messages back to back then a pause keeping the mean rate
+        if _pattern == 'poisson':
+            _next += random.expovariate(_rate)
+        elif _sent % _burst == 0:
+            _next += _burst / _rate
+
+        if _next >= _end:
+            break
+
+        # Spin, the gaps are far below sleep() resolution at high rates
+        while perf_counter() < _next:
+            pass
+
+        if _hot:
+            _i = 0 if random.random() < _hot else 1 + _sent % (len(_symbols) - 1)
+        else:
+            _i = _sent % len(_symbols)
+        _seq[_i] += 1
+
+        _socket.send_string('{} {};{!r}'.format(_symbols[_i], _seq[_i], time()))
+
+        _sent += 1
+
+        if _sent & 0xff == 0:
+            _published.value = _sent
+
+    _published.value = _sent
+    _elapsed.value = perf_counter() - _start
+
+    # Let queued messages leave before closing
+    _socket.setsockopt(zmq.LINGER, 5000)
+    _socket.close()
+    _context.term()
+
+##############################################################################
+
+class _Tick_Recorder():
+
+    """
+    Tick handler counting arrivals, sequence gaps and lag per tick (also
+    for the symbols other than _hot on their own)
+    """
+    def __init__(self, _hot=None):
+
+        self._received = 0
+        self._gaps = 0
+        self._last_seq = {}
+        self._lags = []
+        self._hot = _hot
+        self._cold_lags = []
+
+    def __call__(self, _symbol, _bid, _ask):
+
+        _lag = time() - _ask
+        self._lags.append(_lag)
+        self._received += 1
+
+        if _symbol != self._hot:
+            self._cold_lags.append(_lag)
+
+        _seq = int(_bid)
+        _last = self._last_seq.get(_symbol, 0)
+
+        if _seq != _last + 1:
+            self._gaps += _seq - _last - 1
+
+        self._last_seq[_symbol] = _seq
+
+##############################################################################
+
+def _run_rate_(_rate, _args):
+
+    _symbols = ['SYM{:03d}'.format(_i) for _i in range(_args.symbols)]
+
+    _published = Value('q', 0, lock=False)
+    _elapsed = Value('d', 0.0, lock=False)
+    _ready, _go = Event(), Event()
+
+    _publisher = Process(target=_publisher_,
+                         args=(_args.port, _symbols, _rate, _args.duration,
+                               _args.pattern, _args.burst, _args.hot, _published,
+                               _elapsed, _ready, _go))
+    _publisher.start()
+    _ready.wait()
+
+    _zmq = DWX_ZeroMQ_Connector(_ClientID='bench-tick-load', _SUB_PORT=_args.port,
+                                _verbose=False, _busy_poll=_args.busy_poll,
+                                _poll_cpus=_args.poll_cpus, _poll_priority=_args.poll_priority)
+
+    _recorder = _Tick_Recorder(_symbols[0])
+    _zmq._DWX_ZMQ_ADD_TICK_HANDLER_(_recorder)
+
+    _shards = None if not _args.shards else \
+        DWX_ZMQ_Sharded_Ingest(_zmq, _shards=_args.shards, _verbose=False)
+
+    for _symbol in _symbols:
+        _zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_symbol)
+
+    # Slow joiner: give the subscriptions time to reach the publisher
+    sleep(0.5)
+
+    _zmq._DWX_ZMQ_JITTER_REPORT_(_reset=True)
+    _go.set()
+    _t0 = perf_counter()
+
+    # Backlog samples while publishing
+    _backlog = []
+
+    while _publisher.is_alive():
+        _backlog.append(_published.value - _recorder._received)
+        sleep(0.05)
+
+        # Rates are measured over >= 1s windows, more often is a no-op
+        if _shards is not None:
+            _shards._rebalance_()
+
+    _backlog_end = _published.value - _recorder._received
+
+    # Drain: wait until nothing has arrived for a while
+    _last, _idle = -1, perf_counter()
+
+    while perf_counter() - _idle < 0.5 and perf_counter() - _t0 < _elapsed.value + _args.drain:
+        if _recorder._received != _last:
+            _last, _idle = _recorder._received, perf_counter()
+        sleep(0.05)
+
+    _jitter = _zmq._DWX_ZMQ_JITTER_REPORT_()
+    _zmq._DWX_ZMQ_SHUTDOWN_()
+
+    _sent = _published.value
+    _lags = sorted(_recorder._lags) or [0.0]
+    _cold = sorted(_recorder._cold_lags) or [0.0]
+
+    return {'_offered_rate': _rate,
+            '_published': _sent,
+            '_received': _recorder._received,
+            '_publish_rate': _sent / max(_elapsed.value, 1e-9),
+            '_consume_rate': _recorder._received / max(perf_counter() - _t0, 1e-9),
+            '_drop_pct': 100.0 * (_sent - _recorder._received) / max(_sent, 1),
+            '_gaps': _recorder._gaps,
+            '_lag_p50_ms': _percentile_(_lags, 50) * 1e3,
+            '_lag_p99_ms': _percentile_(_lags, 99) * 1e3,
+            '_lag_max_ms': _lags[-1] * 1e3,
+            '_cold_lag_p99_ms': _percentile_(_cold, 99) * 1e3,
+            '_backlog_max': max(_backlog + [_backlog_end]),
+            '_backlog_end': _backlog_end,
+            '_jitter_p50_us': _jitter['_p50_ns'] / 1e3,
+            '_jitter_p99_us': _jitter['_p99_ns'] / 1e3,
+            '_jitter_max_us': _jitter['_max_ns'] / 1e3}
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--rates', default='1000,5000,20000,100000,300000',
+                         help='comma separated offered rates (msg/s)')
+    _parser.add_argument('--symbols', type=int, default=8)
+    _parser.add_argument('--duration', type=float, default=5.0, help='seconds per rate')
+    _parser.add_argument('--pattern', choices=('poisson', 'bursty'), default='poisson')
+    _parser.add_argument('--burst', type=int, default=100, help='messages per burst')
+    _parser.add_argument('--drain', type=float, default=10.0,
+                         help='max seconds to wait for the consumer to catch up')
+    _parser.add_argument('--port', type=int, default=32770)
+    _parser.add_argument('--busy-poll', action='store_true', help='spinning poll thread')
+    _parser.add_argument('--poll-cpus', type=lambda _s: {int(_c) for _c in _s.split(',')},
+                         help='comma separated CPUs for the poll thread')
+    _parser.add_argument('--poll-priority', type=int, help='poll thread nice value')
+    _parser.add_argument('--hot', type=float, default=0.0,
+                         help='fraction of the messages for SYM000 (0 = round robin)')
+    _parser.add_argument('--shards', type=int, default=0,
+                         help='ingest through this many thread shards (0 = poll thread)')
+    _parser.add_argument('--json', help='also write the results to this file')
+    _args = _parser.parse_args()
+
+    # The hot symbol's share is taken off the others: there must be some
+    if _args.hot and _args.symbols < 2:
+        _parser.error('--hot needs --symbols 2 or more')
+
+    _results = [_run_rate_(int(_r), _args) for _r in _args.rates.split(',')]
+
+    print('\n{:>9} {:>10} {:>10} {:>7} {:>9} {:>9} {:>9} {:>9} {:>10} {:>10} {:>10} {:>10}'.format(
+          'offered', 'published', 'consumed', 'drop %', 'lag p50', 'lag p99',
+          'lag max', 'cold p99', 'backlog', 'backlog@end', 'jitter p99', 'jitter max'))
+
+    for _r in _results:
+        print('{:>9} {:>10.0f} {:>10.0f} {:>7.2f} {:>7.1f}ms {:>7.1f}ms {:>7.1f}ms {:>7.1f}ms {:>10} {:>10} {:>8.0f}us {:>8.0f}us'.format(
+              _r['_offered_rate'], _r['_publish_rate'], _r['_consume_rate'], _r['_drop_pct'],
+              _r['_lag_p50_ms'], _r['_lag_p99_ms'], _r['_lag_max_ms'], _r['_cold_lag_p99_ms'],
+              _r['_backlog_max'], _r['_backlog_end'],
+              _r['_jitter_p99_us'], _r['_jitter_max_us']))
+
+    if _args.json:
+        with open(_args.json, 'w') as _f:
+            json.dump({'_pattern': _args.pattern, '_symbols': _args.symbols,
+                       '_duration': _args.duration, '_busy_poll': _args.busy_poll,
+                       '_hot': _args.hot, '_shards': _args.shards,
+                       '_results': _results}, _f, indent=2)
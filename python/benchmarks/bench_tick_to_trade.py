@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+    bench_tick_to_trade.py
+    --
+    End-to-end tick-to-trade latency of scalper_trader_v5: from the
+    terminal publishing a quote that breaks a straddle barrier to the
+    resulting CLOSE/MODIFY arriving back at the terminal.
+
+    A DWX_ZMQ_Stand_In_Server runs in its own process (on the default
+    ports 32768-32770, so no terminal may be listening there) and plays
+    the terminal. The real scalper_trader runs in this process against a
+    one-event calendar: its traders place their straddles, the news comes
+    out and every symbol starts trailing.
+
+    The stand-in then publishes --rounds trigger rounds, --gap seconds
+    apart. In round k every symbol gets a quote k+1 points above its high
+    barrier (a new extreme, so a trailing MODIFY is due; in round 0 the
+    sell-stop CLOSE too), spread over --spread of the gap (0 = all symbols
+    at once, as on a real release). Background quotes sitting exactly on
+    the high barrier (no action due) are published at --rate msg/s in
+    between.
+
+    Trigger publish times and command arrival times are both taken in the
+    stand-in's process. The latency of a trigger is the time to the first
+    CLOSE/MODIFY for that symbol's tickets to arrive after it (one MODIFY
+    may answer several rounds when the scheduler coalesces them). A
+    trigger followed by no command at all counts as missed.
+
+    Each combination of --symbols and --rates is run with a fresh
+    stand-in and strategy; p50/p99/p99.9/max are reported (nearest rank,
+    p99.9 only from 1000 triggers on).
+
+    --busy-poll runs the strategy in its low latency mode (spinning poll
+    thread, trailing evaluated on tick), pinned to --poll-cpus /
+    --trader-cpus if given.
+
+    Usage (from the repository root):
+        python -m python.benchmarks.bench_tick_to_trade
+            [--symbols 1,10,100] [--rates 0,1000] [--rounds 200]
+            [--gap 0.05] [--spread 0.5] [--trail-interval 0.1]
+            [--max-rate N] [--busy-poll] [--poll-cpus 2] [--trader-cpus 3]
+            [--json out.json] [--verbose]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+from bisect import bisect_left
+from multiprocessing import Process, Queue, Event
+from time import sleep, time, time_ns, perf_counter
+
+from python.modules.DWX_ZMQ_News_Calendar import DWX_ZMQ_News_Calendar
+from python.strategies.scalper_strategy_v5.scalper_trader_v5 import scalper_trader
+
+_CENTRE = 1.10000
+_B_HEIGHT = 0.0012
+_HIGH = _CENTRE + _B_HEIGHT
+_POINT = 0.00001
+_SPREAD = 0.00002
+
+##############################################################################
+
+def _publish_(_server, _symbol, _mid):
+    _server._publish_(_symbol, _mid - _SPREAD / 2, _mid + _SPREAD / 2)
+
+# Nearest rank percentile of sorted _values, never beyond the samples
+def _percentile_(_values, _p):
+    return _values[min(len(_values) - 1, int(len(_values) * _p / 100.0))]
+
+def _stand_in_(_symbols, _rate, _rounds, _gap, _spread, _ready, _go, _results):
+
+    from python.modules.DWX_ZMQ_Stand_In_Server import DWX_ZMQ_Stand_In_Server
+
+    # (TIME_NS, ACTION, TICKET) of every CLOSE/MODIFY received
+    _commands = []
+
+    def _hook(_msg, _t):
+        _fields = _msg.split(';')
+        if _fields[1] in ('CLOSE', 'MODIFY'):
+            _commands.append((_t, _fields[1], int(_fields[-1])))
+
+    _server = DWX_ZMQ_Stand_In_Server(_command_hook=_hook)._start_()
+    _ready.set()
+
+    # Quote the centre until the straddles are in and trailing (slowly:
+    # a SUB backlog would delay the triggers)
+    while not _go.wait(0.5):
+        for _symbol in _symbols:
+            _publish_(_server, _symbol, _CENTRE)
+
+    # Schedule: [(OFFSET_S, SYMBOL, ROUND)], ROUND None = background quote
+    _schedule = []
+
+    for _k in range(_rounds):
+        _order = random.sample(_symbols, len(_symbols))
+        for _i, _symbol in enumerate(_order):
+            _schedule.append((_k * _gap + _i * _gap * _spread / len(_symbols), _symbol, _k))
+
+    if _rate > 0:
+        _t = random.expovariate(_rate)
+        while _t < _rounds * _gap:
+            _schedule.append((_t, random.choice(_symbols), None))
+            _t += random.expovariate(_rate)
+
+    _schedule.sort(key=lambda _s: _s[0])
+
+    # (TIME_NS, SYMBOL, ROUND) of every trigger
+    _triggers = []
+
+    _start = perf_counter()
+
+    for _offset, _symbol, _k in _schedule:
+
+        # Spin, the gaps are far below sleep() resolution at high rates
+        while perf_counter() - _start < _offset:
+            pass
+
+        if _k is None:
+            _publish_(_server, _symbol, _HIGH)
+        else:
+            _triggers.append((time_ns(), _symbol, _k))
+            _publish_(_server, _symbol, _HIGH + (_k + 1) * _POINT)
+
+    # Let the last round's commands arrive
+    sleep(max(_gap, 0.5))
+
+    _server._stop_()
+    _results.put((_triggers, _commands))
+
+##############################################################################
+
+def _run_(_n, _rate, _args):
+
+    _symbols = ['SYM{:03d}'.format(_i) for _i in range(_n)]
+
+    _ready, _go, _results = Event(), Event(), Queue()
+
+    _process = Process(target=_stand_in_,
+                       args=(_symbols, _rate, _args.rounds, _args.gap, _args.spread,
+                             _ready, _go, _results))
+    _process.start()
+    _ready.wait()
+
+    _quiet = contextlib.nullcontext() if _args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    with tempfile.TemporaryDirectory() as _dir, _quiet:
+
+        # News in 2 s: straddles go in after 1 s, trailing starts at 2 s
+        _calendar = DWX_ZMQ_News_Calendar._from_newstime_(time() + 2, _symbols)
+
+        _trader = scalper_trader(_symbols=[(_s, 0.01) for _s in _symbols],
+                                 _delay=0.01,
+                                 _calendar=_calendar,
+                                 _b_height=_B_HEIGHT,
+                                 _pre_event=1,
+                                 _post_event=3600,
+                                 _max_commands_per_sec=_args.max_rate,
+                                 _trail_interval=_args.trail_interval,
+                                 _snapshot_path=os.path.join(_dir, 'bench.state.npy'),
+                                 _busy_poll=_args.busy_poll,
+                                 _poll_cpus=_args.poll_cpus,
+                                 _trader_cpus=_args.trader_cpus)
+        _trader._run_()
+
+        _evaluator = _trader._evaluator
+        _deadline = perf_counter() + 30 + 0.05 * _n
+
+        while _evaluator._stats_()['_trailing'] < _n and perf_counter() < _deadline:
+            sleep(0.05)
+
+        _trailing = _evaluator._stats_()['_trailing']
+
+        _go.set()
+        _triggers, _commands = _results.get()
+        _process.join()
+
+        # Tickets of each symbol's straddle
+        _owner = {}
+        for _i, _symbol in enumerate(_evaluator._symbols):
+            _owner[int(_evaluator._buy[_i])] = _symbol
+            _owner[int(_evaluator._sell[_i])] = _symbol
+
+        _trader._stop_()
+        _trader._scheduler._stop_()
+        _trader._zmq._DWX_ZMQ_SHUTDOWN_()
+
+    if _trailing < _n:
+        print('[{} symbols] only {} straddles trailing, results cover those'.format(_n, _trailing))
+
+    # Command arrival times per symbol
+    _arrivals = {_s: [] for _s in _symbols}
+    for _t, _action, _ticket in _commands:
+        if _ticket in _owner:
+            _arrivals[_owner[_ticket]].append(_t)
+
+    for _times in _arrivals.values():
+        _times.sort()
+
+    _latencies = []
+    _missed = 0
+
+    for _t, _symbol, _k in _triggers:
+
+        _times = _arrivals[_symbol]
+        _i = bisect_left(_times, _t)
+
+        if _i < len(_times):
+            _latencies.append((_times[_i] - _t) / 1e6)
+        else:
+            _missed += 1
+
+    _lat = sorted(_latencies) or [0.0]
+
+    return {'_symbols': _n,
+            '_rate': _rate,
+            '_triggers': len(_triggers),
+            '_commands': len(_commands),
+            '_missed': _missed,
+            '_p50_ms': _percentile_(_lat, 50),
+            '_p99_ms': _percentile_(_lat, 99),
+            '_p999_ms': _percentile_(_lat, 99.9) if len(_latencies) >= 1000 else None,
+            '_max_ms': _lat[-1]}
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--symbols', default='1,10,100',
+                         help='comma separated symbol counts')
+    _parser.add_argument('--rates', default='0,1000',
+                         help='comma separated background quote rates (msg/s)')
+    _parser.add_argument('--rounds', type=int, default=200, help='trigger rounds per run')
+    _parser.add_argument('--gap', type=float, default=0.05, help='seconds between rounds')
+    _parser.add_argument('--spread', type=float, default=0.5,
+                         help='fraction of the gap a round is spread over')
+    _parser.add_argument('--trail-interval', type=float, default=0.1,
+                         help="straddle evaluator's _interval (s)")
+    _parser.add_argument('--max-rate', type=float, default=None,
+                         help='command scheduler rate limit (default: unlimited)')
+    _parser.add_argument('--busy-poll', action='store_true', help='low latency mode')
+    _parser.add_argument('--poll-cpus', type=lambda _s: {int(_c) for _c in _s.split(',')},
+                         help="comma separated CPUs for the connector's poll thread")
+    _parser.add_argument('--trader-cpus', type=lambda _s: {int(_c) for _c in _s.split(',')},
+                         help='comma separated CPUs for the trader / evaluator threads')
+    _parser.add_argument('--json', help='also write the results to this file')
+    _parser.add_argument('--verbose', action='store_true',
+                         help="show the strategy's output")
+    _args = _parser.parse_args()
+
+    _results = [_run_(int(_n), int(_r), _args)
+                for _n in _args.symbols.split(',')
+                for _r in _args.rates.split(',')]
+
+    print('\n{:>8} {:>8} {:>9} {:>7} {:>10} {:>10} {:>10} {:>10}'.format(
+          'symbols', 'rate', 'triggers', 'missed', 'p50', 'p99', 'p99.9', 'max'))
+
+    for _r in _results:
+        _p999 = 'n/a' if _r['_p999_ms'] is None else '{:.2f}ms'.format(_r['_p999_ms'])
+        print('{:>8} {:>8} {:>9} {:>7} {:>8.2f}ms {:>8.2f}ms {:>10} {:>8.2f}ms'.format(
+              _r['_symbols'], _r['_rate'], _r['_triggers'], _r['_missed'],
+              _r['_p50_ms'], _r['_p99_ms'], _p999, _r['_max_ms']))
+
+    if _args.json:
+        with open(_args.json, 'w') as _f:
+            json.dump({'_rounds': _args.rounds, '_gap': _args.gap, '_spread': _args.spread,
+                       '_trail_interval': _args.trail_interval, '_max_rate': _args.max_rate,
+                       '_busy_poll': _args.busy_poll, '_results': _results}, _f, indent=2)
+
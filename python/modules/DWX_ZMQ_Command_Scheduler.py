@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Command_Scheduler.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+from collections import deque, OrderedDict
+from threading import Thread, Condition
+from time import monotonic, monotonic_ns
+
+# Actions that remove a ticket - any pending MODIFY for it becomes pointless.
+# Not CLOSE_MAGIC: a MODIFY doesn't carry its ticket's magic number, so the
+# MODIFYs it makes pointless can't be told apart (they just fail).
+_CLOSE_ACTIONS = ('CLOSE', 'CLOSE_PARTIAL', 'CLOSE_ALL')
+
+class DWX_ZMQ_Command_Scheduler():
+
+    """
+    Outbound command queue in front of the connector's PUSH socket.
+
+        - Commands other than MODIFY keep their FIFO order and go out
+          ahead of pending MODIFYs, so a CLOSE never waits behind a burst
+          of trailing stop updates. A MODIFY that has waited
+          _max_modify_age seconds goes next, though, so a steady flow of
+          OPENs/CLOSEs at the rate limit can't hold a stop back forever.
+        - Only the newest pending MODIFY (SL/TP) per ticket is kept; a
+          CLOSE for the ticket discards it altogether.
+        - At most _max_rate commands per second are sent (token bucket of
+          _burst commands; None disables the limit).
+        - EAGAIN / missing handshake never drops a command: it stays at
+          the head of the queue and is retried with backoff.
+
+    Installing the scheduler routes every remote_send() on the PUSH socket
+    through it, so the strategies don't need to change:
+
+        _scheduler = DWX_ZMQ_Command_Scheduler(self._zmq, _max_rate=10)
+    """
+    def __init__(self, _zmq,
+                 _max_rate=20.0,            # Commands per second (None = unlimited)
+                 _max_modify_age=1.0,       # Longest a MODIFY waits behind other commands (s)
+                 _burst=5,                  # Commands allowed back to back
+                 _retry_delay=0.001,        # First retry after EAGAIN (s)
+                 _max_retry_delay=0.1):     # Retry backoff cap (s)
+
+        self._zmq = _zmq
+        self._max_rate = _max_rate
+        self._max_modify_age = _max_modify_age
+        self._burst = _burst
+        self._retry_delay = _retry_delay
+        self._max_retry_delay = _max_retry_delay
+
+        # Pending commands
+        self._commands = deque()            # FIFO of non-MODIFY messages
+        self._modifies = OrderedDict()      # {TICKET: (latest MODIFY message, first queued at)}
+
+        self._cond = Condition()
+
+        # Token bucket
+        self._tokens = float(_burst)
+        self._last_refill = monotonic()
+
+        # Counters
+        self._sent = 0
+        self._coalesced = 0
+        self._superseded = 0
+        self._retries = 0
+
+        self._ACTIVE = True
+
+        self._thread = Thread(name='DWX_ZMQ_Command_Scheduler', target=self._send_loop_)
+        self._thread.daemon = True
+        self._thread.start()
+
+        # From now on remote_send() on the PUSH socket queues here
+        self._zmq._COMMAND_SCHEDULER = self
+
+    ##########################################################################
+
+    """
+    Queue a raw command string (called by the connector's remote_send())
+    """
+    def _enqueue_(self, _data):
+
+        _fields = _data.split(';')
+        _action = _fields[1] if _fields[0] == 'TRADE' and len(_fields) > 1 else None
+
+        with self._cond:
+
+            if _action == 'MODIFY' and len(_fields) > 10:
+
+                _ticket = _fields[10]
+
+                _queued = self._modifies.get(_ticket)
+
+                if _queued is not None:
+                    self._coalesced += 1
+
+                # Newest SL/TP wins, position (and age) in the queue is kept
+                self._modifies[_ticket] = (_data, monotonic() if _queued is None else _queued[1])
+
+            else:
+
+                if _action in _CLOSE_ACTIONS:
+                    self._drop_modifies_(_action, _fields[10] if len(_fields) > 10 else None)
+
+                elif _action == 'BATCH' and len(_fields) > 4:
+
+                    # ACTION,TICKET,SL,TP,LOTS|..
+                    for _item in _fields[4].split('|'):
+                        _parts = _item.split(',')
+                        self._drop_modifies_(_parts[0], _parts[1] if len(_parts) > 1 else None)
+
+                self._commands.append(_data)
+
+            self._cond.notify()
+
+    ##########################################################################
+
+    def _drop_modifies_(self, _action, _ticket):
+
+        if _action in ('CLOSE', 'CLOSE_PARTIAL'):
+
+            # CLOSE_PARTIAL leaves the ticket open, its MODIFY still applies
+            if _action == 'CLOSE' and self._modifies.pop(_ticket, None):
+                self._superseded += 1
+
+        elif _action == 'CLOSE_ALL':
+
+            self._superseded += len(self._modifies)
+            self._modifies.clear()
+
+    ##########################################################################
+
+    def _next_(self):
+
+        # Called with self._cond held
+        if self._modifies and self._max_modify_age is not None:
+
+            # The oldest MODIFY has waited long enough: it goes first
+            _ticket, (_data, _queued_at) = next(iter(self._modifies.items()))
+
+            if monotonic() - _queued_at >= self._max_modify_age:
+                del self._modifies[_ticket]
+                return _data
+
+        if self._commands:
+            return self._commands.popleft()
+
+        if self._modifies:
+            return self._modifies.popitem(last=False)[1][0]
+
+        return None
+
+    ##########################################################################
+
+    def _wait_for_token_(self):
+
+        if self._max_rate is None:
+            return
+
+        while self._ACTIVE:
+
+            _now = monotonic()
+            self._tokens = min(float(self._burst),
+                               self._tokens + (_now - self._last_refill) * self._max_rate)
+            self._last_refill = _now
+
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+
+            with self._cond:
+                self._cond.wait((1.0 - self._tokens) / self._max_rate)
+
+    ##########################################################################
+
+    def _send_(self, _data):
+
+        _delay = self._retry_delay
+
+        while self._ACTIVE:
+
+            if self._zmq._PUSH_SOCKET_STATUS['state'] == True:
+                try:
+                    # Lock: the socket may be rebuilt by a reconnect
+                    with self._zmq._PUSH_LOCK:
+                        _frame = _data.encode('utf-8')
+                        _sent_ns = monotonic_ns()
+                        self._zmq._PUSH_SOCKET.send(_frame, zmq.DONTWAIT)
+                        if self._zmq._FLIGHT_RECORDER is not None:
+                            self._zmq._FLIGHT_RECORDER._record_('PUSH', _frame, _sent_ns)
+                    self._sent += 1
+                    return True
+
+                except zmq.error.Again:
+                    pass # HWM reached, back off and retry
+
+            self._retries += 1
+
+            with self._cond:
+                self._cond.wait(_delay)
+
+            _delay = min(_delay * 2, self._max_retry_delay)
+
+        return False
+
+    ##########################################################################
+
+    def _send_loop_(self):
+
+        while self._ACTIVE:
+
+            with self._cond:
+
+                while self._ACTIVE and not (self._commands or self._modifies):
+                    self._cond.wait()
+
+                if not self._ACTIVE:
+                    break
+
+            self._wait_for_token_()
+
+            with self._cond:
+                _data = self._next_()
+
+            if _data is None:
+                continue
+
+            if not self._send_(_data):
+
+                # Stopped while retrying, keep it for _pending_()
+                with self._cond:
+                    self._commands.appendleft(_data)
+
+        print("\n++ [KERNEL] _DWX_ZMQ_Command_Scheduler_() Signing Out ++")
+
+    ##########################################################################
+
+    """
+    Number of commands still waiting to be sent
+    """
+    def _pending_(self):
+
+        with self._cond:
+            return len(self._commands) + len(self._modifies)
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        return {'_sent': self._sent,
+                '_pending': self._pending_(),
+                '_coalesced': self._coalesced,
+                '_superseded': self._superseded,
+                '_retries': self._retries}
+
+    ##########################################################################
+
+    """
+    Stop the send thread, by default after flushing what's queued
+    """
+    def _stop_(self, _flush=True, _timeout=5.0):
+
+        if _flush:
+            _deadline = monotonic() + _timeout
+            while self._pending_() > 0 and monotonic() < _deadline:
+                with self._cond:
+                    self._cond.wait(0.01)
+
+        with self._cond:
+            self._ACTIVE = False
+            self._cond.notify_all()
+
+        self._thread.join()
+
+        if self._zmq._COMMAND_SCHEDULER is self:
+            self._zmq._COMMAND_SCHEDULER = None
+
+    ##########################################################################
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Connection_Manager.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+from threading import Lock
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector
+
+class DWX_ZMQ_Connection_Manager():
+
+    """
+    Pool of DWX_ZeroMQ_Connector objects sharing a single zmq.Context.
+
+    Each MetaTrader terminal (host + PUSH/PULL/SUB port triple) gets exactly
+    one connector (i.e. one socket set and one poller thread), no matter
+    how many strategies use it. Commands can be routed to a terminal by
+    name, by account number or by symbol.
+
+    MetaTrader's replies aren't tagged, so strategies sharing a connector
+    take turns: DWX_ZMQ_Execution and DWX_ZMQ_Reporting hold the
+    connector's _REQUEST_LOCK from request to reply.
+
+    A strategy given a manager trades all its symbols through one
+    connector, so they must route to the same terminal; its _stop_()
+    hands the connector back with _release_().
+    """
+    def __init__(self,
+                 _verbose=False,            # Print ZeroMQ messages
+                 _poll_timeout=10,          # ZMQ Poller Timeout (ms)
+                 _sleep_delay=0.001,        # 1 ms for time.sleep()
+                 _monitor=False):           # Experimental ZeroMQ Socket Monitoring
+
+        # One ZeroMQ Context for every terminal in this process
+        self._ZMQ_CONTEXT = zmq.Context()
+
+        # Connector defaults
+        self._verbose = _verbose
+        self._poll_timeout = _poll_timeout
+        self._sleep_delay = _sleep_delay
+        self._monitor = _monitor
+
+        # Terminal configurations ({NAME: {kwargs for DWX_ZeroMQ_Connector}})
+        self._terminals = {}
+
+        # Live connectors and their reference counts ({NAME: ...})
+        self._connectors = {}
+        self._refcounts = {}
+
+        # Routing tables ({ACCOUNT: NAME} and {SYMBOL: NAME})
+        self._account_routes = {}
+        self._symbol_routes = {}
+
+        # Terminal used when no route matches
+        self._default_terminal = None
+
+        # lock for acquire/release of pooled connectors
+        self._lock = Lock()
+
+    ##########################################################################
+
+    """
+    Register a MetaTrader terminal (host + port triple) under a unique name
+    """
+    def _add_terminal_(self, _name,
+                       _host='localhost',
+                       _protocol='tcp',
+                       _PUSH_PORT=32768,
+                       _PULL_PORT=32769,
+                       _SUB_PORT=32770,
+                       _account=None,       # Account number traded on this terminal
+                       _symbols=(),         # Symbols routed to this terminal
+                       _ClientID=None,
+                       _default=False):
+
+        with self._lock:
+
+            if _name in self._terminals:
+                raise ValueError("[MANAGER] Terminal {} already registered".format(_name))
+
+            # Two terminals can't listen on the same endpoint
+            for _other, _cfg in self._terminals.items():
+                if (_cfg['_host'] == _host
+                    and {_PUSH_PORT, _PULL_PORT, _SUB_PORT} & {_cfg['_PUSH_PORT'],
+                                                              _cfg['_PULL_PORT'],
+                                                              _cfg['_SUB_PORT']}):
+                    raise ValueError("[MANAGER] Ports of {} clash with terminal {}".format(_name, _other))
+
+            self._terminals[_name] = {'_ClientID': _ClientID or 'dwx-zeromq-{}'.format(_name),
+                                      '_host': _host,
+                                      '_protocol': _protocol,
+                                      '_PUSH_PORT': _PUSH_PORT,
+                                      '_PULL_PORT': _PULL_PORT,
+                                      '_SUB_PORT': _SUB_PORT}
+
+            if _account is not None:
+                self._account_routes[_account] = _name
+
+            for _symbol in _symbols:
+                self._symbol_routes[_symbol] = _name
+
+            if _default or self._default_terminal is None:
+                self._default_terminal = _name
+
+    ##########################################################################
+
+    """
+    Route a symbol to a terminal (e.g. when a symbol moves to another broker)
+    """
+    def _add_symbol_route_(self, _symbol, _name):
+
+        if _name not in self._terminals:
+            raise KeyError("[MANAGER] Unknown terminal {}".format(_name))
+
+        self._symbol_routes[_symbol] = _name
+
+    ##########################################################################
+
+    """
+    Resolve a terminal name: explicit name > account > symbol > default
+    """
+    def _route_(self, _terminal=None, _account=None, _symbol=None):
+
+        if _terminal is not None:
+            _name = _terminal
+        elif _account is not None and _account in self._account_routes:
+            _name = self._account_routes[_account]
+        elif _symbol is not None and _symbol in self._symbol_routes:
+            _name = self._symbol_routes[_symbol]
+        else:
+            _name = self._default_terminal
+
+        if _name not in self._terminals:
+            raise KeyError("[MANAGER] No terminal found for terminal={}, account={}, symbol={}".format(_terminal, _account, _symbol))
+
+        return _name
+
+    ##########################################################################
+
+    """
+    Get (and reference count) the pooled connector for a terminal, creating
+    its socket set on first use.
+    """
+    def _acquire_(self, _terminal=None, _account=None, _symbol=None):
+
+        with self._lock:
+
+            _name = self._route_(_terminal, _account, _symbol)
+
+            if _name not in self._connectors:
+
+                print("[MANAGER] Creating socket set for terminal {}".format(_name))
+
+                self._connectors[_name] = DWX_ZeroMQ_Connector(_verbose=self._verbose,
+                                                               _poll_timeout=self._poll_timeout,
+                                                               _sleep_delay=self._sleep_delay,
+                                                               _monitor=self._monitor,
+                                                               _context=self._ZMQ_CONTEXT,
+                                                               **self._terminals[_name])
+                self._refcounts[_name] = 0
+
+            self._refcounts[_name] += 1
+
+            return self._connectors[_name]
+
+    ##########################################################################
+
+    """
+    Give back a connector obtained via _acquire_(). Its sockets are closed
+    once the last user has released it.
+    """
+    def _release_(self, _zmq):
+
+        with self._lock:
+
+            for _name, _connector in self._connectors.items():
+
+                if _connector is _zmq:
+
+                    self._refcounts[_name] -= 1
+
+                    if self._refcounts[_name] <= 0:
+                        _connector._DWX_ZMQ_SHUTDOWN_()
+                        del self._connectors[_name]
+                        del self._refcounts[_name]
+
+                    return
+
+    ##########################################################################
+
+    """
+    Get the live connector for a route without taking a reference.
+    """
+    def _get_connector_(self, _terminal=None, _account=None, _symbol=None):
+
+        _name = self._route_(_terminal, _account, _symbol)
+
+        if _name not in self._connectors:
+            raise KeyError("[MANAGER] Terminal {} has no active connector, call _acquire_() first".format(_name))
+
+        return self._connectors[_name]
+
+    ##########################################################################
+
+    """
+    Send a trade command to whichever terminal the account/symbol routes to
+    """
+    def _DWX_MTX_SEND_COMMAND_(self, _account=None, _terminal=None, **_order):
+
+        _zmq = self._get_connector_(_terminal, _account, _order.get('_symbol'))
+        _zmq._DWX_MTX_SEND_COMMAND_(**_order)
+
+        return _zmq
+
+    ##########################################################################
+
+    def _DWX_ZMQ_SHUTDOWN_(self):
+
+        with self._lock:
+
+            for _name, _connector in self._connectors.items():
+                print("\n++ [MANAGER] Shutting down terminal {} ++".format(_name))
+                _connector._DWX_ZMQ_SHUTDOWN_()
+
+            self._connectors.clear()
+            self._refcounts.clear()
+
+        # Every socket is closed now, safe to terminate the shared context
+        self._ZMQ_CONTEXT.term()
+        print("\n++ [MANAGER] ZeroMQ Context Terminated.. shut down safely complete! :)")
+
+    ##########################################################################
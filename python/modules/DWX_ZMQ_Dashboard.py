@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Dashboard.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+
+    Live price and open P&L plots in a separate process:
+
+        python -m python.modules.DWX_ZMQ_Dashboard [--address ADDRESS]
+            [--symbols EURUSD,GBPUSD] [--pixels 800] [--fps 10]
+            [--window 300] [--decimator minmax|lttb] [--text]
+"""
+
+import argparse
+import zmq
+import numpy as np
+from collections import deque
+from multiprocessing import Process
+from threading import Thread
+from time import sleep, time, monotonic
+
+_ADDRESS = 'tcp://127.0.0.1:32771'
+
+##############################################################################
+
+"""
+Keep the min and max of each of _n_out / 2 buckets (in time order):
+spikes survive, whatever the zoom
+"""
+def _minmax_decimate_(_x, _y, _n_out):
+
+    _n = len(_y)
+
+    if _n <= _n_out:
+        return _x, _y
+
+    _buckets = max(_n_out // 2, 1)
+    _k = -(-_n // _buckets)
+
+    # Pad with the last value: padding indices collapse onto the last point
+    _padded = np.empty(_buckets * _k)
+    _padded[:_n] = _y
+    _padded[_n:] = _y[-1]
+    _padded = _padded.reshape(_buckets, _k)
+
+    _rows = np.arange(_buckets) * _k
+
+    _lo = _rows + np.argmin(_padded, axis=1)
+    _hi = _rows + np.argmax(_padded, axis=1)
+
+    _keep = np.unique(np.minimum(np.concatenate((_lo, _hi)), _n - 1))
+
+    return _x[_keep], _y[_keep]
+
+"""
+Largest-Triangle-Three-Buckets: _n_out points keeping the visual shape
+of the series
+"""
+def _lttb_decimate_(_x, _y, _n_out):
+
+    _n = len(_y)
+
+    if _n <= _n_out or _n_out < 3:
+        return _x, _y
+
+    _edges = np.linspace(1, _n - 1, _n_out - 1).astype(np.intp)
+
+    _keep = np.empty(_n_out, dtype=np.intp)
+    _keep[0], _keep[-1] = 0, _n - 1
+
+    _a = 0
+
+    for _i in range(_n_out - 2):
+
+        _s, _e = _edges[_i], _edges[_i + 1]
+
+        # Average of the next bucket (the last point for the last bucket)
+        _ns, _ne = _e, _edges[_i + 2] if _i + 2 < len(_edges) else _n
+        _cx, _cy = _x[_ns:_ne].mean(), _y[_ns:_ne].mean()
+
+        _ax, _ay = _x[_a], _y[_a]
+        _bx, _by = _x[_s:_e], _y[_s:_e]
+
+        _area = np.abs((_ax - _cx) * (_by - _ay) - (_ax - _bx) * (_cy - _ay))
+
+        _a = _s + int(np.argmax(_area))
+        _keep[_i + 1] = _a
+
+    return _x[_keep], _y[_keep]
+
+_DECIMATORS = {'minmax': _minmax_decimate_, 'lttb': _lttb_decimate_}
+
+##############################################################################
+
+class DWX_ZMQ_Dashboard_Feed():
+
+    """
+    Streams ticks and open P&L from the trading process to a dashboard.
+
+    The tick handler only appends to a deque (no socket, no lock on the
+    poller thread); a feed thread sends whatever accumulated every
+    _interval seconds as one message on its own PUB socket. Sends never
+    block: with no dashboard attached, or a slow one, batches are dropped.
+
+        _feed = DWX_ZMQ_Dashboard_Feed(self._zmq, self._pnl)
+        DWX_ZMQ_Dashboard._spawn_(_symbols=['EURUSD'])
+    """
+    def __init__(self, _zmq,
+                 _pnl=None,                 # DWX_ZMQ_PnL_Engine
+                 _address=_ADDRESS,
+                 _interval=0.05,            # seconds between batches
+                 _max_pending=100000):      # ticks kept if the feed falls behind
+
+        self._zmq = _zmq
+        self._pnl = _pnl
+        self._interval = _interval
+
+        self._pending = deque(maxlen=_max_pending)
+
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.PUB)
+        self._socket.setsockopt(zmq.SNDHWM, 100)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.bind(_address)
+
+        self._sent = 0
+        self._dropped = 0
+        self._ACTIVE = True
+
+        self._zmq._DWX_ZMQ_ADD_TICK_HANDLER_(self._on_tick_)
+
+        self._thread = Thread(name='DWX_ZMQ_Dashboard_Feed', target=self._run_)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##########################################################################
+
+    def _on_tick_(self, _symbol, _bid, _ask):
+
+        self._pending.append((time(), _symbol, _bid, _ask,
+                              None if self._pnl is None else self._pnl._account_pnl_()))
+
+    ##########################################################################
+
+    def _run_(self):
+
+        while self._ACTIVE:
+
+            sleep(self._interval)
+
+            _batch = [self._pending.popleft() for _ in range(len(self._pending))]
+
+            _msg = {'_time': time(), '_ticks': _batch}
+
+            if self._pnl is not None:
+                _msg['_pnl'] = self._pnl._account_pnl_()
+                _msg['_by_trader'] = self._pnl._by_trader_()
+
+            try:
+                self._socket.send_json(_msg, zmq.NOBLOCK)
+                self._sent += 1
+            except zmq.Again:
+                self._dropped += 1
+
+        self._socket.close()
+        self._context.term()
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        self._zmq._DWX_ZMQ_REMOVE_TICK_HANDLER_(self._on_tick_)
+
+        self._ACTIVE = False
+        self._thread.join()
+
+    ##########################################################################
+
+class _Series():
+
+    """
+    Append-only (time, value) arrays, trimmed to the last _window seconds
+    """
+    def __init__(self, _window):
+
+        self._window = _window
+        self._t = np.zeros(1024)
+        self._y = np.zeros(1024)
+        self._n = 0
+
+    def _append_(self, _t, _y):
+
+        _m = len(_t)
+
+        if self._n + _m > len(self._t):
+
+            # Drop what fell out of the window, grow if still needed
+            _first = np.searchsorted(self._t[:self._n], _t[-1] - self._window)
+            _live = self._n - _first
+            _size = max(len(self._t), 2 * (_live + _m))
+
+            _nt, _ny = np.zeros(_size), np.zeros(_size)
+            _nt[:_live], _ny[:_live] = self._t[_first:self._n], self._y[_first:self._n]
+            self._t, self._y, self._n = _nt, _ny, _live
+
+        self._t[self._n:self._n + _m] = _t
+        self._y[self._n:self._n + _m] = _y
+        self._n += _m
+
+    def _view_(self, _now):
+
+        _first = np.searchsorted(self._t[:self._n], _now - self._window)
+
+        return self._t[_first:self._n], self._y[_first:self._n]
+
+##############################################################################
+
+class DWX_ZMQ_Dashboard():
+
+    """
+    Dashboard process: consumes a DWX_ZMQ_Dashboard_Feed, keeps the last
+    _window seconds of mid prices (per symbol) and account open P&L, and
+    redraws at most _fps times a second with every series decimated to
+    _pixels points (min/max or LTTB).
+
+    Uses matplotlib if it is installed (and _plot is True), otherwise
+    prints a one line summary per second.
+    """
+    def __init__(self, _address=_ADDRESS,
+                 _symbols=None,             # symbols to plot (None = all seen)
+                 _pixels=800,
+                 _fps=10,
+                 _window=300,               # seconds shown
+                 _decimator='minmax',       # prices; P&L always uses LTTB
+                 _plot=True):
+
+        self._address = _address
+        self._symbols = _symbols
+        self._pixels = _pixels
+        self._frame = 1.0 / _fps
+        self._window = _window
+        self._decimate = _DECIMATORS[_decimator]
+        self._plot = _plot
+
+        self._prices = {}
+        self._pnl = _Series(_window)
+        self._by_trader = {}
+
+        self._ticks = 0
+        self._frames = 0
+
+    ##########################################################################
+
+    def _consume_(self, _msg):
+
+        _ticks = _msg['_ticks']
+
+        if _ticks:
+
+            _bysym = {}
+            for _t, _symbol, _bid, _ask, _pnl in _ticks:
+                if self._symbols is None or _symbol in self._symbols:
+                    _bysym.setdefault(_symbol, []).append((_t, (_bid + _ask) / 2))
+
+            for _symbol, _points in _bysym.items():
+                _arr = np.array(_points)
+                self._prices.setdefault(_symbol, _Series(self._window))._append_(_arr[:, 0], _arr[:, 1])
+
+            _pnl = [(_t[0], _t[4]) for _t in _ticks if _t[4] is not None]
+
+            if _pnl:
+                _arr = np.array(_pnl)
+                self._pnl._append_(_arr[:, 0], _arr[:, 1])
+
+            self._ticks += len(_ticks)
+
+        self._by_trader = _msg.get('_by_trader', self._by_trader)
+
+    ##########################################################################
+
+    def _series_(self, _now):
+
+        _prices = {}
+
+        for _symbol, _series in self._prices.items():
+
+            _t, _y = _series._view_(_now)
+
+            if len(_y):
+                # % change over the window, so symbols share one axis
+                _prices[_symbol] = self._decimate(_t - _now, 100 * (_y / _y[0] - 1), self._pixels)
+
+        _t, _y = self._pnl._view_(_now)
+
+        return _prices, _lttb_decimate_(_t - _now, _y, self._pixels)
+
+    ##########################################################################
+
+    def _run_(self):
+
+        _plt = None
+
+        if self._plot:
+            try:
+                import matplotlib.pyplot as _plt
+            except ImportError:
+                print('[DASHBOARD] matplotlib not installed, printing a summary instead')
+
+        _context = zmq.Context()
+        _socket = _context.socket(zmq.SUB)
+        _socket.setsockopt_string(zmq.SUBSCRIBE, '')
+        _socket.connect(self._address)
+
+        if _plt is not None:
+            _plt.ion()
+            _fig, (_ax_price, _ax_pnl) = _plt.subplots(2, 1, sharex=True)
+            _ax_price.set_ylabel('price (% change)')
+            _ax_pnl.set_ylabel('open P&L')
+            _ax_pnl.set_xlabel('seconds')
+            _lines = {}
+            _pnl_line, = _ax_pnl.plot([], [], color='black')
+            _plt.show(block=False)
+
+        _next_frame = monotonic()
+        _next_text = monotonic()
+
+        try:
+            while _plt is None or _plt.fignum_exists(_fig.number):
+
+                # Take in everything until the next frame is due
+                _wait = max(_next_frame - monotonic(), 0)
+
+                if _socket.poll(int(_wait * 1000)):
+                    while True:
+                        try:
+                            self._consume_(_socket.recv_json(zmq.NOBLOCK))
+                        except zmq.Again:
+                            break
+
+                if monotonic() < _next_frame:
+                    continue
+
+                _next_frame = monotonic() + self._frame
+                _prices, (_pt, _py) = self._series_(time())
+
+                if _plt is None:
+
+                    if monotonic() >= _next_text:
+                        _next_text = monotonic() + 1.0
+                        print('[DASHBOARD] {} ticks | Open P&L: {} | {}'.format(
+                              self._ticks, '{:.2f}'.format(_py[-1]) if len(_py) else '-',
+                              ', '.join('{} {:+.3f}%'.format(_s, _v[1][-1])
+                                        for _s, _v in sorted(_prices.items()))))
+                    continue
+
+                for _symbol, (_x, _y) in _prices.items():
+                    if _symbol not in _lines:
+                        _lines[_symbol], = _ax_price.plot([], [], label=_symbol)
+                        _ax_price.legend(loc='upper left')
+                    _lines[_symbol].set_data(_x, _y)
+
+                _pnl_line.set_data(_pt, _py)
+
+                for _ax in (_ax_price, _ax_pnl):
+                    _ax.relim()
+                    _ax.autoscale_view()
+
+                _fig.canvas.draw_idle()
+                _fig.canvas.flush_events()
+
+                self._frames += 1
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            _socket.close(0)
+            _context.term()
+
+    ##########################################################################
+
+    """
+    Start a dashboard in its own process (returns the Process)
+    """
+    @classmethod
+    def _spawn_(cls, **_kwargs):
+
+        _process = Process(name='DWX_ZMQ_Dashboard', target=_main_, kwargs=_kwargs)
+        _process.daemon = True
+        _process.start()
+
+        return _process
+
+def _main_(**_kwargs):
+    DWX_ZMQ_Dashboard(**_kwargs)._run_()
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('--address', default=_ADDRESS)
+    _parser.add_argument('--symbols', help='comma separated (default: all)')
+    _parser.add_argument('--pixels', type=int, default=800)
+    _parser.add_argument('--fps', type=float, default=10)
+    _parser.add_argument('--window', type=float, default=300, help='seconds shown')
+    _parser.add_argument('--decimator', choices=sorted(_DECIMATORS), default='minmax')
+    _parser.add_argument('--text', action='store_true', help='print a summary, no plot')
+    _args = _parser.parse_args()
+
+    DWX_ZMQ_Dashboard(_args.address,
+                      _args.symbols.split(',') if _args.symbols else None,
+                      _args.pixels, _args.fps, _args.window, _args.decimator,
+                      not _args.text)._run_()
@@ -13,14 +13,16 @@
     https://opensource.org/licenses/BSD-3-Clause
 """
 
-from pandas import to_datetime
-from time import sleep
+from time import sleep, monotonic
 
 class DWX_ZMQ_Execution():
     
     def __init__(self, _zmq):
         self._zmq = _zmq
         self._ticket = None
+        
+        # Last OPEN refused by the connector's risk gate (never sent)
+        self._rejection = None
     
     ##########################################################################
     
@@ -30,46 +32,175 @@ class DWX_ZMQ_Execution():
                   _delay=0.1,
                   _wbreak=10):
         
-        _check = ''
+        # Strategies sharing this connector take turns
+        with self._zmq._REQUEST_LOCK:
+            
+            _check = ''
+            self._rejection = None
+        
+            # Reset thread data output
+            self._zmq._set_response_(None)
+        
+            # OPEN TRADE
+            if _exec_dict['_action'] == 'OPEN':
+            
+                _check = '_action'
+                self._zmq._DWX_MTX_NEW_TRADE_(_order=_exec_dict)
+            
+            # CLOSE TRADE
+            elif _exec_dict['_action'] == 'CLOSE':
+            
+                _check = '_response_value'
+                
+                # Explicit arguments, not the connector's shared temp_order_dict
+                self._zmq._DWX_MTX_SEND_COMMAND_(_action='CLOSE',
+                                                 _comment=self._zmq._ClientID,
+                                                 _ticket=_exec_dict['_ticket'])
+            
+            if _verbose:
+                print('\n[{}] {} -> MetaTrader'.format(_exec_dict['_comment'],
+                                                       str(_exec_dict)))
+            
+            # While loop start time reference            
+            _ws = monotonic()
+        
+            # While no reply to this command, sleep until timeout (a late
+            # reply to an earlier, timed out command isn't one)
+            while not self._is_reply_(_exec_dict, self._zmq._get_response_()):
+                sleep(_delay)
+            
+                if monotonic() - _ws > (_delay * _wbreak):
+                    break
         
-        # Reset thread data output
-        self._zmq._set_response_(None)
+            # If data received, return DataFrame
+            if self._is_reply_(_exec_dict, self._zmq._get_response_()):
+                _response = self._zmq._get_response_()
+                
+                # Refused by the risk gate: not an OPEN confirmation
+                if _response.get('_action') == 'REJECTED':
+                    self._rejection = _response
+                    return None
+                
+                if _check in _response.keys():
+                    self._ticket = _response
+                    return self._zmq._get_response_()
+                
+        # Default
+        return None
+    
+    ##########################################################################
+    
+    """
+    Whether _response answers _exec_dict: an EXECUTION (or the risk gate's
+    REJECTED) for an OPEN, a CLOSE of the same ticket for a CLOSE
+    """
+    def _is_reply_(self, _exec_dict, _response):
+        
+        if not isinstance(_response, dict):
+            return False
         
-        # OPEN TRADE
         if _exec_dict['_action'] == 'OPEN':
+            return _response.get('_action') in ('EXECUTION', 'REJECTED')
+        
+        if _exec_dict['_action'] == 'CLOSE':
+            return (_response.get('_action') == 'CLOSE'
+                    and str(_response.get('_ticket', _exec_dict['_ticket'])) == str(_exec_dict['_ticket']))
+        
+        return False
+    
+    ##########################################################################
+    
+    """
+    Send a list of (ACTION, TICKET, SL, TP) ticket commands (CLOSE or
+    MODIFY, SL/TP in points) back to back and wait for the reply to the
+    last one. MetaTrader answers in order, so by then the earlier replies
+    are in too and none is left over for the next request. Returns that
+    last reply, or None.
+    """
+    def _execute_commands_(self, 
+                           _commands,
+                           _verbose=False, 
+                           _delay=0.1,
+                           _wbreak=10):
+        
+        if not _commands:
+            return None
+        
+        # Strategies sharing this connector take turns
+        with self._zmq._REQUEST_LOCK:
             
-            _check = '_action'
-            self._zmq._DWX_MTX_NEW_TRADE_(_order=_exec_dict)
+            # Reset thread data output
+            self._zmq._set_response_(None)
             
-        # CLOSE TRADE
-        elif _exec_dict['_action'] == 'CLOSE':
+            # Explicit arguments, not the connector's shared temp_order_dict
+            for _action, _ticket, _SL, _TP in _commands:
+                self._zmq._DWX_MTX_SEND_COMMAND_(_action=_action,
+                                                 _SL=_SL,
+                                                 _TP=_TP,
+                                                 _comment=self._zmq._ClientID,
+                                                 _ticket=_ticket)
             
-            _check = '_response_value'
-            self._zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(_exec_dict['_ticket'])
+            if _verbose:
+                print('\n[{}] {} commands -> MetaTrader'.format(self._zmq._ClientID, len(_commands)))
             
-        if _verbose:
-            print('\n[{}] {} -> MetaTrader'.format(_exec_dict['_comment'],
-                                                   str(_exec_dict)))
+            # While loop start time reference            
+            _ws = monotonic()
+            
+            # Wait for the reply to the last command
+            while monotonic() - _ws <= (_delay * _wbreak):
+                
+                _response = self._zmq._get_response_()
+                
+                if (isinstance(_response, dict)
+                    and _response.get('_action') == _action
+                    and str(_response.get('_ticket', _ticket)) == str(_ticket)):
+                    return _response
+                
+                sleep(_delay)
+        
+        # Default
+        return None
+    
+    ##########################################################################
+    
+    
+    """
+    Send a list of (TICKET, ACTION, SL, TP, LOTS) in one BATCH message and
+    wait for its correlated reply (one round trip for the whole book).
+    """
+    def _execute_batch_(self, 
+                        _items,
+                        _verbose=False, 
+                        _delay=0.1,
+                        _wbreak=10):
+        
+        # Strategies sharing this connector take turns
+        with self._zmq._REQUEST_LOCK:
             
-        # While loop start time reference            
-        _ws = to_datetime('now')
+            # Reset thread data output
+            self._zmq._set_response_(None)
+        
+            _batch_id = self._zmq._DWX_MTX_SEND_BATCH_COMMAND_(_items)
         
-        # While data not received, sleep until timeout
-        while self._zmq._valid_response_('zmq') == False:
-            sleep(_delay)
+            if _verbose:
+                print('\n[BATCH {}] {} commands -> MetaTrader'.format(_batch_id, len(_items)))
             
-            if (to_datetime('now') - _ws).total_seconds() > (_delay * _wbreak):
-                break
+            # While loop start time reference            
+            _ws = monotonic()
         
-        # If data received, return DataFrame
-        if self._zmq._valid_response_('zmq'):
-            _response = self._zmq._get_response_()
-            if _check in _response.keys():
-                self._ticket = _response
-                return self._zmq._get_response_()
+            # Wait for the reply carrying our batch ID
+            while monotonic() - _ws <= (_delay * _wbreak):
+            
+                _response = self._zmq._get_response_()
+            
+                if (isinstance(_response, dict)
+                    and _response.get('_action') == 'BATCH'
+                    and str(_response.get('_batch_id')) == str(_batch_id)):
+                    return _response
+            
+                sleep(_delay)
                 
         # Default
         return None
     
     ##########################################################################
-    
\ No newline at end of file
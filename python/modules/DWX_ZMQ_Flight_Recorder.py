@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Flight_Recorder.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+
+    Usage (from the repository root), to summarise / print a dump:
+        python -m python.modules.DWX_ZMQ_Flight_Recorder DUMP [--print N]
+            [--channels PUSH,PULL,SUB]
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+from struct import Struct
+from threading import Lock, Thread
+from time import monotonic_ns, time_ns, perf_counter_ns, sleep
+
+# Channels, as recorded
+_CHANNELS = {'PUSH': 0, 'PULL': 1, 'SUB': 2}
+_NAMES = {_v: _k for _k, _v in _CHANNELS.items()}
+
+# Dump file: header, then one (TS, CHANNEL, LENGTH) record + payload per frame
+#   header: magic, frames, wall clock ns at _mono_ns, _mono_ns, frames dropped
+_MAGIC = b'DWXFLT01'
+_HEADER = Struct('<8sqqqq')
+_FRAME = Struct('<qBI')
+
+class _DWX_ZMQ_Frame_Ring():
+
+    """
+    Preallocated byte ring + frame index, for ONE writing thread at a time
+    (no lock on the write path). Readers copy it and keep the frames that
+    the writer can't have touched meanwhile.
+    """
+    def __init__(self, _capacity, _max_frames):
+
+        self._capacity = int(_capacity)
+        self._max_frames = int(_max_frames)
+
+        # Byte ring and frame index, slot = frame number % _max_frames:
+        # (TS, ABSOLUTE BYTE OFFSET, LENGTH, CHANNEL)
+        self._buffer = bytearray(self._capacity)
+        self._view = memoryview(self._buffer)
+        self._index = [(0, 0, 0, 0)] * self._max_frames
+
+        self._claimed = 0           # absolute end of the last frame claimed
+        self._frames = 0
+        self._dropped = 0
+
+    def _write_(self, _ts, _channel, _frame):
+
+        _n = len(_frame)
+
+        if _n > self._capacity:
+            self._dropped += 1
+            return
+
+        _start = self._claimed
+        _pos = _start % self._capacity
+
+        # No room before the end of the ring: skip the tail
+        if _pos + _n > self._capacity:
+            _start += self._capacity - _pos
+            _pos = 0
+
+        # Claim the bytes before overwriting them (see _frames_)
+        self._claimed = _start + _n
+        self._view[_pos:_pos + _n] = _frame
+
+        self._index[self._frames % self._max_frames] = (_ts, _start, _n, _channel)
+        self._frames += 1
+
+    def _frames_(self):
+
+        _frames = self._frames
+
+        _buffer = bytes(self._buffer)
+        _index = self._index[:]
+
+        # Whatever was claimed by the end of the copy may have been
+        # overwritten during it: bytes older than one ring before the
+        # claimed end, and the slot of the frame being written
+        _oldest = self._claimed - self._capacity
+        _first = max(0, _frames - self._max_frames, self._frames + 1 - self._max_frames)
+
+        _out = []
+
+        for _k in range(_first, _frames):
+
+            _ts, _start, _n, _channel = _index[_k % self._max_frames]
+
+            if _start < _oldest:
+                continue
+
+            _pos = _start % self._capacity
+            _out.append((_ts, _NAMES[_channel], _buffer[_pos:_pos + _n]))
+
+        return _out, _frames - len(_out)
+
+##############################################################################
+
+class DWX_ZMQ_Flight_Recorder():
+
+    """
+    Black box for the connector: the last raw PUSH / PULL / SUB frames,
+    each with its monotonic ns send / receive time.
+
+    Inbound frames (PULL, SUB) are only received by the poll thread and
+    every PUSH send holds the connector's _PUSH_LOCK, so each direction
+    gets its own single-writer ring: _capacity bytes / _max_frames frames
+    inbound, 1/8 of that for PUSH. The buffers are allocated once and
+    recording a frame takes no lock - one copy into the byte ring plus one
+    index slot. Older frames are overwritten as a ring wraps; frames
+    larger than their whole ring are counted as dropped.
+
+    The rings are written to _directory as FLIGHT_<WALL_NS>_<REASON>.dwxf:
+
+        - on demand:        _recorder._dump_()
+        - on exceptions:    any uncaught exception, in any thread
+                            (sys.excepthook / threading.excepthook), or
+                            _recorder._on_exception_(ex) from an except block
+        - on signals:       SIGUSR1 (SIGBREAK on Windows) by default, e.g.
+                            kill -USR1 <pid> while a spike is happening
+
+    at most once per _min_dump_interval seconds for exceptions and signals.
+
+        _recorder = DWX_ZMQ_Flight_Recorder(self._zmq, _directory='flight/')
+        ..
+        _replay = DWX_ZMQ_Flight_Replay('flight/FLIGHT_..._signal.dwxf')
+        _replay._replay_(_other_zmq, _speed=1.0)
+    """
+    def __init__(self, _zmq,
+                 _directory='flight',
+                 _capacity=32 << 20,            # inbound ring size in bytes
+                 _max_frames=1 << 18,           # inbound ring size in frames
+                 _signals=None,                 # None = SIGUSR1 / SIGBREAK, () = none
+                 _on_exception=True,            # dump on uncaught exceptions
+                 _min_dump_interval=1.0,
+                 _verbose=True):
+
+        self._zmq = _zmq
+        self._directory = _directory
+        self._min_dump_interval = _min_dump_interval
+        self._verbose = _verbose
+
+        _inbound = _DWX_ZMQ_Frame_Ring(_capacity, _max_frames)
+        _outbound = _DWX_ZMQ_Frame_Ring(max(_capacity // 8, 1), max(_max_frames // 8, 1))
+
+        self._rings = {'PUSH': _outbound, 'PULL': _inbound, 'SUB': _inbound}
+
+        # Wall clock at a monotonic instant, to date the frames in a dump
+        self._wall_ns, self._mono_ns = time_ns(), monotonic_ns()
+
+        self._lock = Lock()             # dumps only
+        self._last_dump = 0
+        self._dumps = []
+
+        # Hooks
+        self._excepthook = self._thread_excepthook = None
+        self._handlers = {}
+
+        if _on_exception:
+            self._excepthook, sys.excepthook = sys.excepthook, self._on_uncaught_
+            self._thread_excepthook, threading.excepthook = threading.excepthook, self._on_thread_uncaught_
+
+        if _signals is None:
+            _signals = [getattr(signal, _name) for _name in ('SIGUSR1', 'SIGBREAK')
+                        if hasattr(signal, _name)][:1]
+
+        for _signal in _signals:
+            try:
+                self._handlers[_signal] = signal.signal(_signal, self._on_signal_)
+            except ValueError:
+                # signal.signal() only works on the main thread
+                print('[FLIGHT] Not on the main thread, no dump on signal {}'.format(_signal))
+
+        self._zmq._FLIGHT_RECORDER = self
+
+    ##########################################################################
+
+    """
+    Record one raw frame (called by the connector on every receive and
+    successful send: PULL / SUB on the poll thread, PUSH under _PUSH_LOCK
+    with _ts taken just before the send)
+    """
+    def _record_(self, _channel, _frame, _ts=None):
+
+        self._rings[_channel]._write_(monotonic_ns() if _ts is None else _ts,
+                                      _CHANNELS[_channel], _frame)
+
+    ##########################################################################
+
+    """
+    ([(TS, CHANNEL, FRAME)] still in the rings oldest first, FRAMES LOST)
+    """
+    def _snapshot_(self):
+
+        _inbound, _lost = self._rings['SUB']._frames_()
+        _outbound, _lost_out = self._rings['PUSH']._frames_()
+
+        _frames = sorted(_inbound + _outbound, key=lambda _f: _f[0])
+
+        return _frames, _lost + _lost_out + self._rings['SUB']._dropped + self._rings['PUSH']._dropped
+
+    """
+    Write the rings to _directory (or _path); returns the file's path
+    """
+    def _dump_(self, _reason='manual', _path=None):
+
+        _frames, _lost = self._snapshot_()
+
+        if _path is None:
+            os.makedirs(self._directory, exist_ok=True)
+            _path = os.path.join(self._directory, 'FLIGHT_{}_{}.dwxf'.format(time_ns(), _reason))
+
+        _tmp = _path + '.tmp'
+
+        with open(_tmp, 'wb') as _f:
+
+            _f.write(_HEADER.pack(_MAGIC, len(_frames), self._wall_ns, self._mono_ns, _lost))
+
+            for _ts, _channel, _frame in _frames:
+                _f.write(_FRAME.pack(_ts, _CHANNELS[_channel], len(_frame)))
+                _f.write(_frame)
+
+        os.replace(_tmp, _path)
+        self._dumps.append(_path)
+
+        if self._verbose:
+            print('\n[FLIGHT] {} frames dumped to {} ({})'.format(len(_frames), _path, _reason))
+
+        return _path
+
+    ##########################################################################
+
+    # Dumps not asked for explicitly are rate limited
+    def _auto_dump_(self, _reason):
+
+        _now = monotonic_ns()
+
+        with self._lock:
+            if _now - self._last_dump < self._min_dump_interval * 1e9:
+                return None
+            self._last_dump = _now
+
+        try:
+            return self._dump_(_reason)
+
+        except Exception as ex:
+            _exstr = "Exception Type {0}. Args:\n{1!r}"
+            _msg = _exstr.format(type(ex).__name__, ex.args)
+            print(_msg)
+
+    def _on_exception_(self, _ex=None):
+        return self._auto_dump_(type(_ex).__name__ if _ex is not None else 'exception')
+
+    def _on_uncaught_(self, _type, _value, _traceback):
+
+        self._auto_dump_(_type.__name__)
+        self._excepthook(_type, _value, _traceback)
+
+    def _on_thread_uncaught_(self, _args):
+
+        self._auto_dump_(_args.exc_type.__name__)
+        self._thread_excepthook(_args)
+
+    def _on_signal_(self, _signal, _frame):
+
+        # Signal handlers run on the main thread between bytecodes, maybe
+        # inside _auto_dump_() holding the lock: dump from another thread
+        Thread(target=self._auto_dump_, args=('signal',), daemon=True).start()
+
+        _previous = self._handlers.get(_signal)
+
+        if callable(_previous):
+            _previous(_signal, _frame)
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        _in, _out = self._rings['SUB'], self._rings['PUSH']
+
+        return {'_frames': _in._frames + _out._frames,
+                '_bytes': _in._claimed + _out._claimed,
+                '_dropped': _in._dropped + _out._dropped,
+                '_dumps': list(self._dumps)}
+
+    """
+    Uninstall from the connector and restore the exception / signal hooks
+    """
+    def _stop_(self):
+
+        if getattr(self._zmq, '_FLIGHT_RECORDER', None) is self:
+            self._zmq._FLIGHT_RECORDER = None
+
+        if self._excepthook is not None and sys.excepthook == self._on_uncaught_:
+            sys.excepthook = self._excepthook
+        if self._thread_excepthook is not None and threading.excepthook == self._on_thread_uncaught_:
+            threading.excepthook = self._thread_excepthook
+
+        for _signal, _previous in self._handlers.items():
+            try:
+                signal.signal(_signal, _previous if _previous is not None else signal.SIG_DFL)
+            except ValueError:
+                pass
+
+        self._handlers = {}
+
+##############################################################################
+
+class _DWX_ZMQ_Command_Capture():
+
+    """
+    Stands in for the command scheduler during a replay: keeps the
+    commands instead of sending them
+    """
+    def __init__(self):
+        self._commands = []
+
+    def _enqueue_(self, _data):
+        self._commands.append(_data.encode('utf-8'))
+
+    def _stop_(self, _flush=True):
+        pass
+
+class DWX_ZMQ_Flight_Replay():
+
+    """
+    Replays a flight recorder dump into a connector.
+
+    Inbound frames (PULL replies, SUB ticks) are handed to the connector's
+    _DWX_ZMQ_ON_RESPONSE_ / _DWX_ZMQ_ON_TICK_ in recorded order, on the
+    calling thread, so the connector's state, tick handlers and response
+    handling see exactly the recorded sequence. With _speed > 0 each frame
+    is delivered at its recorded offset / _speed (1.0 = real time), with 0
+    as fast as possible.
+
+    Use a connector without a terminal (e.g. on unused ports), so nothing
+    else arrives on its sockets. The commands it sends during the replay
+    are kept instead of sent, and compared with the recorded PUSH frames.
+
+        _replay = DWX_ZMQ_Flight_Replay('flight/FLIGHT_..._signal.dwxf')
+        _replay._summary_()
+        _report = _replay._replay_(_zmq, _speed=1.0)
+        _report['_slowest']                 # frames that took longest to handle
+    """
+    def __init__(self, _path):
+
+        self._path = _path
+        self._frames, self._wall_ns, self._mono_ns, self._dropped = self._load_(_path)
+
+    ##########################################################################
+
+    @staticmethod
+    def _load_(_path):
+
+        with open(_path, 'rb') as _f:
+            _data = _f.read()
+
+        _magic, _n, _wall_ns, _mono_ns, _dropped = _HEADER.unpack_from(_data, 0)
+
+        if _magic != _MAGIC:
+            raise ValueError('{}: not a flight recorder dump'.format(_path))
+
+        _frames = []
+        _pos = _HEADER.size
+
+        for _i in range(_n):
+            _ts, _channel, _length = _FRAME.unpack_from(_data, _pos)
+            _pos += _FRAME.size
+            _frames.append((_ts, _NAMES[_channel], _data[_pos:_pos + _length]))
+            _pos += _length
+
+        return _frames, _wall_ns, _mono_ns, _dropped
+
+    def _wall_time_(self, _ts):
+
+        # Monotonic ns of a frame -> wall clock ns
+        return self._wall_ns + _ts - self._mono_ns
+
+    def _summary_(self):
+
+        _counts = {_name: 0 for _name in _CHANNELS}
+        for _ts, _channel, _frame in self._frames:
+            _counts[_channel] += 1
+
+        _span = (self._frames[-1][0] - self._frames[0][0]) / 1e9 if self._frames else 0.0
+
+        return {'_frames': len(self._frames),
+                '_dropped': self._dropped,
+                '_counts': _counts,
+                '_start_ns': self._wall_time_(self._frames[0][0]) if self._frames else None,
+                '_seconds': _span}
+
+    def _commands_(self):
+
+        # Heartbeats bypass the command path, they are not replayed
+        return [_frame for _ts, _channel, _frame in self._frames
+                if _channel == 'PUSH' and _frame != b'HEARTBEAT;']
+
+    ##########################################################################
+
+    """
+    Feed the recorded PULL / SUB frames into _zmq; returns a report of the
+    handling times (ns), the lateness against the recorded schedule and the
+    commands sent during the replay vs. the recorded ones
+    """
+    def _replay_(self, _zmq, _speed=0.0, _slowest=10):
+
+        # Keep what the connector sends meanwhile
+        _scheduler = _zmq._COMMAND_SCHEDULER
+        _capture = _zmq._COMMAND_SCHEDULER = _DWX_ZMQ_Command_Capture()
+
+        _delimiter = _zmq._string_delimiter
+        _timings = []
+        _late = 0
+
+        try:
+            _t0 = monotonic_ns()
+            _ts0 = self._frames[0][0] if self._frames else 0
+
+            for _i, (_ts, _channel, _frame) in enumerate(self._frames):
+
+                if _channel == 'PUSH':
+                    continue
+
+                if _speed > 0:
+                    _due = _t0 + (_ts - _ts0) / _speed
+                    _wait = _due - monotonic_ns()
+
+                    # Sleep most of the gap, spin the rest
+                    if _wait > 2000000:
+                        sleep((_wait - 1000000) / 1e9)
+                    while monotonic_ns() < _due:
+                        pass
+
+                    _late = max(_late, monotonic_ns() - _due)
+
+                _msg = _frame.decode('utf-8')
+                _t = perf_counter_ns()
+
+                try:
+                    if _channel == 'SUB':
+                        _zmq._DWX_ZMQ_ON_TICK_(_msg, _delimiter)
+                    else:
+                        _zmq._DWX_ZMQ_ON_RESPONSE_(_msg)
+
+                except ValueError:
+                    pass # malformed tick, as skipped by the poll loop
+
+                _timings.append((perf_counter_ns() - _t, _i))
+
+        finally:
+            _zmq._COMMAND_SCHEDULER = _scheduler
+
+        _sent = _capture._commands
+        _recorded = self._commands_()
+
+        _diverged = next((_i for _i, (_a, _b) in enumerate(zip(_recorded, _sent)) if _a != _b),
+                         None if len(_recorded) == len(_sent) else min(len(_recorded), len(_sent)))
+
+        _durations = sorted(_d for _d, _i in _timings)
+
+        def _pct_(_q):
+            return _durations[min(int(_q * len(_durations)), len(_durations) - 1)] if _durations else 0
+
+        return {'_frames': len(_timings),
+                '_p50_ns': _pct_(0.5),
+                '_p99_ns': _pct_(0.99),
+                '_max_ns': _durations[-1] if _durations else 0,
+                '_max_late_ns': _late,
+                '_slowest': [{'_index': _i,
+                              '_offset_ms': (self._frames[_i][0] - self._frames[0][0]) / 1e6,
+                              '_channel': self._frames[_i][1],
+                              '_ns': _d,
+                              '_frame': self._frames[_i][2][:80]}
+                             for _d, _i in sorted(_timings, reverse=True)[:_slowest]],
+                '_commands_recorded': len(_recorded),
+                '_commands_sent': len(_sent),
+                '_commands_diverged_at': _diverged}
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description='DWX ZeroMQ flight recorder dump')
+    _parser.add_argument('dump')
+    _parser.add_argument('--print', type=int, default=0, metavar='N',
+                         help='print the first N frames')
+    _parser.add_argument('--channels', default='PUSH,PULL,SUB')
+    _args = _parser.parse_args()
+
+    _replay = DWX_ZMQ_Flight_Replay(_args.dump)
+    _summary = _replay._summary_()
+
+    print('{}: {} frames over {:.3f} s ({} dropped)'.format(
+          _args.dump, _summary['_frames'], _summary['_seconds'], _summary['_dropped']))
+    print('  ' + ', '.join('{} {}'.format(_k, _v) for _k, _v in _summary['_counts'].items()))
+
+    _channels = _args.channels.split(',')
+    _shown = 0
+
+    for _ts, _channel, _frame in _replay._frames:
+
+        if _shown >= _args.print:
+            break
+
+        if _channel in _channels:
+            print('{:>14.6f} {:<4} {}'.format((_ts - _replay._frames[0][0]) / 1e9, _channel,
+                                              _frame.decode('utf-8', 'replace')))
+            _shown += 1
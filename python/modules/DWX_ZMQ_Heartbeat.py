@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Heartbeat.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from time import monotonic
+
+# Liveness states
+CONNECTING = 'CONNECTING'       # no reply from the terminal yet
+ALIVE = 'ALIVE'
+SUSPECT = 'SUSPECT'             # a heartbeat went unanswered
+DEAD = 'DEAD'                   # sockets are rebuilt with backoff until a reply
+
+class DWX_ZMQ_Heartbeat():
+
+    """
+    Terminal liveness and automatic reconnect for DWX_ZeroMQ_Connector.
+
+    Driven from the connector's poll thread (so sockets are only ever
+    rebuilt on the thread that reads them):
+
+        - Whenever the terminal has been silent for _interval seconds a
+          HEARTBEAT is sent; any reply proves it alive, heartbeat replies
+          are kept out of _thread_data_output.
+        - Silent for _interval + _timeout -> SUSPECT, for
+          _interval + _max_missed * _timeout -> DEAD.
+        - While DEAD the PUSH/PULL/SUB sockets are rebuilt, then again
+          after _backoff, 2 * _backoff, .. (capped at _max_backoff) until
+          the terminal answers.
+        - Commands sent while the terminal is DEAD (or hasn't answered
+          yet) are queued and replayed on recovery, unless older than
+          _replay_window seconds (a stale OPEN is worse than none). With
+          a command scheduler installed, it holds them instead (PUSH
+          state is False while DEAD). Subscriptions are replayed on every
+          rebuild.
+
+    Installing it is enough:
+
+        _heartbeat = DWX_ZMQ_Heartbeat(self._zmq)
+
+    A terminal blocked in one command for longer than the DEAD threshold
+    (0.85 s by default) is treated as dead: raise _timeout for slow
+    brokers.
+    """
+    def __init__(self, _zmq,
+                 _interval=0.1,         # heartbeat after this much silence (s)
+                 _timeout=0.25,         # time allowed for each reply (s)
+                 _max_missed=3,         # unanswered timeouts before DEAD
+                 _backoff=0.05,         # first delay between rebuilds (s)
+                 _max_backoff=2.0,      # rebuild backoff cap (s)
+                 _replay_window=5.0,    # max age of a replayed command (s)
+                 _max_queued=1000):     # commands kept during an outage
+
+        self._zmq = _zmq
+        self._interval = _interval
+        self._timeout = _timeout
+        self._max_missed = _max_missed
+        self._backoff = _backoff
+        self._max_backoff = _max_backoff
+        self._replay_window = _replay_window
+
+        self._state = CONNECTING
+        self._state_handlers = []
+
+        _now = monotonic()
+
+        # Probe at once rather than after the first _interval
+        self._last_reply = _now - _interval
+        self._last_sent = 0.0
+        self._down_since = _now
+        self._next_rebuild = 0.0
+        self._delay = _backoff
+
+        # Commands held while the terminal isn't ALIVE: (MONOTONIC, MESSAGE)
+        self._queued = deque(maxlen=_max_queued)
+
+        # Counters
+        self._sent = 0
+        self._replies = 0
+        self._rebuilds = 0
+        self._replayed = 0
+        self._expired = 0
+        self._last_rtt = None
+        self._last_recovery = None
+
+        # From now on the connector's poll thread drives us
+        self._zmq._HEARTBEAT = self
+
+    ##########################################################################
+
+    def _alive_(self):
+        return self._state == ALIVE
+
+    """
+    Register a callable f(OLD_STATE, NEW_STATE), called on the poll thread
+    """
+    def _add_state_handler_(self, _handler):
+        self._state_handlers.append(_handler)
+
+    ##########################################################################
+
+    def _set_state_(self, _state, _now):
+
+        _old, self._state = self._state, _state
+
+        print("\n[KERNEL] Terminal {} -> {}".format(_old, _state))
+
+        if _state == ALIVE:
+
+            self._zmq._PUSH_SOCKET_STATUS['state'] = True
+            self._delay = self._backoff
+
+            if _old == DEAD:
+                self._last_recovery = _now - self._down_since
+                print("[KERNEL] Terminal recovered in {:.0f} ms".format(self._last_recovery * 1e3))
+
+            self._replay_(_now)
+
+        elif _state == DEAD:
+
+            # Hold commands (scheduler / _queue_) until the terminal is back
+            self._zmq._PUSH_SOCKET_STATUS['state'] = False
+            self._down_since = self._last_reply
+            self._next_rebuild = _now
+
+        for _handler in self._state_handlers:
+            try:
+                _handler(_old, _state)
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _msg = _exstr.format(type(ex).__name__, ex.args)
+                print(_msg)
+
+    ##########################################################################
+
+    """
+    Called by the connector for every reply; returns True for heartbeat
+    replies, which are not made the current response
+    """
+    def _on_reply_(self, _data, _now=None):
+
+        _now = monotonic() if _now is None else _now
+
+        self._last_reply = _now
+        self._replies += 1
+
+        _heartbeat = isinstance(_data, dict) and _data.get('_action') == 'heartbeat'
+
+        if _heartbeat and self._last_sent:
+            self._last_rtt = _now - self._last_sent
+
+        if self._state != ALIVE:
+            self._set_state_(ALIVE, _now)
+
+        return _heartbeat
+
+    ##########################################################################
+
+    """
+    Called by the connector's poll thread on every iteration
+    """
+    def _tick_(self, _now=None):
+
+        _now = monotonic() if _now is None else _now
+        _silence = _now - self._last_reply
+
+        if _silence > self._interval + self._max_missed * self._timeout:
+            if self._state != DEAD:
+                self._set_state_(DEAD, _now)
+
+        elif _silence > self._interval + self._timeout:
+            if self._state == ALIVE:
+                self._set_state_(SUSPECT, _now)
+
+        if self._state == DEAD and _now >= self._next_rebuild:
+
+            self._zmq._DWX_ZMQ_RECONNECT_()
+            self._rebuilds += 1
+
+            self._next_rebuild = _now + self._delay
+            self._delay = min(self._delay * 2, self._max_backoff)
+
+            # Probe the new sockets straight away
+            self._last_sent = 0.0
+
+        # Queued by a sender racing the recovery
+        if self._state == ALIVE and self._queued:
+            self._replay_(_now)
+
+        if _silence >= self._interval and _now - self._last_sent >= self._interval:
+            if self._zmq._DWX_ZMQ_HEARTBEAT_():
+                self._last_sent = _now
+                self._sent += 1
+
+    ##########################################################################
+
+    """
+    Called by the connector's remote_send(); returns True if the command
+    was queued because the terminal is DEAD or hasn't answered yet
+    """
+    def _queue_(self, _data):
+
+        if self._state not in (CONNECTING, DEAD):
+            return False
+
+        self._queued.append((monotonic(), _data))
+        return True
+
+    def _replay_(self, _now):
+
+        while self._queued:
+
+            _t, _data = self._queued.popleft()
+
+            if _now - _t > self._replay_window:
+                self._expired += 1
+                print("[KERNEL] Dropping stale command queued {:.1f}s ago: {}".format(_now - _t, _data))
+                continue
+
+            self._zmq.remote_send(self._zmq._PUSH_SOCKET, _data)
+            self._replayed += 1
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        return {'_state': self._state,
+                '_sent': self._sent,
+                '_replies': self._replies,
+                '_rebuilds': self._rebuilds,
+                '_queued': len(self._queued),
+                '_replayed': self._replayed,
+                '_expired': self._expired,
+                '_last_rtt': self._last_rtt,
+                '_last_recovery': self._last_recovery}
+
+    ##########################################################################
+
+    """
+    Uninstall (the connector goes back to sending unconditionally)
+    """
+    def _stop_(self):
+
+        if self._zmq._HEARTBEAT is self:
+            self._zmq._HEARTBEAT = None
+
+        if self._state == DEAD:
+            self._zmq._PUSH_SOCKET_STATUS['state'] = True
+
+    ##########################################################################
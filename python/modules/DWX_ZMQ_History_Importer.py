@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_History_Importer.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+
+    Usage (from the repository root):
+        python -m python.modules.DWX_ZMQ_History_Importer --store history/
+            [--broker-gmt 3] [--workers N] [--symbol EURUSD] [--timeframe 60]
+            [--kind ticks|bars] FILE [FILE ..]
+"""
+
+import argparse
+import os
+import re
+import warnings
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from time import perf_counter
+
+from python.modules.DWX_ZMQ_History_Store import DWX_ZMQ_History_Store, _BAR
+
+# Timestamp layouts at the start of each line: (PATTERN, WIDTH, SECONDS, MILLISECONDS)
+# e.g. 2019.01.02,00:00 (bar CSV) or 2019.01.02 00:00:00.123 (tick CSV)
+_LAYOUTS = [(re.compile(rb'\d{4}[.\-/]\d\d[.\-/]\d\d[ T,;\t]\d\d:\d\d:\d\d\.\d{3}[,;\t]'), 23, True, True),
+            (re.compile(rb'\d{4}[.\-/]\d\d[.\-/]\d\d[ T,;\t]\d\d:\d\d:\d\d[,;\t]'), 19, True, False),
+            (re.compile(rb'\d{4}[.\-/]\d\d[.\-/]\d\d[ T,;\t]\d\d:\d\d[,;\t]'), 16, False, False)]
+
+# HST: 148 byte header, then one record per bar
+_HST_HEADER = 148
+_HST_400 = np.dtype([('_time', '<i4'), ('_open', '<f8'), ('_low', '<f8'),
+                     ('_high', '<f8'), ('_close', '<f8'), ('_volume', '<f8')])
+_HST_401 = np.dtype([('_time', '<i8'), ('_open', '<f8'), ('_high', '<f8'), ('_low', '<f8'),
+                     ('_close', '<f8'), ('_volume', '<i8'), ('_spread', '<i4'),
+                     ('_real_volume', '<i8')])
+
+# MT4 periods, as suffixed to exported file names (EURUSD60.csv)
+_PERIODS = (1, 5, 15, 30, 60, 240, 1440, 10080, 43200)
+
+_NS = 1000000000
+
+##############################################################################
+#                                                                            #
+# Vectorised parsing (runs in the worker processes)                          #
+#                                                                            #
+##############################################################################
+
+"""
+Days since 1970-01-01 of proleptic Gregorian dates (arrays)
+"""
+def _days_from_civil_(_y, _m, _d):
+
+    _y = _y - (_m <= 2)
+    _era = _y // 400
+    _yoe = _y - _era * 400
+    _doy = (153 * ((_m + 9) % 12) + 2) // 5 + _d - 1
+    _doe = _yoe * 365 + _yoe // 4 - _yoe // 100 + _doy
+
+    return _era * 146097 + _doe - 719468
+
+def _number_(_buf, _starts, _offset, _width):
+
+    _n = np.zeros(len(_starts), dtype=np.int64)
+
+    for _k in range(_width):
+        _digit = _buf[_starts + _offset + _k] - np.uint8(48)
+        if (_digit > 9).any():
+            raise ValueError('non-digit in timestamp')
+        _n = _n * 10 + _digit
+
+    return _n
+
+"""
+Parse _length bytes of whole lines at _offset of _path. Returns
+(TIMESTAMPS ns UTC, VALUES[lines, columns]) for the numeric columns that
+follow the timestamp.
+"""
+def _parse_chunk_(_path, _offset, _length, _layout, _delimiter, _broker_gmt):
+
+    _width, _seconds, _millis = _layout
+
+    _buf = np.fromfile(_path, dtype=np.uint8, count=_length, offset=_offset)
+
+    if len(_buf) and _buf[-1] != 10:
+        _buf = np.append(_buf, np.uint8(10))
+
+    _ends = np.flatnonzero(_buf == 10)
+    _starts = np.empty_like(_ends)
+    _starts[:1] = 0
+    _starts[1:] = _ends[:-1] + 1
+
+    # Blank lines (and a trailing '\r') carry no data
+    _data = _ends - _starts > _width
+    _blank = _starts[~_data], _ends[~_data]
+    _starts, _ends = _starts[_data], _ends[_data]
+
+    if not len(_starts):
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0))
+
+    try:
+        if (_buf[_starts + _width] != _delimiter).any():
+            raise ValueError('delimiter expected after the timestamp')
+
+        _days = _days_from_civil_(_number_(_buf, _starts, 0, 4),
+                                  _number_(_buf, _starts, 5, 2),
+                                  _number_(_buf, _starts, 8, 2))
+
+        _secs = (_days * 86400
+                 + _number_(_buf, _starts, 11, 2) * 3600
+                 + _number_(_buf, _starts, 14, 2) * 60)
+
+        if _seconds:
+            _secs += _number_(_buf, _starts, 17, 2)
+
+        _ts = (_secs - int(round(_broker_gmt * 3600))) * _NS
+
+        if _millis:
+            _ts += _number_(_buf, _starts, 20, 3) * 1000000
+
+    except ValueError as ex:
+        raise ValueError('[IMPORT] {}: {} (bytes {}-{})'.format(_path, ex.args[0], _offset, _offset + _length))
+
+    # Numeric tail: drop the timestamps, blank lines and '\r', then every
+    # delimiter / newline becomes ',' and C parses all values in one call
+    _marks = np.zeros(len(_buf) + 1, dtype=np.int8)
+    _marks[_starts] += 1
+    _marks[_starts + _width + 1] -= 1
+    _marks[_blank[0]] += 1
+    _marks[_blank[1] + 1] -= 1
+
+    _keep = (np.cumsum(_marks[:-1]) == 0) & (_buf != 13)
+    _seps = _keep & ((_buf == _delimiter) | (_buf == 10))
+
+    # Every line must have as many fields as the first one (each field
+    # ends with a delimiter or the line's newline)
+    _fields = np.diff(np.flatnonzero(_buf[_seps] == 10), prepend=-1)
+    _bad = np.flatnonzero(_fields != _fields[0])
+
+    if len(_bad):
+        raise ValueError('[IMPORT] {}: {} fields where {} expected (byte {})'.format(
+                         _path, _fields[_bad[0]], _fields[0], _offset + _starts[_bad[0]]))
+
+    _tail = _buf[_keep]
+    _tail[_seps[_keep]] = ord(',')
+
+    # Empty fields (',,' or a line starting with its delimiter)
+    _empty = (_tail == 44) & np.concatenate(([True], _tail[:-1] == 44))
+
+    if _empty.any():
+        raise ValueError('[IMPORT] {}: empty field (bytes {}-{})'.format(
+                         _path, _offset, _offset + _length))
+
+    # At a malformed number fromstring raises (numpy 2) or stops with a
+    # DeprecationWarning, itself an error under -W error: count the values
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            _values = np.fromstring(_tail.tobytes().decode('ascii', 'replace'), sep=',')
+
+    except ValueError:
+        _values = None
+
+    if _values is None or len(_values) != len(_starts) * _fields[0]:
+        raise ValueError('[IMPORT] {}: malformed number (bytes {}-{})'.format(
+                         _path, _offset, _offset + _length))
+
+    return _ts, _values.reshape(len(_starts), -1)
+
+def _parse_chunk_star_(_args):
+    return _parse_chunk_(*_args)
+
+##############################################################################
+
+class DWX_ZMQ_History_Importer():
+
+    """
+    Bulk import of MetaTrader 4 history exports into a DWX_ZMQ_History_Store.
+
+        - tick CSV: DATE TIME[.MS],BID,ASK[,..]    -> STORE/SYMBOL/ticks/
+        - bar CSV:  DATE,TIME,OPEN,HIGH,LOW,CLOSE,VOLUME (History Center export)
+        - HST:      history/<server>/SYMBOL<PERIOD>.hst (versions 400 and 401)
+
+    CSV files are cut into _chunk_bytes ranges of whole lines, parsed in
+    _workers processes (vectorised: fixed-offset timestamp digits, one C
+    call for all the numbers) and written in file order. Dates may use
+    '.', '-' or '/', fields ',', ';' or tab; a header line is skipped.
+
+    MetaTrader times are broker server time: _broker_gmt (hours, as in
+    DWX_ZMQ_Strategy) is subtracted so the store holds UTC.
+
+        _importer = DWX_ZMQ_History_Importer('history/', _broker_gmt=3)
+        _importer._import_('EURUSD_ticks.csv', _symbol='EURUSD')
+        _importer._import_('EURUSD60.csv')          # bars, M60
+        _importer._import_('EURUSD60.hst')
+        # -> {'_rows': .., '_seconds': .., '_rows_per_sec': .., ..}
+    """
+    def __init__(self, _store,
+                 _broker_gmt=3,                 # Darwinex GMT offset
+                 _workers=None,                 # parser processes (default: CPUs)
+                 _chunk_bytes=32 << 20,
+                 _block_ticks=16384,
+                 _verbose=True):
+
+        self._store = _store if isinstance(_store, DWX_ZMQ_History_Store) else DWX_ZMQ_History_Store(_store)
+        self._broker_gmt = _broker_gmt
+        self._workers = _workers or cpu_count()
+        self._chunk_bytes = _chunk_bytes
+        self._block_ticks = _block_ticks
+        self._verbose = _verbose
+
+    ##########################################################################
+
+    """
+    Import one file; _kind ('ticks'/'bars') and _symbol/_timeframe are
+    taken from the file when not given
+    """
+    def _import_(self, _path, _symbol=None, _timeframe=None, _kind=None):
+
+        if _path.lower().endswith('.hst'):
+            return self._import_hst_(_path, _symbol, _timeframe)
+
+        _start, _layout, _delimiter = self._sniff_(_path)
+
+        if _kind is None:
+            _kind = 'ticks' if _layout[1] else 'bars'
+
+        _name_symbol, _name_timeframe = self._from_name_(_path)
+
+        _symbol = _symbol or _name_symbol
+        _timeframe = _timeframe or _name_timeframe
+
+        if _kind == 'bars':
+            if _timeframe is None:
+                raise ValueError('[IMPORT] {}: no timeframe in the file name, pass _timeframe'.format(_path))
+            return self._import_bars_csv_(_path, _symbol, _timeframe, _start, _layout, _delimiter)
+
+        return self._import_ticks_csv_(_path, _symbol, _start, _layout, _delimiter)
+
+    ##########################################################################
+
+    @staticmethod
+    def _from_name_(_path):
+
+        _stem = os.path.splitext(os.path.basename(_path))[0]
+
+        # EURUSD60 -> ('EURUSD', 60), EURUSD_ticks -> ('EURUSD', None)
+        for _period in sorted(_PERIODS, reverse=True):
+            _suffix = str(_period)
+            if _stem.endswith(_suffix) and len(_stem) > len(_suffix) and not _stem[-len(_suffix) - 1].isdigit():
+                return _stem[:-len(_suffix)], _period
+
+        return re.split(r'[_\-. ]', _stem)[0], None
+
+    """
+    Offset of the first data line, its timestamp layout and delimiter
+    """
+    def _sniff_(self, _path):
+
+        with open(_path, 'rb') as _f:
+            _head = _f.read(1 << 16)
+
+        _offset = 0
+
+        for _line in _head.splitlines(True)[:10]:
+
+            for _pattern, _width, _seconds, _millis in _LAYOUTS:
+                if _pattern.match(_line):
+                    return _offset, (_width, _seconds, _millis), _line[_width]
+
+            # Header or blank line
+            _offset += len(_line)
+
+        raise ValueError('[IMPORT] {}: no MT4 timestamp found in the first lines'.format(_path))
+
+    """
+    [(OFFSET, LENGTH)] ranges of whole lines, about _chunk_bytes each
+    """
+    def _ranges_(self, _path, _start):
+
+        _size = os.path.getsize(_path)
+        _ranges = []
+
+        with open(_path, 'rb') as _f:
+
+            while _start < _size:
+
+                _end = min(_start + self._chunk_bytes, _size)
+
+                # Move the cut to just after the next newline
+                if _end < _size:
+                    _f.seek(_end)
+                    while True:
+                        _block = _f.read(1 << 16)
+                        if not _block:
+                            _end = _size
+                            break
+                        _i = _block.find(b'\n')
+                        if _i >= 0:
+                            _end += _i + 1
+                            break
+                        _end += len(_block)
+
+                _ranges.append((_start, _end - _start))
+                _start = _end
+
+        return _ranges
+
+    """
+    Parsed chunks of a CSV file, in file order
+    """
+    def _chunks_(self, _path, _start, _layout, _delimiter):
+
+        _tasks = [(_path, _offset, _length, _layout, _delimiter, self._broker_gmt)
+                  for _offset, _length in self._ranges_(_path, _start)]
+
+        if self._workers <= 1 or len(_tasks) <= 1:
+            for _task in _tasks:
+                yield _parse_chunk_(*_task)
+            return
+
+        with Pool(min(self._workers, len(_tasks))) as _pool:
+            for _chunk in _pool.imap(_parse_chunk_star_, _tasks):
+                yield _chunk
+
+    ##########################################################################
+
+    def _import_ticks_csv_(self, _path, _symbol, _start, _layout, _delimiter):
+
+        _t = perf_counter()
+        _rows = 0
+        _writer = None
+
+        try:
+            for _ts, _values in self._chunks_(_path, _start, _layout, _delimiter):
+
+                if not len(_ts):
+                    continue
+
+                if _values.shape[1] < 2:
+                    raise ValueError('[IMPORT] {}: BID and ASK columns expected'.format(_path))
+
+                if _writer is None:
+                    _writer = self._store._tick_writer_(_symbol, int(_ts[0]), self._block_ticks)
+
+                _writer._write_(_ts, _values[:, 0], _values[:, 1])
+                _rows += len(_ts)
+
+        finally:
+            if _writer is not None:
+                _writer._close_()
+
+        return self._report_(_path, _symbol, 'ticks', _rows, perf_counter() - _t)
+
+    def _import_bars_csv_(self, _path, _symbol, _timeframe, _start, _layout, _delimiter):
+
+        _t = perf_counter()
+        _parts = []
+
+        for _ts, _values in self._chunks_(_path, _start, _layout, _delimiter):
+
+            if not len(_ts):
+                continue
+
+            if _values.shape[1] < 5:
+                raise ValueError('[IMPORT] {}: OPEN, HIGH, LOW, CLOSE and VOLUME columns expected'.format(_path))
+
+            _bars = np.empty(len(_ts), dtype=_BAR)
+            _bars['_time'] = _ts
+            _bars['_open'] = _values[:, 0]
+            _bars['_high'] = _values[:, 1]
+            _bars['_low'] = _values[:, 2]
+            _bars['_close'] = _values[:, 3]
+            _bars['_volume'] = _values[:, 4]
+
+            _parts.append(_bars)
+
+        _rows = sum(len(_p) for _p in _parts)
+
+        if _rows:
+            self._store._write_bars_(_symbol, _timeframe, np.concatenate(_parts))
+
+        return self._report_(_path, _symbol, 'bars', _rows, perf_counter() - _t)
+
+    ##########################################################################
+
+    def _import_hst_(self, _path, _symbol=None, _timeframe=None):
+
+        _t = perf_counter()
+
+        _header = np.fromfile(_path, dtype=np.uint8, count=_HST_HEADER)
+
+        _version = int(_header[:4].view('<i4')[0])
+        _record = {400: _HST_400, 401: _HST_401}.get(_version)
+
+        if _record is None:
+            raise ValueError('[IMPORT] {}: unknown HST version {}'.format(_path, _version))
+
+        _symbol = _symbol or _header[68:80].tobytes().split(b'\x00')[0].decode()
+        _timeframe = _timeframe or int(_header[80:84].view('<i4')[0])
+
+        _records = np.memmap(_path, dtype=_record, mode='r', offset=_HST_HEADER)
+
+        _bars = np.empty(len(_records), dtype=_BAR)
+        _bars['_time'] = (_records['_time'].astype(np.int64) - int(round(self._broker_gmt * 3600))) * _NS
+
+        for _field in ('_open', '_high', '_low', '_close', '_volume'):
+            _bars[_field] = _records[_field]
+
+        del _records
+
+        if len(_bars):
+            self._store._write_bars_(_symbol, _timeframe, _bars)
+
+        return self._report_(_path, _symbol, 'bars', len(_bars), perf_counter() - _t)
+
+    ##########################################################################
+
+    def _report_(self, _path, _symbol, _kind, _rows, _seconds):
+
+        _report = {'_path': _path,
+                   '_symbol': _symbol,
+                   '_kind': _kind,
+                   '_rows': _rows,
+                   '_seconds': _seconds,
+                   '_rows_per_sec': _rows / _seconds if _seconds > 0 else 0.0}
+
+        if self._verbose:
+            print('[IMPORT] {} -> {} {}: {} rows in {:.2f}s ({:,.0f} rows/s)'.format(
+                  os.path.basename(_path), _symbol, _kind, _rows, _seconds, _report['_rows_per_sec']))
+
+        return _report
+
+    ##########################################################################
+
+if __name__ == '__main__':
+
+    _parser = argparse.ArgumentParser(description=__doc__,
+                                      formatter_class=argparse.RawDescriptionHelpFormatter)
+    _parser.add_argument('files', nargs='+', help='MT4 CSV / HST exports')
+    _parser.add_argument('--store', required=True, help='history store directory')
+    _parser.add_argument('--broker-gmt', type=float, default=3, help='broker GMT offset (hours)')
+    _parser.add_argument('--workers', type=int, default=None, help='parser processes')
+    _parser.add_argument('--symbol', help='symbol (default: from the file)')
+    _parser.add_argument('--timeframe', type=int, help='bar minutes (default: from the file)')
+    _parser.add_argument('--kind', choices=('ticks', 'bars'), help='CSV contents (default: detect)')
+    _args = _parser.parse_args()
+
+    _importer = DWX_ZMQ_History_Importer(_args.store, _args.broker_gmt, _args.workers)
+
+    _rows, _seconds = 0, 0.0
+
+    for _file in _args.files:
+        _report = _importer._import_(_file, _args.symbol, _args.timeframe, _args.kind)
+        _rows += _report['_rows']
+        _seconds += _report['_seconds']
+
+    if len(_args.files) > 1:
+        print('[IMPORT] Total: {} rows in {:.2f}s ({:,.0f} rows/s)'.format(
+              _rows, _seconds, _rows / _seconds if _seconds > 0 else 0.0))
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_History_Store.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import numpy as np
+
+from python.modules.DWX_ZMQ_Tick_Codec import DWX_ZMQ_Tick_Writer, DWX_ZMQ_Tick_Reader, _tick_path_
+
+# Bar record, _time in ns since epoch (UTC) at the bar's open
+_BAR = np.dtype([('_time', '<i8'),
+                 ('_open', '<f8'),
+                 ('_high', '<f8'),
+                 ('_low', '<f8'),
+                 ('_close', '<f8'),
+                 ('_volume', '<i8')])
+
+class DWX_ZMQ_History_Store():
+
+    """
+    Local tick and bar history, one directory per symbol:
+
+        STORE/SYMBOL/ticks/FIRST_NS.ticks       DWX_ZMQ_Tick_Codec files
+        STORE/SYMBOL/bars/M<MINUTES>.npy        _BAR records sorted by time
+
+    All times are UTC (ns since epoch).
+
+        _store = DWX_ZMQ_History_Store('history/')
+        _store._read_bars_('EURUSD', 60, _start, _end)
+        _ts, _bids, _asks = _store._read_ticks_('EURUSD', _start, _end)
+
+    DWX_ZMQ_Tick_Recorder and DWX_ZMQ_History_Importer write into it.
+    """
+    def __init__(self, _directory):
+
+        self._directory = _directory
+        os.makedirs(_directory, exist_ok=True)
+
+    ##########################################################################
+
+    def _symbols_(self):
+        return sorted(_s for _s in os.listdir(self._directory)
+                      if os.path.isdir(os.path.join(self._directory, _s)))
+
+    ##########################################################################
+    #                                                                        #
+    # Bars                                                                   #
+    #                                                                        #
+    ##########################################################################
+
+    def _bars_path_(self, _symbol, _timeframe):
+        return os.path.join(self._directory, _symbol, 'bars', 'M{}.npy'.format(int(_timeframe)))
+
+    """
+    Merge bars into the store (bars already stored at the same times are
+    replaced)
+    """
+    def _write_bars_(self, _symbol, _timeframe, _bars):
+
+        _path = self._bars_path_(_symbol, _timeframe)
+        os.makedirs(os.path.dirname(_path), exist_ok=True)
+
+        _bars = np.asarray(_bars, dtype=_BAR)
+
+        if os.path.exists(_path):
+            _bars = np.concatenate((_bars, np.load(_path)))
+
+        # First occurrence wins: the new bars come first
+        _times, _first = np.unique(_bars['_time'], return_index=True)
+        _bars = _bars[_first]
+
+        _tmp = _path + '.tmp'
+        np.save(_tmp, _bars)
+        os.replace(_tmp + '.npy', _path)
+
+        return len(_bars)
+
+    def _read_bars_(self, _symbol, _timeframe, _start=None, _end=None):
+
+        _path = self._bars_path_(_symbol, _timeframe)
+
+        if not os.path.exists(_path):
+            return np.zeros(0, dtype=_BAR)
+
+        _bars = np.load(_path, mmap_mode='r')
+
+        _lo = 0 if _start is None else np.searchsorted(_bars['_time'], _start, side='left')
+        _hi = len(_bars) if _end is None else np.searchsorted(_bars['_time'], _end, side='left')
+
+        return np.array(_bars[_lo:_hi])
+
+    ##########################################################################
+    #                                                                        #
+    # Ticks                                                                  #
+    #                                                                        #
+    ##########################################################################
+
+    def _tick_writer_(self, _symbol, _first_ns, _block_ticks=16384):
+        return DWX_ZMQ_Tick_Writer(_tick_path_(self._directory, _symbol, _first_ns),
+                                   _symbol, _block_ticks=_block_ticks)
+
+    def _tick_files_(self, _symbol):
+
+        _dir = os.path.join(self._directory, _symbol, 'ticks')
+
+        if not os.path.isdir(_dir):
+            return []
+
+        _files = [_f for _f in os.listdir(_dir) if _f.endswith('.ticks')]
+
+        return [os.path.join(_dir, _f) for _f in sorted(_files, key=lambda _f: int(_f.split('.')[0]))]
+
+    """
+    Ticks of _symbol in [_start, _end) ns, from every tick file overlapping
+    the range, in file order
+    """
+    def _read_ticks_(self, _symbol, _start=None, _end=None):
+
+        _parts = []
+
+        for _path in self._tick_files_(_symbol):
+
+            _reader = DWX_ZMQ_Tick_Reader(_path)
+
+            if not len(_reader._index):
+                continue
+            if _end is not None and _reader._index['_first'][0] >= _end:
+                continue
+            if _start is not None and _reader._index['_last'][-1] < _start:
+                continue
+
+            _parts.append(_reader._read_(_start, _end))
+
+        if not _parts:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+
+        return tuple(np.concatenate(_c) for _c in zip(*_parts))
+
+    ##########################################################################
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_MarketData_Gateway.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+from struct import Struct
+from multiprocessing import Process, Event
+from time import time_ns
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector
+
+# Normalised tick payload: BID, ASK, TIMESTAMP (ns since epoch, UTC)
+_TICK = Struct('<ddq')
+
+# Topics are SYMBOL + NUL, so subscribing to EURUSD doesn't also match EURUSDm
+_TOPIC_END = b'\x00'
+
+_DEFAULT_ENDPOINT = 'ipc:///tmp/dwx-zeromq-marketdata'
+
+def _topic_(_symbol):
+    return _symbol.encode() + _TOPIC_END
+
+##############################################################################
+
+class DWX_ZMQ_MarketData_Gateway():
+
+    """
+    Single SUB connection to MetaTrader, fanned out to any number of local
+    consumers over an XPUB socket (ipc:// by default).
+
+    Every tick is re-published as a 2-frame message [SYMBOL\\0, BID/ASK/TS]
+    with one topic per symbol. Upstream subscriptions follow what the
+    consumers ask for (or a fixed _symbols list), so MetaTrader publishes
+    to exactly one socket however many consumers are attached.
+
+    Slow consumers are handled by ZeroMQ's HWM on the publishing side:
+    _policy='drop' (default) drops ticks for a consumer once _hwm messages
+    are queued for it, _policy='block' makes the gateway wait instead
+    (never use it with consumers you don't control).
+    """
+    def __init__(self,
+                 _host='localhost',             # MetaTrader host
+                 _protocol='tcp',
+                 _SUB_PORT=32770,               # MetaTrader PUB port
+                 _delimiter=';',
+                 _endpoint=_DEFAULT_ENDPOINT,   # Local fan-out endpoint
+                 _symbols=None,                 # None = follow consumers
+                 _hwm=10000,                    # Per-consumer queue (msgs)
+                 _policy='drop',                # 'drop' or 'block'
+                 _poll_timeout=100,             # ms
+                 _verbose=False):
+
+        self._URL = _protocol + "://" + _host + ":" + str(_SUB_PORT)
+        self._delimiter = _delimiter
+        self._endpoint = _endpoint
+        self._symbols = _symbols
+        self._hwm = _hwm
+        self._policy = _policy
+        self._poll_timeout = _poll_timeout
+        self._verbose = _verbose
+
+        # Counters
+        self._ticks_in = 0
+        self._ticks_bad = 0
+        self._consumers = {}    # {SYMBOL: subscribed?}
+
+        # Works for _run_() in a thread as well as in a separate process
+        self._STOP = Event()
+        self._process = None
+
+    ##########################################################################
+
+    def _open_sockets_(self):
+
+        self._ZMQ_CONTEXT = zmq.Context()
+
+        self._SUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.SUB)
+        self._SUB_SOCKET.connect(self._URL)
+
+        self._XPUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.XPUB)
+        self._XPUB_SOCKET.setsockopt(zmq.SNDHWM, self._hwm)
+
+        if self._policy == 'block':
+            # XPUB_NODROP turns HWM into EAGAIN instead of silent drops
+            self._XPUB_SOCKET.setsockopt(zmq.XPUB_NODROP, 1)
+
+        self._XPUB_SOCKET.bind(self._endpoint)
+
+        if self._symbols is not None:
+            for _symbol in self._symbols:
+                self._subscribe_upstream_(_symbol)
+
+        self._poller = zmq.Poller()
+        self._poller.register(self._SUB_SOCKET, zmq.POLLIN)
+        self._poller.register(self._XPUB_SOCKET, zmq.POLLIN)
+
+        # Cache of topic frames, built once per symbol
+        self._topics = {}
+
+        print("[GATEWAY] {} -> {} (hwm={}, policy={})".format(self._URL, self._endpoint,
+                                                              self._hwm, self._policy))
+
+    ##########################################################################
+
+    def _subscribe_upstream_(self, _symbol):
+
+        # Trailing space: "EURUSD " matches "EURUSD 1.1;1.2" but not EURUSDm
+        self._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol + " " if _symbol else "")
+        self._consumers[_symbol] = True
+
+        print("[GATEWAY] Subscribed upstream to {}".format(_symbol or 'ALL SYMBOLS'))
+
+    def _unsubscribe_upstream_(self, _symbol):
+
+        self._SUB_SOCKET.setsockopt_string(zmq.UNSUBSCRIBE, _symbol + " " if _symbol else "")
+        self._consumers[_symbol] = False
+
+        print("[GATEWAY] Unsubscribed upstream from {}".format(_symbol or 'ALL SYMBOLS'))
+
+    ##########################################################################
+
+    """
+    XPUB reports first subscribe / last unsubscribe per topic
+    """
+    def _on_subscription_(self, _msg):
+
+        if self._symbols is not None:
+            return
+
+        _topic = _msg[1:]
+        _symbol = _topic[:-1].decode() if _topic.endswith(_TOPIC_END) else _topic.decode()
+
+        if _msg[0] == 1:
+            self._subscribe_upstream_(_symbol)
+        elif _msg[0] == 0:
+            self._unsubscribe_upstream_(_symbol)
+
+    ##########################################################################
+
+    def _on_tick_(self, _msg):
+
+        try:
+            _symbol, _bid, _ask = DWX_ZeroMQ_Connector._DWX_ZMQ_PARSE_TICK_(_msg.decode(),
+                                                                             self._delimiter)
+        except ValueError:
+            self._ticks_bad += 1
+            return
+
+        self._ticks_in += 1
+
+        _topic = self._topics.get(_symbol)
+
+        if _topic is None:
+            _topic = self._topics[_symbol] = zmq.Frame(_topic_(_symbol))
+
+        if self._verbose:
+            print("[GATEWAY] {} {}/{}".format(_symbol, _bid, _ask))
+
+        _flags = 0 if self._policy == 'block' else zmq.DONTWAIT
+
+        try:
+            # Topic frame is reused, payload is handed over without a copy
+            self._XPUB_SOCKET.send(_topic, _flags | zmq.SNDMORE, copy=False)
+            self._XPUB_SOCKET.send(_TICK.pack(_bid, _ask, time_ns()), _flags, copy=False)
+
+        except zmq.error.Again:
+            pass # No consumers, or 'drop' policy at HWM
+
+    ##########################################################################
+
+    """
+    Run the gateway loop in the calling thread until _stop_() is called
+    """
+    def _run_(self):
+
+        self._open_sockets_()
+
+        try:
+            while not self._STOP.is_set():
+
+                sockets = dict(self._poller.poll(self._poll_timeout))
+
+                if self._XPUB_SOCKET in sockets:
+                    self._on_subscription_(self._XPUB_SOCKET.recv())
+
+                if self._SUB_SOCKET in sockets:
+
+                    # Drain everything queued before polling again
+                    while True:
+                        try:
+                            self._on_tick_(self._SUB_SOCKET.recv(zmq.DONTWAIT))
+                        except zmq.error.Again:
+                            break
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            self._ZMQ_CONTEXT.destroy(0)
+            print("\n++ [GATEWAY] {} ticks forwarded, {} malformed. Signing Out ++".format(self._ticks_in,
+                                                                                        self._ticks_bad))
+
+    ##########################################################################
+
+    """
+    Run the gateway in a separate (daemon) process
+    """
+    def _start_(self):
+
+        self._process = Process(name='DWX_ZMQ_MarketData_Gateway', target=self._run_)
+        self._process.daemon = True
+        self._process.start()
+
+        return self._process
+
+    def _stop_(self, _timeout=2):
+
+        self._STOP.set()
+
+        if self._process is not None:
+
+            self._process.join(_timeout)
+
+            if self._process.is_alive():
+                self._process.terminate()
+
+    ##########################################################################
+
+class DWX_ZMQ_MarketData_Subscriber():
+
+    """
+    Local consumer of DWX_ZMQ_MarketData_Gateway ticks.
+    """
+    def __init__(self,
+                 _symbols=('EURUSD',),
+                 _endpoint=_DEFAULT_ENDPOINT,
+                 _hwm=10000,                    # Local receive queue (msgs)
+                 _context=None):
+
+        self._ZMQ_CONTEXT = zmq.Context.instance() if _context is None else _context
+
+        self._SUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.SUB)
+        self._SUB_SOCKET.setsockopt(zmq.RCVHWM, _hwm)
+        self._SUB_SOCKET.connect(_endpoint)
+
+        for _symbol in _symbols:
+            self._subscribe_(_symbol)
+
+    ##########################################################################
+
+    def _subscribe_(self, _symbol):
+        self._SUB_SOCKET.setsockopt(zmq.SUBSCRIBE, _topic_(_symbol))
+
+    def _unsubscribe_(self, _symbol):
+        self._SUB_SOCKET.setsockopt(zmq.UNSUBSCRIBE, _topic_(_symbol))
+
+    ##########################################################################
+
+    """
+    Receive the next tick as (SYMBOL, BID, ASK, TIMESTAMP_NS), or None if
+    nothing arrived within _timeout ms
+    """
+    def _recv_(self, _timeout=None):
+
+        if _timeout is not None and not self._SUB_SOCKET.poll(_timeout):
+            return None
+
+        _topic, _payload = self._SUB_SOCKET.recv_multipart(copy=False)
+        _bid, _ask, _ts = _TICK.unpack(_payload.buffer)
+
+        return (_topic.bytes[:-1].decode(), _bid, _ask, _ts)
+
+    ##########################################################################
+
+    def _close_(self):
+        self._SUB_SOCKET.close(0)
+
+    ##########################################################################
+
+if __name__ == '__main__':
+
+    import argparse
+
+    _parser = argparse.ArgumentParser(description='DWX ZeroMQ market data gateway')
+    _parser.add_argument('--host', default='localhost')
+    _parser.add_argument('--sub-port', type=int, default=32770)
+    _parser.add_argument('--endpoint', default=_DEFAULT_ENDPOINT)
+    _parser.add_argument('--symbols', default=None,
+                         help='comma separated, default: follow consumer subscriptions')
+    _parser.add_argument('--hwm', type=int, default=10000)
+    _parser.add_argument('--policy', choices=('drop', 'block'), default='drop')
+    _args = _parser.parse_args()
+
+    DWX_ZMQ_MarketData_Gateway(_host=_args.host,
+                               _SUB_PORT=_args.sub_port,
+                               _endpoint=_args.endpoint,
+                               _symbols=_args.symbols.split(',') if _args.symbols else None,
+                               _hwm=_args.hwm,
+                               _policy=_args.policy)._run_()
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_News_Calendar.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import csv
+import json
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from queue import Queue, Empty
+from threading import Thread, Condition
+from time import time
+
+# Boundaries delivered to traders, in the order they happen
+PRE_EVENT = 'PRE_EVENT'
+EVENT = 'EVENT'
+EXIT = 'EXIT'
+
+_TIME_FORMATS = ('%Y.%m.%d %H:%M:%S', '%Y.%m.%d %H:%M',
+                 '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M',
+                 '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M')
+
+def _parse_time_(_value):
+
+    if isinstance(_value, (int, float)):
+        return float(_value)
+
+    if isinstance(_value, datetime):
+        return _value.timestamp()
+
+    for _fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(_value.strip(), _fmt).timestamp()
+        except ValueError:
+            pass
+
+    raise ValueError("[CALENDAR] Unrecognised event time {!r}".format(_value))
+
+##############################################################################
+
+class DWX_ZMQ_News_Calendar():
+
+    """
+    Economic calendar indexed by time and by symbol.
+
+    Events are dicts:
+        {'_time': POSIX timestamp (local wall clock, as datetime.now()),
+         '_title': 'US Non-Farm Payrolls',
+         '_symbols': ('EURUSD', 'XAUUSD'),   # explicit symbols, and/or
+         '_currency': 'USD',                 # every symbol containing it
+         '_impact': 'HIGH'}
+
+    CSV files need a 'time' column and 'symbols' (separated by spaces or
+    '|') and/or 'currency' columns; 'title' and 'impact' are optional.
+    JSON files hold a list of objects with the same keys.
+    """
+    def __init__(self, _events=()):
+
+        self._events = []           # sorted by '_time'
+        self._times = []            # parallel list of times, for bisect
+        self._by_symbol = {}        # {SYMBOL: ([TIMES], [EVENTS])}
+        self._by_currency = {}      # {CURRENCY: ([TIMES], [EVENTS])}
+
+        self._add_events_(_events)
+
+    ##########################################################################
+
+    @classmethod
+    def _from_file_(cls, _path):
+
+        with open(_path, newline='') as _f:
+
+            if _path.lower().endswith('.json'):
+                _rows = json.load(_f)
+            else:
+                _rows = list(csv.DictReader(_f))
+
+        return cls(cls._normalise_(_row) for _row in _rows)
+
+    @classmethod
+    def _from_newstime_(cls, _newstime, _symbols, _title='NEWS'):
+
+        return cls([{'_time': _parse_time_(_newstime),
+                     '_title': _title,
+                     '_symbols': tuple(_symbols),
+                     '_currency': None,
+                     '_impact': None}])
+
+    @staticmethod
+    def _normalise_(_row):
+
+        _symbols = _row.get('symbols') or ()
+
+        if isinstance(_symbols, str):
+            _symbols = _symbols.replace('|', ' ').split()
+
+        return {'_time': _parse_time_(_row['time']),
+                '_title': _row.get('title', ''),
+                '_symbols': tuple(_symbols),
+                '_currency': _row.get('currency') or None,
+                '_impact': _row.get('impact') or None}
+
+    ##########################################################################
+
+    def _add_events_(self, _events):
+
+        _events = sorted(list(_events) + self._events, key=lambda _e: _e['_time'])
+
+        self._events = _events
+        self._times = [_e['_time'] for _e in _events]
+        self._by_symbol = {}
+        self._by_currency = {}
+
+        for _event in _events:
+
+            for _symbol in _event['_symbols']:
+                _index = self._by_symbol.setdefault(_symbol, ([], []))
+                _index[0].append(_event['_time'])
+                _index[1].append(_event)
+
+            if _event['_currency']:
+                _index = self._by_currency.setdefault(_event['_currency'], ([], []))
+                _index[0].append(_event['_time'])
+                _index[1].append(_event)
+
+    ##########################################################################
+
+    """
+    All events between _start and _end (POSIX timestamps, inclusive)
+    """
+    def _events_between_(self, _start, _end):
+
+        return self._events[bisect_left(self._times, _start):bisect_right(self._times, _end)]
+
+    ##########################################################################
+
+    """
+    Events affecting _symbol between _start and _end, in time order
+    """
+    def _events_for_(self, _symbol, _start=float('-inf'), _end=float('inf')):
+
+        _found = []
+
+        _indices = [self._by_symbol.get(_symbol)]
+        _indices += [_index for _ccy, _index in self._by_currency.items() if _ccy in _symbol]
+
+        for _index in _indices:
+            if _index is not None:
+                _found += _index[1][bisect_left(_index[0], _start):bisect_right(_index[0], _end)]
+
+        # Explicit symbol + currency match can list the same event twice
+        _unique = {id(_e): _e for _e in _found}
+
+        return sorted(_unique.values(), key=lambda _e: _e['_time'])
+
+    ##########################################################################
+
+    def __len__(self):
+        return len(self._events)
+
+##############################################################################
+
+class DWX_ZMQ_News_Scheduler():
+
+    """
+    Wakes symbol traders at the PRE_EVENT, EVENT and EXIT boundaries of the
+    calendar events affecting them.
+
+    One thread sleeps until the next boundary of any registered symbol and
+    posts (PHASE, EVENT) into that symbol's mailbox only; traders block in
+    _wait_() instead of polling the wall clock.
+    """
+    def __init__(self, _calendar,
+                 _pre_event=120,        # seconds before the event (PRE_EVENT)
+                 _post_event=300):      # seconds after the event (EXIT)
+
+        self._calendar = _calendar
+        self._offsets = ((PRE_EVENT, -_pre_event), (EVENT, 0), (EXIT, _post_event))
+
+        self._heap = []                 # [(BOUNDARY_TIME, SEQ, PHASE, SYMBOL, EVENT)]
+        self._seq = 0
+        self._mailboxes = {}            # {SYMBOL: Queue}
+
+        self._cond = Condition()
+        self._ACTIVE = True
+
+        self._thread = Thread(name='DWX_ZMQ_News_Scheduler', target=self._run_)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##########################################################################
+
+    """
+    Register a symbol trader; boundaries of events that haven't exited yet
+    are scheduled (past PRE_EVENT/EVENT boundaries are delivered at once).
+    """
+    def _register_(self, _symbol):
+
+        _now = time()
+        _post = self._offsets[-1][1]
+
+        with self._cond:
+
+            self._mailboxes.setdefault(_symbol, Queue())
+
+            for _event in self._calendar._events_for_(_symbol, _now - _post):
+                for _phase, _offset in self._offsets:
+                    heapq.heappush(self._heap, (_event['_time'] + _offset, self._seq,
+                                                _phase, _symbol, _event))
+                    self._seq += 1
+
+            self._cond.notify()
+
+    ##########################################################################
+
+    def _run_(self):
+
+        while self._ACTIVE:
+
+            with self._cond:
+
+                _now = time()
+
+                while self._heap and self._heap[0][0] <= _now:
+                    _t, _seq, _phase, _symbol, _event = heapq.heappop(self._heap)
+                    self._mailboxes[_symbol].put((_phase, _event))
+
+                # Sleep until the next boundary (or a new registration)
+                self._cond.wait(self._heap[0][0] - _now if self._heap else None)
+
+    ##########################################################################
+
+    """
+    Block until the next boundary for _symbol: returns (PHASE, EVENT), or
+    None after _timeout seconds.
+    """
+    def _wait_(self, _symbol, _timeout=None):
+
+        try:
+            return self._mailboxes[_symbol].get(timeout=_timeout)
+        except Empty:
+            return None
+
+    ##########################################################################
+
+    """
+    Time of the next scheduled boundary for _symbol (None if none left)
+    """
+    def _next_boundary_(self, _symbol):
+
+        with self._cond:
+            _times = [_b[0] for _b in self._heap if _b[3] == _symbol]
+
+        return min(_times) if _times else None
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        with self._cond:
+            self._ACTIVE = False
+            self._cond.notify_all()
+
+        self._thread.join()
+
+    ##########################################################################
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_PnL_Engine.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import numpy as np
+from threading import Lock
+
+# MT4 market order types (pending orders carry no P&L)
+OP_BUY, OP_SELL = 0, 1
+
+class DWX_ZMQ_PnL_Engine():
+
+    """
+    Open P&L of every open position, updated at tick frequency.
+
+    Positions live in NumPy arrays sorted by symbol, so each symbol's
+    positions are one contiguous slice. A tick reprices only that slice
+    and adds the change to the per-symbol, per-magic, per-trader (order
+    comment) and account totals, without any round trip to the terminal.
+
+        _pnl = DWX_ZMQ_PnL_Engine(self._zmq, _point_values={'XAUUSD': 100})
+        _pnl._add_(_ticket, 'EURUSD', OP_BUY, 0.01, 1.10002, 123456, 'EURUSD_Trader')
+        _pnl._account_pnl_()
+        _pnl._by_magic_()                   # {123456: -0.2, ..}
+        _pnl._remove_(_ticket)
+
+    P&L = (close price - entry) * lots * point value, in the quote
+    currency: _point_values gives the value of a 1.0 price move for one
+    lot per symbol (_default_point_value otherwise, 100000 for FX).
+    Symbols of new positions are subscribed to if they aren't already.
+    """
+    def __init__(self, _zmq,
+                 _point_values=None,            # {SYMBOL: value of 1.0 per lot}
+                 _default_point_value=100000,
+                 _subscribe=True):
+
+        self._zmq = _zmq
+        self._point_values = dict(_point_values or {})
+        self._default_point_value = _default_point_value
+        self._subscribe = _subscribe
+
+        # Group indices: {KEY: INDEX}
+        self._symbols = {}
+        self._magics = {}
+        self._traders = {}
+
+        # Positions, sorted by symbol index
+        self._tickets = np.zeros(0, dtype=np.int64)
+        self._symbol_idx = np.zeros(0, dtype=np.intp)
+        self._magic_idx = np.zeros(0, dtype=np.intp)
+        self._trader_idx = np.zeros(0, dtype=np.intp)
+        self._buy = np.zeros(0, dtype=bool)
+        self._entry = np.zeros(0)
+        self._size = np.zeros(0)           # +/- lots * point value
+        self._pnl = np.zeros(0)
+
+        # Slice of each symbol: _starts[i]:_ends[i]
+        self._starts = np.zeros(0, dtype=np.intp)
+        self._ends = np.zeros(0, dtype=np.intp)
+
+        # Totals
+        self._symbol_pnl = np.zeros(0)
+        self._magic_pnl = np.zeros(0)
+        self._trader_pnl = np.zeros(0)
+        self._account = 0.0
+
+        self._ticks = 0
+        self._lock = Lock()
+
+        self._zmq._DWX_ZMQ_ADD_TICK_HANDLER_(self._on_tick_)
+
+    ##########################################################################
+
+    @staticmethod
+    def _index_(_groups, _key):
+        return _groups.setdefault(_key, len(_groups))
+
+    ##########################################################################
+
+    def _on_tick_(self, _symbol, _bid, _ask):
+
+        _i = self._symbols.get(_symbol)
+
+        if _i is None:
+            return
+
+        with self._lock:
+
+            _s, _e = self._starts[_i], self._ends[_i]
+
+            if _s == _e:
+                return
+
+            # Buys close at the bid, sells at the ask
+            _new = (np.where(self._buy[_s:_e], _bid, _ask) - self._entry[_s:_e]) * self._size[_s:_e]
+            _delta = _new - self._pnl[_s:_e]
+            self._pnl[_s:_e] = _new
+
+            np.add.at(self._magic_pnl, self._magic_idx[_s:_e], _delta)
+            np.add.at(self._trader_pnl, self._trader_idx[_s:_e], _delta)
+
+            _d = _delta.sum()
+            self._symbol_pnl[_i] += _d
+            self._account += _d
+
+            self._ticks += 1
+
+    ##########################################################################
+
+    """
+    Add an open position (pending order types are ignored)
+    """
+    def _add_(self, _ticket, _symbol, _type, _lots, _open_price, _magic=0, _comment=''):
+        self._add_many_([(_ticket, _symbol, _type, _lots, _open_price, _magic, _comment)])
+
+    def _add_many_(self, _positions):
+
+        _positions = [_p for _p in _positions if _p[2] in (OP_BUY, OP_SELL)]
+
+        if not _positions:
+            return
+
+        with self._lock:
+
+            _known = set(self._tickets.tolist())
+            _positions = [_p for _p in _positions if int(_p[0]) not in _known]
+
+            _new = [(int(_t),
+                     self._index_(self._symbols, _sym),
+                     self._index_(self._magics, _magic),
+                     self._index_(self._traders, _comment),
+                     _type == OP_BUY,
+                     float(_price),
+                     (1 if _type == OP_BUY else -1) * float(_lots)
+                        * self._point_values.get(_sym, self._default_point_value))
+                    for _t, _sym, _type, _lots, _price, _magic, _comment in _positions]
+
+            if _new:
+                _cols = list(zip(*_new))
+                self._rebuild_(np.concatenate((self._tickets, np.array(_cols[0], dtype=np.int64))),
+                               np.concatenate((self._symbol_idx, np.array(_cols[1], dtype=np.intp))),
+                               np.concatenate((self._magic_idx, np.array(_cols[2], dtype=np.intp))),
+                               np.concatenate((self._trader_idx, np.array(_cols[3], dtype=np.intp))),
+                               np.concatenate((self._buy, np.array(_cols[4], dtype=bool))),
+                               np.concatenate((self._entry, np.array(_cols[5]))),
+                               np.concatenate((self._size, np.array(_cols[6]))))
+
+        if self._subscribe:
+            for _p in _positions:
+                if _p[1] not in self._zmq._SUBSCRIPTIONS:
+                    self._zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_p[1])
+
+    ##########################################################################
+
+    def _remove_(self, _ticket):
+
+        with self._lock:
+
+            _keep = self._tickets != int(_ticket)
+
+            if not _keep.all():
+                self._rebuild_(self._tickets[_keep], self._symbol_idx[_keep],
+                               self._magic_idx[_keep], self._trader_idx[_keep],
+                               self._buy[_keep], self._entry[_keep], self._size[_keep])
+
+    ##########################################################################
+
+    """
+    Replace all positions with those of an open trades report
+    ({TICKET: {'_symbol': .., '_type': .., ..}}, as in GET_OPEN_TRADES)
+    """
+    def _load_(self, _trades):
+
+        with self._lock:
+            _empty = np.zeros(0, dtype=np.int64)
+            self._rebuild_(_empty, _empty.astype(np.intp), _empty.astype(np.intp),
+                           _empty.astype(np.intp), _empty.astype(bool),
+                           _empty.astype(float), _empty.astype(float))
+
+        self._add_many_([(_t, _trade['_symbol'], _trade['_type'], _trade['_lots'],
+                          _trade['_open_price'], _trade['_magic'], _trade['_comment'])
+                         for _t, _trade in _trades.items()])
+
+    ##########################################################################
+
+    """
+    Sort positions by symbol, reprice all of them at the current quotes and
+    recompute every total (called with self._lock held)
+    """
+    def _rebuild_(self, _tickets, _symbol_idx, _magic_idx, _trader_idx, _buy, _entry, _size):
+
+        _order = np.argsort(_symbol_idx, kind='stable')
+
+        self._tickets = _tickets[_order]
+        self._symbol_idx = _symbol_idx[_order]
+        self._magic_idx = _magic_idx[_order]
+        self._trader_idx = _trader_idx[_order]
+        self._buy = _buy[_order]
+        self._entry = _entry[_order]
+        self._size = _size[_order]
+
+        _n = len(self._symbols)
+        _all = np.arange(_n)
+
+        self._starts = np.searchsorted(self._symbol_idx, _all, side='left')
+        self._ends = np.searchsorted(self._symbol_idx, _all, side='right')
+
+        # No quote yet: P&L 0 until the first tick
+        _names = sorted(self._symbols, key=self._symbols.get)
+        _quotes = [self._zmq._Curr_Bid_Ask.get(_s, (np.nan, np.nan)) for _s in _names]
+        _bids = np.array([_q[0] for _q in _quotes]).reshape(_n)
+        _asks = np.array([_q[1] for _q in _quotes]).reshape(_n)
+
+        _price = np.where(self._buy, _bids[self._symbol_idx], _asks[self._symbol_idx])
+        self._pnl = np.nan_to_num((_price - self._entry) * self._size)
+
+        self._symbol_pnl = np.bincount(self._symbol_idx, self._pnl, _n)
+        self._magic_pnl = np.bincount(self._magic_idx, self._pnl, len(self._magics))
+        self._trader_pnl = np.bincount(self._trader_idx, self._pnl, len(self._traders))
+        self._account = float(self._pnl.sum())
+
+    ##########################################################################
+
+    def _account_pnl_(self):
+        return self._account
+
+    def _by_symbol_(self):
+        return self._totals_(self._symbols, '_symbol_pnl')
+
+    def _by_magic_(self):
+        return self._totals_(self._magics, '_magic_pnl')
+
+    def _by_trader_(self):
+        return self._totals_(self._traders, '_trader_pnl')
+
+    def _totals_(self, _groups, _attr):
+
+        with self._lock:
+            _pnl = getattr(self, _attr)
+            return {_key: float(_pnl[_i]) for _key, _i in _groups.items()}
+
+    def _positions_(self):
+        return len(self._tickets)
+
+    ##########################################################################
+
+    def _stop_(self):
+        self._zmq._DWX_ZMQ_REMOVE_TICK_HANDLER_(self._on_tick_)
+
+    ##########################################################################
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Process_Runner.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from ast import literal_eval
+from multiprocessing import Process, Event
+from time import sleep, monotonic
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector
+from python.modules.DWX_ZMQ_Shared_Memory import DWX_ZMQ_Shared_Quote_Board, DWX_ZMQ_Command_Ring
+from python.modules.DWX_ZMQ_Risk_Gate import DWX_ZMQ_Risk_Gate
+
+class _DWX_ZMQ_Board_View():
+
+    """
+    Read-only {SYMBOL: (BID, ASK)} view of a shared quote board, so trader
+    code written against self._zmq._Curr_Bid_Ask keeps working.
+    """
+    def __init__(self, _board):
+        self._board = _board
+
+    def __getitem__(self, _symbol):
+
+        _bid, _ask, _ts, _seq = self._board._read_(_symbol)
+
+        if _seq == 0:
+            raise KeyError(_symbol)
+
+        return (_bid, _ask)
+
+    def get(self, _symbol, _default=None):
+
+        try:
+            return self[_symbol]
+        except KeyError:
+            return _default
+
+    def __contains__(self, _symbol):
+        return (_symbol in self._board._index
+                and self._board._read_(_symbol)[3] > 0)
+
+    def keys(self):
+        return [_s for _s in self._board._symbols if _s in self]
+
+##############################################################################
+
+class DWX_ZMQ_Remote_Connector(DWX_ZeroMQ_Connector):
+
+    """
+    Socket-less connector used inside trader processes.
+
+    Commands are pushed onto this trader's command ring and executed by the
+    single connector process; replies come back on the reply ring and
+    prices are read from the shared quote board. All convenience wrappers
+    (_DWX_MTX_NEW_TRADE_, _DWX_MTX_CLOSE_TRADE_BY_TICKET_, ..) and the
+    DWX_ZMQ_Execution / DWX_ZMQ_Reporting modules work unchanged on top.
+    """
+    def __init__(self, _board, _commands, _replies,
+                 _ClientID='dwx-zeromq',
+                 _sleep_delay=0.0001):
+
+        # No super().__init__() on purpose: trader processes own no sockets.
+        self._DWX_ZMQ_INIT_STATE_(_ClientID, _verbose=False, _sleep_delay=_sleep_delay)
+        self._PUSH_SOCKET = None
+
+        self._board = _board
+        self._commands = _commands
+        self._replies = _replies
+
+        self._QUOTE_BOARD = _board
+        self._Curr_Bid_Ask = _DWX_ZMQ_Board_View(_board)
+
+    ##########################################################################
+
+    def remote_send(self, _socket, _data):
+
+        # Never drop a command, wait for the connector process to catch up
+        while not self._commands._push_(_data):
+            sleep(self._sleep_delay)
+
+    ##########################################################################
+
+    def _get_response_(self):
+
+        # Drain the reply ring, keeping the most recent reply
+        _msg = self._replies._pop_()
+
+        while _msg is not None:
+            self._thread_data_output = literal_eval(_msg.decode())
+            _msg = self._replies._pop_()
+
+        return self._thread_data_output
+
+    ##########################################################################
+
+    def _set_response_(self, _resp=None):
+
+        # Discard late replies to timed out commands, or the next request
+        # would take one of them as its own
+        while self._replies._pop_() is not None:
+            pass
+
+        self._thread_data_output = _resp
+
+    ##########################################################################
+
+    # The connector process subscribes to every symbol on the board.
+    def _DWX_MTX_SUBSCRIBE_MARKETDATA_(self, _symbol='EURUSD', *args, **kwargs):
+        pass
+
+    def _DWX_MTX_UNSUBSCRIBE_MARKETDATA_(self, _symbol):
+        pass
+
+    def _DWX_ZMQ_SHUTDOWN_(self):
+        self._ACTIVE = False
+
+##############################################################################
+
+def _connector_main_(_board, _rings, _stop, _zmq_kwargs,
+                     _delay=0.1, _wbreak=10, _sleep_delay=0.0001,
+                     _risk_limits=None):
+
+    """
+    Connector process: owns the ZeroMQ sockets, feeds the quote board and
+    executes commands from every trader's ring one at a time. With
+    _risk_limits, every trader's OPENs go through one DWX_ZMQ_Risk_Gate
+    here; a refused OPEN is answered with the REJECTED reply.
+    """
+
+    _zmq = DWX_ZeroMQ_Connector(**_zmq_kwargs)
+
+    if _risk_limits:
+        DWX_ZMQ_Risk_Gate(_zmq, **_risk_limits)
+
+    # Quotes go straight from the poller thread onto the shared board
+    def _on_tick_(_symbol, _bid, _ask):
+        if _symbol in _board._index:
+            _board._write_(_symbol, _bid, _ask)
+
+    _zmq._DWX_ZMQ_ADD_TICK_HANDLER_(_on_tick_)
+
+    for _symbol in _board._symbols:
+        _zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_symbol)
+
+    while not _stop.is_set():
+
+        _idle = True
+
+        for _commands, _replies in _rings:
+
+            _msg = _commands._pop_()
+
+            if _msg is None:
+                continue
+
+            _idle = False
+
+            # MetaTrader replies aren't tagged, so one command in flight at a time
+            _zmq._set_response_(None)
+            _msg = _msg.decode()
+
+            if _zmq._RISK_GATE is not None and _msg.startswith('TRADE;OPEN;'):
+
+                # Through the gate: TRADE;OPEN;TYPE;SYMBOL;PRICE;SL;TP;COMMENT;LOTS;MAGIC;TICKET
+                _f = _msg.split(';')
+                _zmq._DWX_MTX_SEND_COMMAND_(_f[1], _f[2], _f[3], float(_f[4]), _f[5], _f[6],
+                                            _f[7], float(_f[8]), int(_f[9]), _f[10])
+            else:
+                _zmq.remote_send(_zmq._PUSH_SOCKET, _msg)
+
+            _ws = monotonic()
+
+            while _zmq._valid_response_('zmq') == False:
+
+                sleep(_sleep_delay)
+
+                if monotonic() - _ws > (_delay * _wbreak):
+                    break
+
+            if _zmq._valid_response_('zmq'):
+
+                _reply = repr(_zmq._get_response_())
+
+                try:
+                    while not _replies._push_(_reply):
+                        sleep(_sleep_delay)
+
+                except ValueError:
+                    print("[RUNNER] Reply too large for reply ring, increase _reply_slot_size")
+                    _replies._push_(repr({'_action': 'ERROR', '_response': 'REPLY_TOO_LARGE'}))
+
+        if _idle:
+            sleep(_sleep_delay)
+
+    _zmq._DWX_ZMQ_SHUTDOWN_()
+
+##############################################################################
+
+def _trader_main_(_trader, _symbol, _board, _commands, _replies, _stop, _ClientID):
+
+    """
+    Trader process: runs _trader(_zmq, _symbol, _stop) against a
+    DWX_ZMQ_Remote_Connector.
+    """
+
+    _zmq = DWX_ZMQ_Remote_Connector(_board, _commands, _replies, _ClientID)
+
+    try:
+        _trader(_zmq, _symbol, _stop)
+
+    except KeyboardInterrupt:
+        pass
+
+    print('\n[{}_Trader] .. and that\'s a wrap! Time to head home.\n'.format(_symbol[0]))
+
+##############################################################################
+
+class DWX_ZMQ_Process_Runner():
+
+    """
+    Run each symbol trader in its own process.
+
+    _trader must be a module-level function _trader(_zmq, _symbol, _stop):
+        _zmq    -> DWX_ZMQ_Remote_Connector (same API as DWX_ZeroMQ_Connector)
+        _symbol -> (SYMBOL, LOTS) tuple, as in DWX_ZMQ_Strategy._symbols
+        _stop   -> multiprocessing.Event, set when the runner stops
+
+    A single connector process owns the MetaTrader sockets; traders get
+    prices from a shared memory quote board and send commands over
+    lock-free rings, so they never share a GIL or a Lock with the poller.
+    Risk limits (_risk_limits) are checked there, across all traders.
+    """
+    def __init__(self, _trader,
+                 _symbols=[('EURUSD',0.01)],    # List of (Symbol,Lotsize) tuples
+                 _zmq_kwargs=None,              # kwargs for DWX_ZeroMQ_Connector
+                 _delay=0.1,
+                 _wbreak=10,
+                 _ring_slots=1024,
+                 _slot_size=512,
+                 _reply_slots=16,
+                 _reply_slot_size=65536,
+                 _sleep_delay=0.0001,
+                 _risk_limits=None):            # DWX_ZMQ_Risk_Gate limits for all traders
+
+        self._trader = _trader
+        self._symbols = _symbols
+        self._zmq_kwargs = _zmq_kwargs or {'_verbose': False}
+        self._delay = _delay
+        self._wbreak = _wbreak
+        self._ring_slots = _ring_slots
+        self._slot_size = _slot_size
+        self._reply_slots = _reply_slots
+        self._reply_slot_size = _reply_slot_size
+        self._sleep_delay = _sleep_delay
+        self._risk_limits = _risk_limits
+
+        self._board = None
+        self._rings = []
+        self._traders = []
+        self._connector = None
+        self._stop = Event()
+
+    ##########################################################################
+
+    def _run_(self):
+
+        self._board = DWX_ZMQ_Shared_Quote_Board([_s[0] for _s in self._symbols])
+
+        self._rings = [(DWX_ZMQ_Command_Ring(self._ring_slots, self._slot_size),
+                        DWX_ZMQ_Command_Ring(self._reply_slots, self._reply_slot_size))
+                       for _symbol in self._symbols]
+
+        self._connector = Process(name='DWX_ZMQ_Connector',
+                                  target=_connector_main_,
+                                  args=(self._board, self._rings, self._stop,
+                                        self._zmq_kwargs, self._delay,
+                                        self._wbreak, self._sleep_delay,
+                                        self._risk_limits))
+        self._connector.daemon = True
+        self._connector.start()
+
+        # Launch traders!
+        for _symbol, (_commands, _replies) in zip(self._symbols, self._rings):
+
+            _p = Process(name="{}_Trader".format(_symbol[0]),
+                         target=_trader_main_,
+                         args=(self._trader, _symbol, self._board,
+                               _commands, _replies, self._stop,
+                               '{}_Trader'.format(_symbol[0])))
+            _p.daemon = True
+            _p.start()
+
+            print('[{}_Trader] Alright, here we go.. Gerrrronimooooooooooo!  ..... xD'.format(_symbol[0]))
+
+            self._traders.append(_p)
+
+    ##########################################################################
+
+    def _stop_(self, _timeout=5):
+
+        self._stop.set()
+
+        for _p in self._traders:
+
+            _p.join(_timeout)
+
+            if _p.is_alive():
+                _p.terminate()
+
+        self._connector.join(_timeout)
+
+        if self._connector.is_alive():
+            self._connector.terminate()
+
+        for _commands, _replies in self._rings:
+            _commands._close_()
+            _replies._close_()
+
+        self._board._close_()
+
+        print('\n[RUNNER] All trader processes stopped, shared memory released.')
+
+    ##########################################################################
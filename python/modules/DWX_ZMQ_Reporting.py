@@ -13,8 +13,7 @@
     https://opensource.org/licenses/BSD-3-Clause
 """
 
-from pandas import DataFrame, to_datetime
-from time import sleep
+from time import sleep, monotonic
 
 class DWX_ZMQ_Reporting():
     
@@ -26,35 +25,69 @@ class DWX_ZMQ_Reporting():
     def _get_open_trades_(self, _trader='Trader_SYMBOL', 
                           _delay=0.1, _wbreak=10):
         
-        # Reset data output
-        self._zmq._set_response_(None)
+        # Strategies sharing this connector take turns
+        with self._zmq._REQUEST_LOCK:
+            
+            # Reset data output
+            self._zmq._set_response_(None)
         
-        # Get open trades from MetaTrader
-        self._zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()
+            # Get open trades from MetaTrader
+            self._zmq._DWX_MTX_GET_ALL_OPEN_TRADES_()
 
-        # While loop start time reference            
-        _ws = to_datetime('now')
+            # While loop start time reference            
+            _ws = monotonic()
+        
+            # While no OPEN_TRADES reply received, sleep until timeout (a
+            # late reply to an earlier, timed out command isn't one)
+            while not (self._zmq._valid_response_('zmq')
+                       and '_trades' in self._zmq._get_response_().keys()):
+            
+                sleep(_delay)
+            
+                if monotonic() - _ws > (_delay * _wbreak):
+                    break
         
-        # While data not received, sleep until timeout
-        while self._zmq._valid_response_('zmq') == False:
+            # If data received, return DataFrame
+            if self._zmq._valid_response_('zmq'):
+            
+                _response = self._zmq._get_response_()
             
-            sleep(_delay)
+                if '_trades' in _response.keys():
+                    return self._open_trades_frame_(_response['_trades'], _trader)
             
-            if (to_datetime('now') - _ws).total_seconds() > (_delay * _wbreak):
-                break
+        # Default
+        return self._open_trades_frame_({}, _trader)
+    
+    ##########################################################################
+    
+    """
+    {TICKET: {'_comment': .., ..}} (dicts or DWX_ZMQ_Trade records) ->
+    DataFrame of _trader's trades (all trades if _trader is None)
+    """
+    @staticmethod
+    def _open_trades_frame_(_trades, _trader='Trader_SYMBOL'):
         
-        # If data received, return DataFrame
-        if self._zmq._valid_response_('zmq'):
+        # pandas is only loaded once a DataFrame report is requested
+        from pandas import DataFrame
+        
+        if len(_trades) > 0:
+            
+            _rows = list(_trades.values())
             
-            _response = self._zmq._get_response_()
+            if isinstance(_rows[0], dict):
+                _df = DataFrame(data=_rows,
+                                index=_trades.keys())
+            else:
+                # Records: one tuple per trade, no intermediate dicts
+                _df = DataFrame.from_records([_row._row_() for _row in _rows],
+                                             columns=_rows[0].__slots__,
+                                             index=list(_trades.keys()))
             
-            if ('_trades' in _response.keys()
-                and len(_response['_trades']) > 0):
-                
-                _df = DataFrame(data=_response['_trades'].values(),
-                                index=_response['_trades'].keys())
-                return _df[_df['_comment'] == _trader]
+            if _trader is None:
+                return _df
             
+            return _df[_df['_comment'] == _trader]
+        
         # Default
         return DataFrame()
     
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Risk_Gate.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from collections import deque
+from threading import Lock
+from time import monotonic
+
+# Rejection reasons
+MAX_OPEN_TRADES = 'MAX_OPEN_TRADES'
+MAX_LOTS = 'MAX_LOTS'
+MAX_NOTIONAL = 'MAX_NOTIONAL'
+MAX_ORDER_RATE = 'MAX_ORDER_RATE'
+NO_PRICE = 'NO_PRICE'           # notional limit set but nothing to value the order at
+
+# Replies that mean a ticket is gone
+_CLOSED = ('CLOSE_MARKET', 'CLOSE_PENDING')
+
+class DWX_ZMQ_Risk_Gate():
+
+    """
+    Pre-trade checks on every OPEN, without a round trip to the terminal.
+
+    Installed on the connector, the gate sees each OPEN before it is sent
+    and refuses it if it would breach:
+
+        - _max_open_trades      open trades + pending orders on the account
+        - _max_lots             gross lots per symbol (a number, or
+                                {SYMBOL: LOTS} for per-symbol limits)
+        - _max_notional         gross notional of the account: lots *
+                                contract size * price, in each symbol's
+                                quote currency (no FX conversion)
+        - _max_orders_per_sec   OPENs per second (token bucket, bursts of
+                                up to _burst orders)
+
+    A refused OPEN is never sent; the current response becomes
+
+        {'_action': 'REJECTED', '_reason': 'MAX_LOTS', '_symbol': .., '_lots': .., ..}
+
+    so _execute_() returns None at once, keeping the rejection in its
+    _rejection. Any limit left at None is not checked.
+
+    The counters are kept from the replies the connector already receives:
+    an OPEN reserves its share when it is sent, its EXECUTION reply binds
+    it to the ticket (or releases it on error), CLOSE / CLOSE_ALL / BATCH
+    replies release tickets and every OPEN_TRADES report (e.g. a trader's
+    _get_open_trades_()) replaces the lot, so SL/TP exits are picked up on
+    the next report. A reservation whose reply never came expires after
+    _pending_timeout seconds.
+
+        _gate = DWX_ZMQ_Risk_Gate(self._zmq, _max_open_trades=10,
+                                  _max_lots={'EURUSD': 1.0}, _max_orders_per_sec=5)
+        _gate._load_(_trades)               # optional: start from a report
+        _gate._stats_()
+    """
+    def __init__(self, _zmq,
+                 _max_open_trades=None,
+                 _max_lots=None,                # LOTS or {SYMBOL: LOTS}
+                 _max_notional=None,
+                 _max_orders_per_sec=None,
+                 _burst=None,                   # token bucket size (default: 1 s worth)
+                 _contract_sizes=None,          # {SYMBOL: units per lot}
+                 _default_contract_size=100000,
+                 _pending_timeout=5.0):
+
+        self._zmq = _zmq
+
+        self._max_open_trades = _max_open_trades
+        self._max_notional = _max_notional
+        self._max_orders_per_sec = _max_orders_per_sec
+        self._contract_sizes = dict(_contract_sizes or {})
+        self._default_contract_size = _default_contract_size
+        self._pending_timeout = _pending_timeout
+
+        if isinstance(_max_lots, dict):
+            self._max_lots = dict(_max_lots)
+            self._max_lots_all = None
+        else:
+            self._max_lots = {}
+            self._max_lots_all = _max_lots
+
+        # Token bucket
+        if _max_orders_per_sec is not None:
+            self._burst = float(_burst or max(_max_orders_per_sec, 1))
+        else:
+            self._burst = 0.0
+        self._tokens = self._burst
+        self._refilled = monotonic()
+
+        # Counters: open tickets + reservations of OPENs in flight
+        self._open = 0
+        self._lots = {}                     # {SYMBOL: GROSS LOTS}
+        self._notional = 0.0
+
+        self._positions = {}                # {TICKET: (SYMBOL, LOTS, NOTIONAL)}
+        self._pending = deque()             # [(MONOTONIC, MAGIC, SYMBOL, LOTS, NOTIONAL)]
+
+        self._lock = Lock()
+
+        # Stats
+        self._checked = 0
+        self._rejected = {}                 # {REASON: COUNT}
+
+        # From now on every OPEN goes through _check_()
+        self._zmq._RISK_GATE = self
+
+    ##########################################################################
+
+    """
+    Called by _DWX_MTX_SEND_COMMAND_ for each OPEN. Returns None and
+    reserves the order's share of every limit if it may go, else the
+    rejection reason.
+    """
+    def _check_(self, _symbol, _price, _lots, _magic):
+
+        with self._lock:
+
+            self._checked += 1
+
+            _now = monotonic()
+
+            if self._pending and _now - self._pending[0][0] > self._pending_timeout:
+                self._expire_(_now)
+
+            _reason = None
+            _notional = 0.0
+
+            if self._max_open_trades is not None and self._open >= self._max_open_trades:
+                _reason = MAX_OPEN_TRADES
+
+            else:
+
+                _max = self._max_lots.get(_symbol, self._max_lots_all)
+
+                if _max is not None and self._lots.get(_symbol, 0.0) + _lots > _max + 1e-9:
+                    _reason = MAX_LOTS
+
+                elif self._max_notional is not None:
+
+                    # Market orders are sent at price 0: value them at the mid
+                    if not _price:
+                        _quote = self._zmq._Curr_Bid_Ask.get(_symbol)
+                        _price = (_quote[0] + _quote[1]) / 2 if _quote else 0.0
+
+                    if not _price:
+                        _reason = NO_PRICE
+                    else:
+                        _notional = _lots * self._contract_sizes.get(_symbol, self._default_contract_size) * _price
+                        if self._notional + _notional > self._max_notional:
+                            _reason = MAX_NOTIONAL
+
+            if _reason is None and self._max_orders_per_sec is not None:
+
+                self._tokens = min(self._burst,
+                                   self._tokens + (_now - self._refilled) * self._max_orders_per_sec)
+                self._refilled = _now
+
+                if self._tokens < 1.0:
+                    _reason = MAX_ORDER_RATE
+                else:
+                    self._tokens -= 1.0
+
+            if _reason is not None:
+                self._rejected[_reason] = self._rejected.get(_reason, 0) + 1
+                return _reason
+
+            self._pending.append((_now, _magic, _symbol, _lots, _notional))
+            self._reserve_(_symbol, _lots, _notional)
+
+            return None
+
+    ##########################################################################
+
+    def _reserve_(self, _symbol, _lots, _notional):
+
+        self._open += 1
+        self._lots[_symbol] = self._lots.get(_symbol, 0.0) + _lots
+        self._notional += _notional
+
+    def _release_(self, _symbol, _lots, _notional):
+
+        self._open -= 1
+        self._lots[_symbol] = max(self._lots.get(_symbol, 0.0) - _lots, 0.0)
+        self._notional = max(self._notional - _notional, 0.0)
+
+    def _expire_(self, _now):
+
+        while self._pending and _now - self._pending[0][0] > self._pending_timeout:
+            _p = self._pending.popleft()
+            self._release_(_p[2], _p[3], _p[4])
+
+    ##########################################################################
+
+    """
+    Called by the connector with every reply received on the PULL socket
+    """
+    def _on_response_(self, _data):
+
+        if not isinstance(_data, dict):
+            return
+
+        _action = _data.get('_action')
+
+        if _action == 'EXECUTION':
+            self._on_execution_(_data)
+
+        elif _action == 'CLOSE':
+            self._on_close_(_data.get('_ticket'), _data)
+
+        elif _action in ('CLOSE_ALL', 'CLOSE_ALL_MAGIC'):
+            for _ticket, _reply in _data.get('_responses', {}).items():
+                self._on_close_(_ticket, _reply)
+
+        elif _action == 'BATCH':
+            for _ticket, _reply in _data.get('_results', {}).items():
+                self._on_close_(_ticket, _reply)
+
+        elif _action == 'OPEN_TRADES':
+            self._load_(_data.get('_trades', {}))
+
+    ##########################################################################
+
+    def _on_execution_(self, _data):
+
+        with self._lock:
+
+            if not self._pending:
+                return
+
+            # Replies carry no symbol: pair with the oldest OPEN of the
+            # same magic number (errors carry none, take the oldest)
+            _i = 0
+
+            if '_magic' in _data:
+                for _j, _p in enumerate(self._pending):
+                    if _p[1] == _data['_magic']:
+                        _i = _j
+                        break
+
+            _p = self._pending[_i]
+            del self._pending[_i]
+
+            _ticket = _data.get('_ticket')
+
+            # Error, or already known from an OPEN_TRADES report
+            if _ticket is None or _ticket in self._positions:
+                self._release_(_p[2], _p[3], _p[4])
+            else:
+                self._positions[_ticket] = (_p[2], _p[3], _p[4])
+
+    def _on_close_(self, _ticket, _reply):
+
+        _response = _reply.get('_response')
+
+        with self._lock:
+
+            _position = self._positions.get(_ticket)
+
+            if _position is None:
+                return
+
+            _symbol, _lots, _notional = _position
+
+            if _response in _CLOSED:
+                del self._positions[_ticket]
+                self._release_(_symbol, _lots, _notional)
+
+            elif _response == 'CLOSE_PARTIAL':
+
+                _closed = min(float(_reply.get('_close_lots') or 0.0), _lots)
+                _share = _notional * _closed / _lots if _lots else 0.0
+
+                self._positions[_ticket] = (_symbol, _lots - _closed, _notional - _share)
+                self._lots[_symbol] = max(self._lots.get(_symbol, 0.0) - _closed, 0.0)
+                self._notional = max(self._notional - _share, 0.0)
+
+    ##########################################################################
+
+    """
+    Replace the open positions with those of an open trades report
+    ({TICKET: {'_symbol': .., '_lots': .., '_open_price': .., ..}}).
+    OPENs still in flight keep their reservations.
+    """
+    def _load_(self, _trades):
+
+        _positions = {}
+
+        for _ticket, _trade in _trades.items():
+            _symbol, _lots = _trade['_symbol'], float(_trade['_lots'])
+            _positions[_ticket] = (_symbol, _lots,
+                                   _lots * self._contract_sizes.get(_symbol, self._default_contract_size)
+                                   * float(_trade['_open_price']))
+
+        with self._lock:
+
+            self._expire_(monotonic())
+
+            self._positions = _positions
+            self._open = 0
+            self._lots = {}
+            self._notional = 0.0
+
+            for _symbol, _lots, _notional in _positions.values():
+                self._reserve_(_symbol, _lots, _notional)
+
+            for _p in self._pending:
+                self._reserve_(_p[2], _p[3], _p[4])
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        with self._lock:
+            return {'_open': self._open,
+                    '_pending': len(self._pending),
+                    '_lots': dict(self._lots),
+                    '_notional': self._notional,
+                    '_checked': self._checked,
+                    '_rejected': dict(self._rejected)}
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        if self._zmq._RISK_GATE is self:
+            self._zmq._RISK_GATE = None
+
+    ##########################################################################
@@ -0,0 +1,498 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Sharded_Ingest.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import zmq
+from multiprocessing import Process, Array
+from threading import Thread, RLock
+from time import sleep, monotonic
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import DWX_ZeroMQ_Connector, _DWX_ZMQ_PIN_THREAD_
+from python.modules.DWX_ZMQ_Process_Runner import _DWX_ZMQ_Board_View
+from python.modules.DWX_ZMQ_Shared_Memory import DWX_ZMQ_Shared_Quote_Board
+
+# Per-shard counters: TICKS, MALFORMED, STALE (symbol no longer owned),
+# last control message APPLIED
+_TICKS, _MALFORMED, _STALE, _APPLIED = range(4)
+_COUNTERS = 4
+
+##############################################################################
+
+def _shard_main_(_index, _url, _control, _counts, _delimiter=';', _sink=None,
+                 _board=None, _context=None, _hwm=None, _batch=256,
+                 _poll_timeout=100, _cpus=None, _priority=None):
+
+    """
+    Shard worker (thread or process): its own SUB socket, parse and store.
+
+    Ticks go to _sink(SYMBOL, BID, ASK), or to the shared _board in a
+    process. Control messages "SEQ +SYMBOL", "SEQ -SYMBOL" and "SEQ !"
+    (stop) arrive on the _control PULL socket; SEQ is published in _counts
+    once applied, and ticks of symbols the shard no longer owns are dropped
+    so that a symbol only ever has one writer.
+    """
+
+    if _cpus is not None or _priority is not None:
+        _DWX_ZMQ_PIN_THREAD_(_cpus, _priority, 'shard {}'.format(_index))
+
+    _own_context = _context is None
+    _context = zmq.Context() if _own_context else _context
+
+    if _sink is None:
+        _sink = _board._write_
+
+    _sub = _context.socket(zmq.SUB)
+    if _hwm is not None:
+        _sub.setsockopt(zmq.RCVHWM, _hwm)
+    _sub.connect(_url)
+
+    _ctl = _context.socket(zmq.PULL)
+    _ctl.connect(_control)
+
+    _poller = zmq.Poller()
+    _poller.register(_sub, zmq.POLLIN)
+    _poller.register(_ctl, zmq.POLLIN)
+
+    _parse = DWX_ZeroMQ_Connector._DWX_ZMQ_PARSE_TICK_
+    _base = _index * _COUNTERS
+    _owned = set()
+    _running = True
+
+    try:
+        while _running:
+
+            _events = dict(_poller.poll(_poll_timeout))
+
+            if _ctl in _events:
+
+                while True:
+                    try:
+                        _seq, _cmd = _ctl.recv(zmq.DONTWAIT).decode().split(' ', 1)
+                    except zmq.error.Again:
+                        break
+
+                    _op, _symbol = _cmd[0], _cmd[1:]
+
+                    # Exact topic: "EURUSD " doesn't also match EURUSDm
+                    if _op == '+':
+                        if _board is not None:
+                            _board._adopt_(_symbol)
+                        _owned.add(_symbol)
+                        _sub.setsockopt_string(zmq.SUBSCRIBE, _symbol + ' ')
+                    elif _op == '-':
+                        _owned.discard(_symbol)
+                        _sub.setsockopt_string(zmq.UNSUBSCRIBE, _symbol + ' ')
+                    else:
+                        _running = False
+
+                    _counts[_base + _APPLIED] = int(_seq)
+
+            if _sub in _events:
+
+                _ticks = _bad = _stale = 0
+
+                # Drain, but get back to the control socket every _batch
+                for _ in range(_batch):
+
+                    try:
+                        _frame = _sub.recv(zmq.DONTWAIT)
+                    except zmq.error.Again:
+                        break
+
+                    try:
+                        _symbol, _bid, _ask = _parse(_frame.decode('utf-8'), _delimiter)
+                    except ValueError:
+                        _bad += 1
+                        continue
+
+                    if _symbol in _owned:
+                        _sink(_symbol, _bid, _ask)
+                        _ticks += 1
+                    else:
+                        _stale += 1
+
+                _counts[_base + _TICKS] += _ticks
+                _counts[_base + _MALFORMED] += _bad
+                _counts[_base + _STALE] += _stale
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        _sub.close(0)
+        _ctl.close(0)
+
+        if _own_context:
+            _context.term()
+
+##############################################################################
+
+class DWX_ZMQ_Sharded_Ingest():
+
+    """
+    Market data ingestion across _shards SUB sockets, so that one hot
+    symbol (XAUUSD during news) only delays the ticks sharing its shard.
+
+    Each shard connects its own SUB socket to MetaTrader's PUB port and is
+    served by its own worker, which drains, parses and stores the ticks of
+    the symbols assigned to it:
+
+        _mode='thread'      workers are threads of this process, ticks go
+                            through the connector's _DWX_ZMQ_STORE_TICK_
+                            (_Market_Data_DB, _QUOTE_BOARD, tick handlers,
+                            each symbol on its own shard's thread)
+        _mode='process'     workers are processes, publishing onto a
+                            DWX_ZMQ_Shared_Quote_Board (_board, or one made
+                            for _symbols, default: current subscriptions).
+                            _zmq._Curr_Bid_Ask reads from it; tick handlers
+                            and _Market_Data_DB are not fed.
+
+    Once installed, _DWX_MTX_SUBSCRIBE_MARKETDATA_ assigns each new symbol
+    to the least busy shard and, with _rebalance_on_subscribe, moves hot
+    symbols off overloaded shards (_rebalance_()). Call _rebalance_() at
+    any time to follow load changes. A moved symbol misses the ticks
+    published while its shard hands it over (a few ms).
+
+        _shards = DWX_ZMQ_Sharded_Ingest(_zmq, _shards=4)
+        _zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_('XAUUSD')
+        _shards._stats_()
+
+    SUB frames read by the shards are not flight recorded.
+    """
+    def __init__(self, _zmq,
+                 _shards=2,
+                 _mode='thread',                # 'thread' or 'process'
+                 _board=None,                   # process mode: shared quote board
+                 _symbols=None,                 # process mode: symbols for a new board
+                 _rebalance_on_subscribe=True,
+                 _tolerance=0.25,               # Busiest shard above mean x (1 + _tolerance) -> rebalance
+                 _min_window=1.0,               # Min seconds of ticks behind a rate measurement
+                 _handover_timeout=1.0,         # Seconds to wait for a shard to release a symbol
+                 _hwm=None,                     # SUB receive queue (msgs), None = ZeroMQ default
+                 _batch=256,                    # Ticks drained between control checks
+                 _poll_timeout=100,             # ms
+                 _cpus=None,                    # CPUs per shard, e.g. [{2}, {3}]
+                 _priority=None,                # Worker nice value
+                 _verbose=True):
+
+        if _mode not in ('thread', 'process'):
+            raise ValueError("[SHARDS] Unknown mode {}".format(_mode))
+
+        self._zmq = _zmq
+        self._n = _shards
+        self._mode = _mode
+        self._rebalance_on_subscribe = _rebalance_on_subscribe
+        self._tolerance = _tolerance
+        self._min_window = _min_window
+        self._handover_timeout = _handover_timeout
+        self._verbose = _verbose
+
+        self._lock = RLock()
+        self._owner = {}            # {SYMBOL: SHARD}
+        self._rates = {}            # {SYMBOL: TICKS/S} over the last window
+        self._seqs = {}             # {SYMBOL: QUOTE SEQUENCE} at the window start
+        self._window = monotonic()
+        self._gen = 0
+
+        # Process mode publishes onto shared memory, owned here if created here
+        self._own_board = _mode == 'process' and _board is None
+
+        if _mode == 'process':
+            self._board = _board if _board is not None else \
+                DWX_ZMQ_Shared_Quote_Board(sorted(_symbols if _symbols is not None else _zmq._SUBSCRIPTIONS))
+            self._quotes = self._board
+            self._counts = Array('q', _shards * _COUNTERS, lock=False)
+
+            _missing = set(_zmq._SUBSCRIPTIONS) - set(self._board._index)
+
+            if _missing:
+                raise ValueError("[SHARDS] {} not on the shared quote board".format(', '.join(sorted(_missing))))
+        else:
+            self._board = None
+            self._quotes = _zmq._QUOTE_BOARD
+            self._counts = [0] * (_shards * _COUNTERS)
+
+        # One control PUSH socket per shard, used under self._lock
+        self._controls = []
+        self._workers = []
+
+        for _i in range(_shards):
+
+            _control = _zmq._ZMQ_CONTEXT.socket(zmq.PUSH)
+            _control.setsockopt(zmq.SNDTIMEO, int(_handover_timeout * 1000))
+            _control.setsockopt(zmq.LINGER, 0)
+
+            if _mode == 'thread':
+                _endpoint = 'inproc://dwx-zeromq-shard-{}-{}'.format(id(self), _i)
+                _control.bind(_endpoint)
+            else:
+                _endpoint = 'tcp://127.0.0.1:{}'.format(_control.bind_to_random_port('tcp://127.0.0.1'))
+
+            self._controls.append(_control)
+
+            _kwargs = dict(_delimiter=_zmq._string_delimiter, _hwm=_hwm, _batch=_batch,
+                           _poll_timeout=_poll_timeout, _priority=_priority,
+                           _cpus=None if _cpus is None else _cpus[_i % len(_cpus)])
+            _args = (_i, _zmq._URL + str(_zmq._SUB_PORT), _endpoint, self._counts)
+
+            if _mode == 'thread':
+                _worker = Thread(name='DWX_ZMQ_Shard_{}'.format(_i), target=_shard_main_, args=_args,
+                                 kwargs=dict(_kwargs, _sink=_zmq._DWX_ZMQ_STORE_TICK_,
+                                             _context=_zmq._ZMQ_CONTEXT))
+            else:
+                _worker = Process(name='DWX_ZMQ_Shard_{}'.format(_i), target=_shard_main_, args=_args,
+                                  kwargs=dict(_kwargs, _board=self._board))
+
+            _worker.daemon = True
+            _worker.start()
+            self._workers.append(_worker)
+
+        if _zmq._FLIGHT_RECORDER is not None:
+            print("[SHARDS] SUB frames read by the shards are not flight recorded")
+
+        # Take over the connector's subscriptions
+        with self._lock:
+
+            if _mode == 'process':
+                self._Curr_Bid_Ask = _zmq._Curr_Bid_Ask
+                _zmq._Curr_Bid_Ask = _DWX_ZMQ_Board_View(self._board)
+
+            _zmq._SUB_SHARDS = self
+
+            for _symbol in sorted(_zmq._SUBSCRIPTIONS):
+                _zmq._SUB_SOCKET.setsockopt_string(zmq.UNSUBSCRIBE, _symbol)
+                self._assign_(_symbol, self._least_busy_())
+
+        print("[SHARDS] {} {} shard(s) serving {} symbol(s)".format(_shards, _mode, len(self._owner)))
+
+    ##########################################################################
+    #                                                                        #
+    # Subscriptions (called by the connector)                                #
+    #                                                                        #
+    ##########################################################################
+
+    def _subscribe_(self, _symbol):
+
+        with self._lock:
+
+            if _symbol in self._owner:
+                return
+
+            if self._board is not None and _symbol not in self._board._index:
+                raise ValueError("[SHARDS] {} is not on the shared quote board".format(_symbol))
+
+            self._assign_(_symbol, self._least_busy_())
+
+            if self._rebalance_on_subscribe:
+                self._rebalance_()
+
+    def _unsubscribe_(self, _symbol):
+
+        with self._lock:
+
+            _shard = self._owner.pop(_symbol, None)
+
+            if _shard is not None:
+                self._release_(_symbol, _shard)
+                self._rates.pop(_symbol, None)
+                self._seqs.pop(_symbol, None)
+
+    ##########################################################################
+
+    def _send_(self, _shard, _cmd):
+
+        self._gen += 1
+
+        try:
+            self._controls[_shard].send_string('{} {}'.format(self._gen, _cmd))
+        except zmq.error.Again:
+            print("[SHARDS] Shard {} not answering, {} not applied".format(_shard, _cmd))
+
+        return self._gen
+
+    def _assign_(self, _symbol, _shard):
+
+        self._send_(_shard, '+' + _symbol)
+        self._owner[_symbol] = _shard
+        self._seqs.setdefault(_symbol, self._quotes._read_(_symbol)[3])
+
+    """
+    Wait until _shard has stopped writing _symbol, so that the next owner
+    is its only writer
+    """
+    def _release_(self, _symbol, _shard):
+
+        _gen = self._send_(_shard, '-' + _symbol)
+        _deadline = monotonic() + self._handover_timeout
+
+        while self._counts[_shard * _COUNTERS + _APPLIED] < _gen:
+
+            if monotonic() > _deadline:
+                print("[SHARDS] Shard {} did not release {} in time".format(_shard, _symbol))
+                return False
+
+            sleep(0.001)
+
+        return True
+
+    def _move_(self, _symbol, _shard):
+
+        self._release_(_symbol, self._owner[_symbol])
+        self._assign_(_symbol, _shard)
+
+    ##########################################################################
+    #                                                                        #
+    # Load balancing                                                         #
+    #                                                                        #
+    ##########################################################################
+
+    """
+    Ticks/s per symbol since the last measurement (from the quote
+    sequences), kept until _min_window has passed
+    """
+    def _measure_(self):
+
+        _now = monotonic()
+        _elapsed = _now - self._window
+
+        if _elapsed < self._min_window:
+            return self._rates
+
+        for _symbol in self._owner:
+            _seq = self._quotes._read_(_symbol)[3]
+            self._rates[_symbol] = (_seq - self._seqs.get(_symbol, _seq)) / _elapsed
+            self._seqs[_symbol] = _seq
+
+        self._window = _now
+
+        return self._rates
+
+    def _loads_(self):
+
+        _loads = [0.0] * self._n
+
+        for _symbol, _shard in self._owner.items():
+            _loads[_shard] += self._rates.get(_symbol, 0.0)
+
+        return _loads
+
+    def _least_busy_(self):
+
+        _loads = self._loads_()
+        _counts = [0] * self._n
+
+        for _shard in self._owner.values():
+            _counts[_shard] += 1
+
+        return min(range(self._n), key=lambda _i: (_loads[_i], _counts[_i]))
+
+    """
+    Measure the tick rates and move symbols off the busiest shard to the
+    least busy one while that narrows the gap between them, until the
+    busiest is within _tolerance of the mean. Returns the moves as
+    [(SYMBOL, FROM, TO)].
+    """
+    def _rebalance_(self):
+
+        _moves = []
+
+        with self._lock:
+
+            _rates = self._measure_()
+
+            for _ in range(len(self._owner)):
+
+                _loads = self._loads_()
+                _hi = max(range(self._n), key=_loads.__getitem__)
+                _lo = min(range(self._n), key=_loads.__getitem__)
+                _gap = _loads[_hi] - _loads[_lo]
+
+                if _gap <= 0 or _loads[_hi] <= (1 + self._tolerance) * sum(_loads) / self._n:
+                    break
+
+                # Largest symbol whose move narrows the gap
+                _candidates = [(_rates.get(_s, 0.0), _s) for _s, _shard in self._owner.items()
+                               if _shard == _hi and 0 < _rates.get(_s, 0.0) < _gap]
+
+                if not _candidates:
+                    break
+
+                _symbol = max(_candidates)[1]
+                self._move_(_symbol, _lo)
+                _moves.append((_symbol, _hi, _lo))
+
+        if _moves and self._verbose:
+            print("[SHARDS] Rebalanced: {}".format(', '.join('{} {}->{}'.format(*_m) for _m in _moves)))
+
+        return _moves
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        with self._lock:
+
+            _loads = self._loads_()
+            _shards = []
+
+            for _i in range(self._n):
+
+                _c = self._counts[_i * _COUNTERS:(_i + 1) * _COUNTERS]
+
+                _shards.append({'_symbols': sorted(_s for _s, _shard in self._owner.items() if _shard == _i),
+                                '_rate': _loads[_i],
+                                '_ticks': _c[_TICKS],
+                                '_malformed': _c[_MALFORMED],
+                                '_stale': _c[_STALE],
+                                '_alive': self._workers[_i].is_alive()})
+
+        return {'_mode': self._mode, '_shards': _shards}
+
+    ##########################################################################
+
+    """
+    Stop the workers and hand the subscriptions back to the connector's
+    SUB socket
+    """
+    def _stop_(self, _timeout=2):
+
+        with self._lock:
+
+            for _i in range(self._n):
+                self._send_(_i, '!')
+
+            for _worker in self._workers:
+
+                _worker.join(_timeout)
+
+                if isinstance(_worker, Process) and _worker.is_alive():
+                    _worker.terminate()
+
+            for _control in self._controls:
+                _control.close(0)
+
+            self._zmq._SUB_SHARDS = None
+
+            for _symbol in self._owner:
+                self._zmq._SUB_SOCKET.setsockopt_string(zmq.SUBSCRIBE, _symbol)
+
+            if self._mode == 'process':
+                self._zmq._Curr_Bid_Ask = self._Curr_Bid_Ask
+
+                if self._own_board:
+                    self._board._close_()
+
+        print("\n++ [SHARDS] {} shard(s) stopped ++".format(self._n))
+
+    ##########################################################################
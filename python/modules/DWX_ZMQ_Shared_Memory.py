@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Shared_Memory.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from multiprocessing import shared_memory
+from struct import Struct
+from time import sleep, monotonic_ns
+
+# Quote slot: SEQUENCE, BID, ASK, TIMESTAMP (ns, time.monotonic_ns())
+_SEQ = Struct('<Q')
+_QUOTE = Struct('<ddq')
+_QUOTE_SLOT_SIZE = 32
+
+# Ring header: HEAD (producer) and TAIL (consumer) on separate cache lines
+_RING_TAIL_OFFSET = 64
+_RING_HEADER_SIZE = 128
+_RING_LEN = Struct('<I')
+
+class DWX_ZMQ_Shared_Quote_Board():
+
+    """
+    Fixed-size (SYMBOL -> BID/ASK) board in multiprocessing.shared_memory.
+
+    One writer process (the connector) publishes quotes, any number of
+    reader processes read them without locks. Each slot is protected by a
+    seqlock: the writer makes the sequence odd while it updates the slot,
+    readers retry until they see the same even sequence before and after
+    reading.
+    """
+    def __init__(self, _symbols, _name=None, _create=True):
+
+        self._symbols = list(_symbols)
+        self._index = {_s: _i for _i, _s in enumerate(self._symbols)}
+
+        _size = max(1, len(self._symbols)) * _QUOTE_SLOT_SIZE
+
+        self._shm = shared_memory.SharedMemory(name=_name,
+                                               create=_create,
+                                               size=_size)
+        self._owner = _create
+        self._buf = self._shm.buf
+
+        if _create:
+            self._buf[:_size] = bytes(_size)
+
+        # Writer-side copy of each slot's sequence
+        self._seqs = [0] * len(self._symbols)
+
+    def __reduce__(self):
+        # Child processes attach to the same block instead of creating one
+        return (self.__class__, (self._symbols, self._shm.name, False))
+
+    ##########################################################################
+
+    """
+    Publish a quote (single writer only)
+    """
+    def _write_(self, _symbol, _bid, _ask, _ts=None):
+
+        _i = self._index[_symbol]
+        _off = _i * _QUOTE_SLOT_SIZE
+        _seq = self._seqs[_i] + 1
+
+        # Odd sequence -> slot is being written
+        _SEQ.pack_into(self._buf, _off, _seq)
+        _QUOTE.pack_into(self._buf, _off + 8, _bid, _ask,
+                         monotonic_ns() if _ts is None else _ts)
+        _SEQ.pack_into(self._buf, _off, _seq + 1)
+
+        self._seqs[_i] = _seq + 1
+
+    """
+    Take over publishing a symbol from another writer process (e.g. the
+    DWX_ZMQ_Sharded_Ingest shard it moved from), continuing its sequence
+    """
+    def _adopt_(self, _symbol):
+
+        _i = self._index[_symbol]
+        _seq = _SEQ.unpack_from(self._buf, _i * _QUOTE_SLOT_SIZE)[0]
+
+        # Odd: the previous writer died mid-update, readers wait for ours
+        self._seqs[_i] = _seq + (_seq & 1)
+
+    ##########################################################################
+
+    """
+    Read a consistent (BID, ASK, TIMESTAMP, SEQUENCE) for a symbol.
+    SEQUENCE is the number of quotes published so far (0 = none yet).
+    After _spin retries the reader yields its time slice, so a writer
+    preempted mid-update (e.g. on the same core) gets to finish it.
+    """
+    def _read_(self, _symbol, _spin=100):
+
+        _off = self._index[_symbol] * _QUOTE_SLOT_SIZE
+        _n = 0
+
+        while True:
+
+            _s1 = _SEQ.unpack_from(self._buf, _off)[0]
+
+            if _s1 & 1:
+
+                _n += 1
+
+                if _n > _spin:
+                    sleep(0)
+
+                continue
+
+            _bid, _ask, _ts = _QUOTE.unpack_from(self._buf, _off + 8)
+
+            if _SEQ.unpack_from(self._buf, _off)[0] == _s1:
+                return (_bid, _ask, _ts, _s1 >> 1)
+
+    ##########################################################################
+
+    """
+    Block until a quote newer than _seq arrives (or _timeout seconds pass).
+    Spins for _spin reads before falling back to short sleeps.
+    """
+    def _wait_(self, _symbol, _seq, _timeout=1.0, _spin=1000, _sleep_delay=0.0001):
+
+        _off = self._index[_symbol] * _QUOTE_SLOT_SIZE
+        _deadline = monotonic_ns() + int(_timeout * 1e9)
+        _n = 0
+
+        while (_SEQ.unpack_from(self._buf, _off)[0] >> 1) <= _seq:
+
+            _n += 1
+
+            if _n > _spin:
+                if monotonic_ns() > _deadline:
+                    return None
+                sleep(_sleep_delay)
+
+        return self._read_(_symbol)
+
+    ##########################################################################
+
+    def _close_(self):
+
+        self._buf = None
+        self._shm.close()
+
+        if self._owner:
+            self._shm.unlink()
+
+    ##########################################################################
+
+class DWX_ZMQ_Command_Ring():
+
+    """
+    Lock-free single-producer / single-consumer ring of byte messages in
+    multiprocessing.shared_memory.
+
+    The producer only ever writes HEAD, the consumer only ever writes TAIL,
+    so neither side needs a lock. Messages longer than the slot size are
+    rejected rather than truncated.
+    """
+    def __init__(self, _slots=1024, _slot_size=512, _name=None, _create=True):
+
+        self._slots = _slots
+        self._slot_size = _slot_size
+
+        _size = _RING_HEADER_SIZE + _slots * _slot_size
+
+        self._shm = shared_memory.SharedMemory(name=_name,
+                                               create=_create,
+                                               size=_size)
+        self._owner = _create
+        self._buf = self._shm.buf
+
+        if _create:
+            self._buf[:_RING_HEADER_SIZE] = bytes(_RING_HEADER_SIZE)
+
+    def __reduce__(self):
+        return (self.__class__, (self._slots, self._slot_size, self._shm.name, False))
+
+    ##########################################################################
+
+    """
+    Producer side: returns False if the ring is full
+    """
+    def _push_(self, _data):
+
+        if isinstance(_data, str):
+            _data = _data.encode()
+
+        _len = len(_data)
+
+        if _len > self._slot_size - _RING_LEN.size:
+            raise ValueError("[RING] Message of {} bytes exceeds slot size {}".format(_len, self._slot_size))
+
+        _head = _SEQ.unpack_from(self._buf, 0)[0]
+        _tail = _SEQ.unpack_from(self._buf, _RING_TAIL_OFFSET)[0]
+
+        if _head - _tail >= self._slots:
+            return False
+
+        _off = _RING_HEADER_SIZE + (_head % self._slots) * self._slot_size
+        _RING_LEN.pack_into(self._buf, _off, _len)
+        self._buf[_off + _RING_LEN.size:_off + _RING_LEN.size + _len] = _data
+
+        # Publish only after the slot is fully written
+        _SEQ.pack_into(self._buf, 0, _head + 1)
+
+        return True
+
+    ##########################################################################
+
+    """
+    Consumer side: returns the oldest message (bytes) or None if empty
+    """
+    def _pop_(self):
+
+        _tail = _SEQ.unpack_from(self._buf, _RING_TAIL_OFFSET)[0]
+        _head = _SEQ.unpack_from(self._buf, 0)[0]
+
+        if _tail == _head:
+            return None
+
+        _off = _RING_HEADER_SIZE + (_tail % self._slots) * self._slot_size
+        _len = _RING_LEN.unpack_from(self._buf, _off)[0]
+        _data = bytes(self._buf[_off + _RING_LEN.size:_off + _RING_LEN.size + _len])
+
+        # Release the slot back to the producer
+        _SEQ.pack_into(self._buf, _RING_TAIL_OFFSET, _tail + 1)
+
+        return _data
+
+    ##########################################################################
+
+    def _empty_(self):
+        return (_SEQ.unpack_from(self._buf, 0)[0]
+                == _SEQ.unpack_from(self._buf, _RING_TAIL_OFFSET)[0])
+
+    ##########################################################################
+
+    def _close_(self):
+
+        self._buf = None
+        self._shm.close()
+
+        if self._owner:
+            self._shm.unlink()
+
+    ##########################################################################
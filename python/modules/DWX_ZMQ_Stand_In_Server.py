@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Stand_In_Server.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import argparse
+import random
+import zmq
+from datetime import datetime, timedelta, timezone
+from threading import Thread, Lock
+from time import sleep, time_ns
+
+# MT4 order types
+OP_BUY, OP_SELL, OP_BUYLIMIT, OP_SELLLIMIT, OP_BUYSTOP, OP_SELLSTOP = range(6)
+
+class DWX_ZMQ_Stand_In_Server():
+
+    """
+    Local stand-in for the DWX ZeroMQ Server EA running in MetaTrader 4.
+
+    Binds the three EA sockets (PULL commands, PUSH replies, PUB quotes)
+    and answers the connector's commands with the same reply dicts as the
+    EA, against an in-memory book:
+
+        - OPEN fills market orders at the last published quote; pending
+          STOP/LIMIT orders fill when _publish_() crosses their price.
+        - SL/TP (sent in points, as to the EA) are hit on _publish_().
+        - MODIFY, CLOSE, CLOSE_PARTIAL, CLOSE_MAGIC, CLOSE_ALL,
+          GET_OPEN_TRADES, BATCH, DATA and HEARTBEAT are answered.
+
+    Lets strategies, benchmarks and the BATCH protocol run without a
+    terminal:
+
+        _server = DWX_ZMQ_Stand_In_Server()._start_()
+        _server._publish_('EURUSD', 1.10000, 1.10002)
+        ...
+        _server._stop_()
+
+    _command_hook, if given, is called as f(MESSAGE, TIME_NS) on the server
+    thread as each command arrives (before it is processed).
+    """
+    def __init__(self,
+                 _host='*',
+                 _protocol='tcp',
+                 _PULL_PORT=32768,          # Commands in (connector's PUSH)
+                 _PUSH_PORT=32769,          # Replies out (connector's PULL)
+                 _PUB_PORT=32770,           # Quotes out (connector's SUB)
+                 _delimiter=';',
+                 _gmt_offset=0,             # Broker server time offset (hours)
+                 _poll_timeout=10,          # ms
+                 _command_hook=None,
+                 _context=None,
+                 _verbose=False):
+
+        self._delimiter = _delimiter
+        self._gmt_offset = _gmt_offset
+        self._poll_timeout = _poll_timeout
+        self._command_hook = _command_hook
+        self._verbose = _verbose
+
+        self._OWN_CONTEXT = _context is None
+        self._ZMQ_CONTEXT = zmq.Context() if _context is None else _context
+
+        _URL = _protocol + "://" + _host + ":"
+
+        self._PULL_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PULL)
+        self._PULL_SOCKET.bind(_URL + str(_PULL_PORT))
+
+        self._PUSH_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUSH)
+        self._PUSH_SOCKET.bind(_URL + str(_PUSH_PORT))
+
+        self._PUB_SOCKET = self._ZMQ_CONTEXT.socket(zmq.PUB)
+        self._PUB_SOCKET.bind(_URL + str(_PUB_PORT))
+
+        # Book
+        self._trades = {}               # {TICKET: {'_magic', '_symbol', ..}}
+        self._next_ticket = 1
+        self._quotes = {}               # {SYMBOL: (BID, ASK)}
+        self._bars = {}                 # {SYMBOL: {'YYYY.MM.DD HH:MM:00': BID}}
+
+        # Counters
+        self._commands = 0
+        self._replies = 0
+
+        self._lock = Lock()
+        self._ACTIVE = False
+        self._thread = None
+
+    ##########################################################################
+
+    def _start_(self):
+
+        self._ACTIVE = True
+
+        self._thread = Thread(name='DWX_ZMQ_Stand_In_Server', target=self._run_)
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        self._ACTIVE = False
+
+        if self._thread is not None:
+            self._thread.join()
+
+        for _socket in (self._PULL_SOCKET, self._PUSH_SOCKET, self._PUB_SOCKET):
+            _socket.setsockopt(zmq.LINGER, 0)
+            _socket.close()
+
+        if self._OWN_CONTEXT:
+            self._ZMQ_CONTEXT.term()
+
+    ##########################################################################
+
+    def _run_(self):
+
+        while self._ACTIVE:
+
+            if not self._PULL_SOCKET.poll(self._poll_timeout):
+                continue
+
+            try:
+                _msg = self._PULL_SOCKET.recv_string(zmq.DONTWAIT)
+            except zmq.error.Again:
+                continue
+
+            if self._command_hook is not None:
+                self._command_hook(_msg, time_ns())
+
+            try:
+                with self._lock:
+                    self._commands += 1
+                    _reply = self._dispatch_(_msg.split(self._delimiter))
+
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _reply = {'_response': 'ERROR',
+                          '_response_value': _exstr.format(type(ex).__name__, ex.args)}
+
+            if self._verbose:
+                print("[STAND-IN] {} -> {}".format(_msg, _reply))
+
+            if _reply is not None:
+                self._send_(_reply)
+
+        print("\n++ [KERNEL] _DWX_ZMQ_Stand_In_Server_() Signing Out ++")
+
+    ##########################################################################
+
+    def _send_(self, _reply):
+
+        # Non-blocking like the EA: no connected client, no reply
+        try:
+            self._PUSH_SOCKET.send_string(str(_reply), zmq.DONTWAIT)
+            self._replies += 1
+        except zmq.error.Again:
+            pass
+
+    ##########################################################################
+
+    def _dispatch_(self, _fields):
+
+        if _fields[0] == 'HEARTBEAT':
+            return {'_action': 'heartbeat', '_response': 'loop'}
+
+        if _fields[0] == 'DATA':
+            return self._data_(*_fields[1:5])
+
+        _action = _fields[1]
+
+        if _action == 'OPEN':
+            return self._open_(int(_fields[2]), _fields[3], float(_fields[4]),
+                               float(_fields[5]), float(_fields[6]), _fields[7],
+                               float(_fields[8]), int(_fields[9]))
+
+        if _action == 'MODIFY':
+            return self._modify_(int(_fields[10]), float(_fields[5]), float(_fields[6]))
+
+        if _action == 'CLOSE':
+            return self._close_(int(_fields[10]))
+
+        if _action == 'CLOSE_PARTIAL':
+            return self._close_(int(_fields[10]), float(_fields[8]))
+
+        if _action == 'CLOSE_MAGIC':
+            return self._close_many_('CLOSE_ALL_MAGIC', int(_fields[9]))
+
+        if _action == 'CLOSE_ALL':
+            return self._close_many_('CLOSE_ALL')
+
+        if _action == 'GET_OPEN_TRADES':
+            return {'_action': 'OPEN_TRADES', '_trades': self._open_trades_()}
+
+        if _action == 'BATCH':
+            return self._batch_(_fields[2], _fields[4] if len(_fields) > 4 else '')
+
+        return {'_action': _action, '_response': 'ERROR',
+                '_response_value': 'UNKNOWN_ACTION'}
+
+    ##########################################################################
+
+    @staticmethod
+    def _point_(_symbol):
+        return 0.001 if 'JPY' in _symbol else 0.00001
+
+    def _server_time_(self):
+
+        _now = datetime.now(timezone.utc) + timedelta(hours=self._gmt_offset)
+        return _now.strftime('%Y.%m.%d %H:%M:%S')
+
+    def _close_price_(self, _trade):
+
+        _bid, _ask = self._quotes.get(_trade['_symbol'], (0.0, 0.0))
+        return _bid if _trade['_type'] == OP_BUY else _ask
+
+    ##########################################################################
+
+    def _open_(self, _type, _symbol, _price, _SL, _TP, _comment, _lots, _magic):
+
+        if _symbol not in self._quotes:
+            return {'_action': 'EXECUTION', '_response': '4106',
+                    '_response_value': 'ERROR'}     # ERR_UNKNOWN_SYMBOL
+
+        _bid, _ask = self._quotes[_symbol]
+
+        if _type == OP_BUY:
+            _price = _ask
+        elif _type == OP_SELL:
+            _price = _bid
+
+        # SL/TP arrive in points from the open price, as for the EA
+        _point = self._point_(_symbol)
+        _sign = 1 if _type in (OP_BUY, OP_BUYLIMIT, OP_BUYSTOP) else -1
+
+        _ticket = self._next_ticket
+        self._next_ticket += 1
+
+        self._trades[_ticket] = {'_magic': _magic,
+                                 '_symbol': _symbol,
+                                 '_lots': _lots,
+                                 '_type': _type,
+                                 '_open_price': _price,
+                                 '_open_time': self._server_time_(),
+                                 '_SL': _price - _sign * _SL * _point if _SL else 0.0,
+                                 '_TP': _price + _sign * _TP * _point if _TP else 0.0,
+                                 '_pnl': 0.0,
+                                 '_comment': _comment}
+
+        _trade = self._trades[_ticket]
+
+        return {'_action': 'EXECUTION', '_magic': _magic, '_ticket': _ticket,
+                '_open_price': _price, '_sl': _trade['_SL'], '_tp': _trade['_TP']}
+
+    ##########################################################################
+
+    def _modify_(self, _ticket, _SL, _TP):
+
+        _trade = self._trades.get(_ticket)
+
+        if _trade is None:
+            return {'_action': 'MODIFY', '_ticket': _ticket, '_response': '4108',
+                    '_response_value': 'ERROR'}     # ERR_INVALID_TICKET
+
+        _point = self._point_(_trade['_symbol'])
+        _sign = 1 if _trade['_type'] in (OP_BUY, OP_BUYLIMIT, OP_BUYSTOP) else -1
+
+        if _trade['_type'] in (OP_BUY, OP_SELL):
+            _ref = self._close_price_(_trade)
+        else:
+            _ref = _trade['_open_price']
+
+        _trade['_SL'] = _ref - _sign * _SL * _point if _SL else 0.0
+        _trade['_TP'] = _ref + _sign * _TP * _point if _TP else 0.0
+
+        return {'_action': 'MODIFY', '_ticket': _ticket,
+                '_sl': _trade['_SL'], '_tp': _trade['_TP']}
+
+    ##########################################################################
+
+    def _close_(self, _ticket, _lots=None):
+
+        _trade = self._trades.get(_ticket)
+
+        if _trade is None:
+            return {'_action': 'CLOSE', '_ticket': _ticket, '_response': '4108',
+                    '_response_value': 'ERROR'}     # ERR_INVALID_TICKET
+
+        # Pending orders are deleted, not closed
+        if _trade['_type'] not in (OP_BUY, OP_SELL):
+            del self._trades[_ticket]
+            return {'_action': 'CLOSE', '_ticket': _ticket,
+                    '_response': 'CLOSE_PENDING', '_response_value': 'SUCCESS'}
+
+        if _lots is None or _lots <= 0 or _lots >= _trade['_lots']:
+            _lots = _trade['_lots']
+            _response = 'CLOSE_MARKET'
+            del self._trades[_ticket]
+        else:
+            _trade['_lots'] = round(_trade['_lots'] - _lots, 2)
+            _response = 'CLOSE_PARTIAL'
+
+        return {'_action': 'CLOSE', '_ticket': _ticket,
+                '_close_price': self._close_price_(_trade), '_close_lots': _lots,
+                '_response': _response, '_response_value': 'SUCCESS'}
+
+    ##########################################################################
+
+    def _close_many_(self, _action, _magic=None):
+
+        _responses = {}
+
+        for _ticket in [_t for _t, _trade in self._trades.items()
+                        if _magic is None or _trade['_magic'] == _magic]:
+
+            _symbol = self._trades[_ticket]['_symbol']
+            _reply = self._close_(_ticket)
+
+            _responses[_ticket] = {'_symbol': _symbol,
+                                   '_close_price': _reply.get('_close_price'),
+                                   '_close_lots': _reply.get('_close_lots'),
+                                   '_response': _reply['_response']}
+
+        _reply = {'_action': _action, '_responses': _responses,
+                  '_response_value': 'SUCCESS'}
+
+        if _magic is not None:
+            _reply['_magic'] = _magic
+
+        return _reply
+
+    ##########################################################################
+
+    def _open_trades_(self):
+
+        _trades = {}
+
+        for _ticket, _trade in self._trades.items():
+
+            _trade = dict(_trade)
+
+            if _trade['_type'] in (OP_BUY, OP_SELL) and _trade['_symbol'] in self._quotes:
+                _sign = 1 if _trade['_type'] == OP_BUY else -1
+                _trade['_pnl'] = round(_sign * (self._close_price_(_trade) - _trade['_open_price'])
+                                       * _trade['_lots'] * 100000, 2)
+
+            _trades[_ticket] = _trade
+
+        return _trades
+
+    ##########################################################################
+
+    def _batch_(self, _batch_id, _items):
+
+        _results = {}
+
+        # ACTION,TICKET,SL,TP,LOTS|..
+        for _item in filter(None, _items.split('|')):
+
+            _action, _ticket, _SL, _TP, _lots = _item.split(',')
+            _ticket = int(_ticket)
+
+            if _action == 'MODIFY':
+                _reply = self._modify_(_ticket, float(_SL), float(_TP))
+            elif _action == 'CLOSE_PARTIAL':
+                _reply = self._close_(_ticket, float(_lots))
+            else:
+                _reply = self._close_(_ticket)
+
+            del _reply['_action']
+            _results[_ticket] = _reply
+
+        return {'_action': 'BATCH', '_batch_id': int(_batch_id), '_results': _results}
+
+    ##########################################################################
+
+    def _data_(self, _symbol, _timeframe, _start, _end):
+
+        _bars = self._bars.get(_symbol, {})
+
+        return {'_action': 'DATA',
+                '_data': {_t: _bid for _t, _bid in sorted(_bars.items())
+                          if _start <= _t <= _end}}
+
+    ##########################################################################
+
+    """
+    Publish a quote on the PUB socket (as the EA does on every tick), after
+    filling pending orders and hitting SL/TP that it crosses
+    """
+    def _publish_(self, _symbol, _bid, _ask):
+
+        with self._lock:
+
+            self._quotes[_symbol] = (_bid, _ask)
+            self._bars.setdefault(_symbol, {})[self._server_time_()[:-2] + '00'] = _bid
+
+            for _ticket, _trade in list(self._trades.items()):
+                if _trade['_symbol'] == _symbol:
+                    self._match_(_ticket, _trade, _bid, _ask)
+
+        self._PUB_SOCKET.send_string("{} {}{}{}".format(_symbol, _bid, self._delimiter, _ask))
+
+    ##########################################################################
+
+    def _match_(self, _ticket, _trade, _bid, _ask):
+
+        _type = _trade['_type']
+
+        if ((_type == OP_BUYSTOP and _ask >= _trade['_open_price'])
+            or (_type == OP_BUYLIMIT and _ask <= _trade['_open_price'])):
+            _trade['_type'] = OP_BUY
+
+        elif ((_type == OP_SELLSTOP and _bid <= _trade['_open_price'])
+              or (_type == OP_SELLLIMIT and _bid >= _trade['_open_price'])):
+            _trade['_type'] = OP_SELL
+
+        if _trade['_type'] == OP_BUY:
+            _hit = ((_trade['_SL'] and _bid <= _trade['_SL'])
+                    or (_trade['_TP'] and _bid >= _trade['_TP']))
+
+        elif _trade['_type'] == OP_SELL:
+            _hit = ((_trade['_SL'] and _ask >= _trade['_SL'])
+                    or (_trade['_TP'] and _ask <= _trade['_TP']))
+
+        else:
+            _hit = False
+
+        if _hit:
+            del self._trades[_ticket]
+
+    ##########################################################################
+
+    def _open_count_(self):
+
+        with self._lock:
+            return len(self._trades)
+
+##############################################################################
+
+if __name__ == '__main__':
+
+    # Run the stand-in with a random walk feed, e.g. to try a strategy
+    # without a MetaTrader terminal
+    _parser = argparse.ArgumentParser(description='DWX ZeroMQ stand-in server')
+    _parser.add_argument('--symbols', default='EURUSD,GBPUSD')
+    _parser.add_argument('--interval', type=float, default=0.1,
+                         help='seconds between quote rounds')
+    _parser.add_argument('--gmt-offset', type=int, default=0)
+    _parser.add_argument('--verbose', action='store_true')
+    _args = _parser.parse_args()
+
+    _server = DWX_ZMQ_Stand_In_Server(_gmt_offset=_args.gmt_offset,
+                                      _verbose=_args.verbose)._start_()
+
+    _mids = {_s: 1.1 for _s in _args.symbols.split(',')}
+
+    try:
+        while True:
+            for _symbol in _mids:
+                _mids[_symbol] += random.gauss(0, 0.00005)
+                _server._publish_(_symbol, round(_mids[_symbol], 5),
+                                  round(_mids[_symbol] + 0.00002, 5))
+            sleep(_args.interval)
+
+    except KeyboardInterrupt:
+        _server._stop_()
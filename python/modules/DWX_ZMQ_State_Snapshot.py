@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_State_Snapshot.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import numpy as np
+
+# One fixed-size record per symbol
+_RECORD = np.dtype([('_symbol', 'S32'),
+                    ('_state', 'i1'),
+                    ('_buy_closed', '?'),
+                    ('_sell_closed', '?'),
+                    ('_buy', 'i8'),
+                    ('_sell', 'i8'),
+                    ('_high', 'f8'),
+                    ('_low', 'f8'),
+                    ('_b_height', 'f8'),
+                    ('_ext_max', 'f8'),
+                    ('_ext_min', 'f8'),
+                    ('_event_time', 'f8')], align=True)
+
+class DWX_ZMQ_State_Snapshot():
+
+    """
+    Memory-mapped per-symbol strategy state that survives a restart.
+
+    The state lives in a .npy file mapped into memory, one record per
+    symbol. Writing a field IS the snapshot: nothing is serialised and a
+    crashed process loses nothing the OS had in its page cache (call
+    _flush_() after important changes to survive an OS crash too).
+
+        _snapshot = DWX_ZMQ_State_Snapshot('SCALPER.state.npy', ['EURUSD', ..])
+        _snapshot._records['_high']         # writable view, one row per symbol
+        _snapshot._set_('EURUSD', _event_time=1589640540.0)
+        _snapshot._get_('EURUSD')           # {'_state': 1, '_buy': .., ..}
+
+    Reopening with a different symbol list keeps the rows of the symbols
+    still listed.
+    """
+    def __init__(self, _path, _symbols):
+
+        self._path = _path
+        self._symbols = list(_symbols)
+        self._rows = {_s: _i for _i, _s in enumerate(self._symbols)}
+
+        _names = np.array([_s.encode() for _s in self._symbols], dtype='S32')
+
+        _old = None
+
+        if os.path.exists(_path):
+            try:
+                _old = np.load(_path, mmap_mode='r+')
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _msg = _exstr.format(type(ex).__name__, ex.args)
+                print(_msg)
+
+        if _old is not None and _old.dtype == _RECORD and np.array_equal(_old['_symbol'], _names):
+
+            self._records = _old
+
+        else:
+
+            _new = self._blank_(len(_names))
+            _new['_symbol'] = _names
+
+            # Carry over the symbols we still trade
+            if _old is not None and _old.dtype == _RECORD:
+                _kept = {_s: _i for _i, _s in enumerate(_old['_symbol'])}
+                for _i, _s in enumerate(_names):
+                    if _s in _kept:
+                        _new[_i] = _old[_kept[_s]]
+                del _old
+
+            _tmp = _path + '.tmp'
+            np.save(_tmp, _new)
+            os.replace(_tmp + '.npy', _path)
+
+            self._records = np.load(_path, mmap_mode='r+')
+
+    ##########################################################################
+
+    @staticmethod
+    def _blank_(_n):
+
+        _new = np.zeros(_n, dtype=_RECORD)
+
+        for _field in ('_high', '_low', '_ext_max', '_ext_min', '_event_time'):
+            _new[_field] = np.nan
+
+        return _new
+
+    ##########################################################################
+
+    def _get_(self, _symbol):
+
+        _record = self._records[self._rows[_symbol]]
+
+        return {_field: _record[_field].item() for _field in _RECORD.names[1:]}
+
+    def _set_(self, _symbol, **_fields):
+
+        _row = self._rows[_symbol]
+
+        for _field, _value in _fields.items():
+            self._records[_field][_row] = _value
+
+    def _clear_(self, _symbol):
+
+        _row = self._rows[_symbol]
+        _blank = self._blank_(1)[0]
+        _blank['_symbol'] = self._records['_symbol'][_row]
+
+        self._records[_row] = _blank
+
+    ##########################################################################
+
+    def _flush_(self):
+        self._records.flush()
+
+    ##########################################################################
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Straddle_Evaluator.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import numpy as np
+from threading import Thread, Condition
+
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import _DWX_ZMQ_PIN_THREAD_
+from python.modules.DWX_ZMQ_Execution import DWX_ZMQ_Execution
+
+# Straddle states
+IDLE, ARMED, TRAILING = 0, 1, 2
+
+class DWX_ZMQ_Straddle_Evaluator():
+
+    """
+    Table-driven trailing logic for news straddles on many symbols.
+
+    Every symbol has a row in NumPy arrays (barriers, running extremes,
+    tickets, state). The connector's tick handler only appends
+    (ROW, MID) to a buffer; every _interval seconds one thread evaluates
+    the whole batch in a single vectorised pass:
+
+        - mid below the low barrier at a new extreme: MODIFY the sell-stop
+          SL to trail it, and CLOSE the buy-stop (once)
+        - mid above the high barrier at a new extreme: the mirror image
+
+    and hands the resulting commands to the connector (and so to the
+    command scheduler, which keeps only the newest MODIFY per ticket),
+    waiting for their replies before the next pass.
+
+        _evaluator = DWX_ZMQ_Straddle_Evaluator(self._zmq, ['EURUSD', ..])
+        _evaluator._arm_('EURUSD', _buy_ticket, _sell_ticket, _high, _low, 0.0012)
+        _evaluator._trail_('EURUSD')        # news is out
+        _evaluator._disarm_('EURUSD')       # straddle closed
+
+    Given a DWX_ZMQ_State_Snapshot, the table IS the snapshot's memory
+    mapped records (rows in the snapshot's symbol order), so every change
+    is persisted as it is made and survives a restart.
+
+    With _wake_on_tick the thread is woken by the first tick of a batch
+    instead of waiting out _interval (for the connector's busy poll mode);
+    _cpus / _priority pin it and set its nice value (_DWX_ZMQ_PIN_THREAD_).
+    """
+    def __init__(self, _zmq, _symbols,
+                 _interval=0.1,             # seconds between evaluations
+                 _scale=100000,             # price -> points (5 digit FX)
+                 _TP=10000,                 # TP (points) sent with trailing MODIFYs
+                 _use_batch=False,          # closes/modifies as one BATCH message
+                 _snapshot=None,            # DWX_ZMQ_State_Snapshot to keep the table in
+                 _wake_on_tick=False,       # evaluate as soon as a tick arrives
+                 _cpus=None,                # CPUs to pin the evaluation thread to
+                 _priority=None):           # evaluation thread nice value
+
+        self._zmq = _zmq
+        self._execution = DWX_ZMQ_Execution(_zmq)
+        self._interval = _interval
+        self._scale = _scale
+        self._TP = _TP
+        self._use_batch = _use_batch
+        self._wake_on_tick = _wake_on_tick
+        self._cpus = _cpus
+        self._priority = _priority
+
+        # Reply polling step while a pass's commands are in flight
+        self._reply_delay = min(_interval / 10, 0.01)
+
+        if _snapshot is not None:
+            _symbols = _snapshot._symbols
+
+        self._symbols = list(_symbols)
+        self._rows = {_s: _i for _i, _s in enumerate(self._symbols)}
+
+        _n = len(self._symbols)
+
+        if _snapshot is not None:
+
+            # Views into the mapped records: updated in place below
+            _records = _snapshot._records
+
+            self._state = _records['_state']
+            self._high = _records['_high']
+            self._low = _records['_low']
+            self._b_height = _records['_b_height']
+            self._ext_max = _records['_ext_max']
+            self._ext_min = _records['_ext_min']
+            self._buy = _records['_buy']
+            self._sell = _records['_sell']
+            self._buy_closed = _records['_buy_closed']
+            self._sell_closed = _records['_sell_closed']
+
+        else:
+
+            self._state = np.zeros(_n, dtype=np.int8)
+            self._high = np.full(_n, np.nan)
+            self._low = np.full(_n, np.nan)
+            self._b_height = np.zeros(_n)
+            self._ext_max = np.full(_n, -np.inf)
+            self._ext_min = np.full(_n, np.inf)
+            self._buy = np.zeros(_n, dtype=np.int64)
+            self._sell = np.zeros(_n, dtype=np.int64)
+            self._buy_closed = np.zeros(_n, dtype=bool)
+            self._sell_closed = np.zeros(_n, dtype=bool)
+
+        # Ticks since the last evaluation
+        self._tick_rows = []
+        self._tick_mids = []
+
+        self._cond = Condition()
+        self._ACTIVE = True
+
+        # Counters
+        self._evaluations = 0
+        self._ticks = 0
+        self._modifies = 0
+        self._closes = 0
+
+        self._zmq._DWX_ZMQ_ADD_TICK_HANDLER_(self._on_tick_)
+
+        self._thread = Thread(name='DWX_ZMQ_Straddle_Evaluator', target=self._run_)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##########################################################################
+
+    def _on_tick_(self, _symbol, _bid, _ask):
+
+        # Poll thread: only buffer the tick
+        _row = self._rows.get(_symbol)
+
+        if _row is not None and self._state[_row] == TRAILING:
+            with self._cond:
+                self._tick_rows.append(_row)
+                self._tick_mids.append((_bid + _ask) / 2)
+
+                if self._wake_on_tick and len(self._tick_rows) == 1:
+                    self._cond.notify()
+
+    ##########################################################################
+
+    """
+    A straddle was placed: barriers at _high/_low, trailing starts at _trail_()
+    """
+    def _arm_(self, _symbol, _buy_ticket, _sell_ticket, _high, _low, _b_height,
+              _ext_max=None, _ext_min=None):
+
+        _row = self._rows[_symbol]
+        _mid = (_high + _low) / 2
+
+        with self._cond:
+            self._high[_row] = _high
+            self._low[_row] = _low
+            self._b_height[_row] = _b_height
+            self._ext_max[_row] = _mid if _ext_max is None else _ext_max
+            self._ext_min[_row] = _mid if _ext_min is None else _ext_min
+            self._buy[_row] = _buy_ticket
+            self._sell[_row] = _sell_ticket
+            self._buy_closed[_row] = self._sell_closed[_row] = False
+            self._state[_row] = ARMED
+
+    def _trail_(self, _symbol):
+
+        _row = self._rows[_symbol]
+
+        with self._cond:
+
+            if self._state[_row] != ARMED:
+                return
+
+            self._state[_row] = TRAILING
+
+            # Evaluate the current quote straight away
+            _quote = self._zmq._Curr_Bid_Ask.get(_symbol)
+
+            if _quote is not None:
+                self._tick_rows.append(_row)
+                self._tick_mids.append((_quote[0] + _quote[1]) / 2)
+                self._cond.notify()
+
+    def _disarm_(self, _symbol):
+
+        with self._cond:
+            self._state[self._rows[_symbol]] = IDLE
+
+    ##########################################################################
+
+    """
+    Evaluate a batch of ticks (ROWS[i], MIDS[i]) for every symbol at once.
+    Returns (MODIFY_TICKETS, MODIFY_SL_POINTS, CLOSE_TICKETS) and updates
+    the extremes / closed flags. Called with self._cond held.
+    """
+    def _evaluate_(self, _rows, _mids):
+
+        _n = len(self._symbols)
+
+        # Batch extremes per symbol
+        _bmin = np.full(_n, np.inf)
+        _bmax = np.full(_n, -np.inf)
+        np.minimum.at(_bmin, _rows, _mids)
+        np.maximum.at(_bmax, _rows, _mids)
+
+        _trailing = self._state == TRAILING
+
+        _below = _trailing & (_bmin < self._low)
+        _above = _trailing & (_bmax > self._high)
+
+        # New extreme beyond the barrier: trail that leg's stop
+        _down = _below & (_bmin < self._ext_min)
+        _up = _above & (_bmax > self._ext_max)
+
+        _sl_sell = np.round((_bmin - (self._low - self._b_height)) * self._scale, 2)
+        _sl_buy = np.round((self._high - (_bmax - self._b_height)) * self._scale, 2)
+
+        # ..and close the opposite leg (once)
+        _close_buy = _below & ~self._buy_closed
+        _close_sell = _above & ~self._sell_closed
+
+        np.minimum(self._ext_min, _bmin, out=self._ext_min, where=_trailing)
+        np.maximum(self._ext_max, _bmax, out=self._ext_max, where=_trailing)
+        self._buy_closed |= _close_buy
+        self._sell_closed |= _close_sell
+
+        _modify_tickets = np.concatenate((self._sell[_down], self._buy[_up]))
+        _modify_sl = np.concatenate((_sl_sell[_down], _sl_buy[_up]))
+        _close_tickets = np.concatenate((self._buy[_close_buy], self._sell[_close_sell]))
+
+        return _modify_tickets, _modify_sl, _close_tickets
+
+    ##########################################################################
+
+    """
+    Send a pass's commands and wait for their replies, under the
+    connector's _REQUEST_LOCK (DWX_ZMQ_Execution): the traders' OPENs and
+    CLOSEs never get one of these replies as theirs.
+    """
+    def _dispatch_(self, _modify_tickets, _modify_sl, _close_tickets):
+
+        _closes = [int(_t) for _t in _close_tickets]
+        _modifies = [(int(_t), float(_sl), self._TP) for _t, _sl in zip(_modify_tickets, _modify_sl)]
+
+        if self._use_batch:
+
+            # Replies matched by batch ID
+            if _closes:
+                self._execution._execute_batch_([(_t, 'CLOSE', 0, 0, 0) for _t in _closes],
+                                                _delay=self._reply_delay, _wbreak=100)
+            if _modifies:
+                self._execution._execute_batch_([(_t, 'MODIFY', _SL, _TP, 0) for _t, _SL, _TP in _modifies],
+                                                _delay=self._reply_delay, _wbreak=100)
+
+        else:
+
+            self._execution._execute_commands_([('CLOSE', _t, 0, 0) for _t in _closes]
+                                               + [('MODIFY', _t, _SL, _TP) for _t, _SL, _TP in _modifies],
+                                               _delay=self._reply_delay, _wbreak=100)
+
+        self._closes += len(_closes)
+        self._modifies += len(_modifies)
+
+    ##########################################################################
+
+    def _run_(self):
+
+        if self._cpus is not None or self._priority is not None:
+            _DWX_ZMQ_PIN_THREAD_(self._cpus, self._priority, 'straddle evaluator')
+
+        while self._ACTIVE:
+
+            with self._cond:
+
+                # Woken on tick: ticks that came in during the last pass
+                # found nobody waiting, so don't wait for them
+                if not (self._wake_on_tick and self._tick_rows):
+                    self._cond.wait(self._interval)
+
+                if not self._tick_rows:
+                    continue
+
+                _rows = np.fromiter(self._tick_rows, dtype=np.intp, count=len(self._tick_rows))
+                _mids = np.fromiter(self._tick_mids, dtype=np.float64, count=len(self._tick_mids))
+                self._tick_rows, self._tick_mids = [], []
+
+                _actions = self._evaluate_(_rows, _mids)
+
+                self._evaluations += 1
+                self._ticks += len(_rows)
+
+            # Commands are sent outside the lock
+            try:
+                self._dispatch_(*_actions)
+            except Exception as ex:
+                _exstr = "Exception Type {0}. Args:\n{1!r}"
+                _msg = _exstr.format(type(ex).__name__, ex.args)
+                print(_msg)
+
+    ##########################################################################
+
+    def _stats_(self):
+
+        return {'_evaluations': self._evaluations,
+                '_ticks': self._ticks,
+                '_modifies': self._modifies,
+                '_closes': self._closes,
+                '_trailing': int(np.count_nonzero(self._state == TRAILING))}
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        self._zmq._DWX_ZMQ_REMOVE_TICK_HANDLER_(self._on_tick_)
+
+        with self._cond:
+            self._ACTIVE = False
+            self._cond.notify_all()
+
+        self._thread.join()
+
+    ##########################################################################
@@ -0,0 +1,482 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Tick_Codec.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+import numpy as np
+from struct import Struct
+from threading import Lock
+from time import time_ns
+
+# File: HEADER, BLOCK.., INDEX, FOOTER
+_MAGIC = b'DWXTICK1'
+_HEADER = Struct('<8s32s')                  # MAGIC, SYMBOL
+
+# Block header: TICKS, DIGITS, first TIMESTAMP, TIMESTAMP UNIT (ns, the
+# GCD of the block's time deltas), first BID / SPREAD (points), then the
+# byte lengths of the three varint streams that follow
+_BLOCK = Struct('<IB3xqqqqIII')
+
+# One index entry per block, so a time range maps to its blocks
+_INDEX = np.dtype([('_offset', '<i8'),
+                   ('_ticks', '<i4'),
+                   ('_first', '<i8'),      # first / last timestamp (ns)
+                   ('_last', '<i8')])
+
+_FOOTER = Struct('<qq8s')                   # INDEX OFFSET, BLOCKS, MAGIC
+
+_MAX_DIGITS = 8
+
+"""
+Tick file of _symbol starting at _first_ns in a history store directory
+(DWX_ZMQ_History_Store layout: STORE/SYMBOL/ticks/FIRST_NS.ticks)
+"""
+def _tick_path_(_directory, _symbol, _first_ns):
+
+    _dir = os.path.join(_directory, _symbol, 'ticks')
+    os.makedirs(_dir, exist_ok=True)
+
+    return os.path.join(_dir, '{}.ticks'.format(_first_ns))
+
+##############################################################################
+#                                                                            #
+# Zigzag + varint, vectorised                                                #
+#                                                                            #
+##############################################################################
+
+def _zigzag_(_x):
+
+    # int64 -> uint64, small magnitudes (either sign) -> small values
+    _x = _x.astype(np.int64, copy=False)
+    return ((_x << 1) ^ (_x >> 63)).view(np.uint64)
+
+def _unzigzag_(_u):
+    return (_u >> np.uint64(1)).view(np.int64) ^ -(_u & np.uint64(1)).view(np.int64)
+
+def _varint_encode_(_values):
+
+    # LEB128: 7 bits per byte, high bit set on all but the last byte
+    _values = _values.astype(np.uint64, copy=False)
+
+    # Bytes per value
+    _n = np.ones(len(_values), dtype=np.int64)
+    _rest = _values >> np.uint64(7)
+
+    while _rest.any():
+        _n += _rest > 0
+        _rest >>= np.uint64(7)
+
+    # Fast path: every value fits in one byte
+    if len(_n) == 0 or _n.max() == 1:
+        return _values.astype(np.uint8)
+
+    _ends = np.cumsum(_n)
+    _starts = _ends - _n
+
+    _out = np.empty(int(_ends[-1]), dtype=np.uint8)
+
+    for _k in range(int(_n.max())):
+
+        _m = _n > _k
+        _byte = ((_values[_m] >> np.uint64(7 * _k)) & np.uint64(0x7f)).astype(np.uint8)
+        _byte |= (_n[_m] - 1 > _k).astype(np.uint8) << 7
+
+        _out[_starts[_m] + _k] = _byte
+
+    return _out
+
+def _varint_decode_(_buf):
+
+    _buf = np.frombuffer(_buf, dtype=np.uint8) if not isinstance(_buf, np.ndarray) else _buf
+
+    _last = _buf < 0x80
+
+    # Fast path: every value fits in one byte
+    if _last.all():
+        return _buf.astype(np.uint64)
+
+    _ends = np.flatnonzero(_last)
+    _starts = np.empty_like(_ends)
+    _starts[0] = 0
+    _starts[1:] = _ends[:-1] + 1
+    _lens = _ends - _starts + 1
+
+    if _lens.max() > 8:
+
+        # Beyond 56 bits: one shifted term per byte, OR-ed per value
+        _pos = np.arange(len(_buf)) - np.repeat(_starts, _lens)
+        _bits = (_buf & 0x7f).astype(np.uint64) << (7 * _pos).astype(np.uint64)
+
+        return np.bitwise_or.reduceat(_bits, _starts)
+
+    # Load the 8 bytes at each value's start as one little-endian word
+    # (an overlapping view: stride of 1 byte), then squeeze out the
+    # continuation bits and mask off the following values' bytes
+    _pad = np.zeros(len(_buf) + 8, dtype=np.uint8)
+    _pad[:len(_buf)] = _buf
+
+    _words = np.take(np.ndarray((len(_buf),), dtype='<u8', buffer=_pad, strides=(1,)), _starts)
+
+    _out = _words & np.uint64(0x7f)
+    for _k in range(1, int(_lens.max())):
+        _out |= (_words >> np.uint64(_k)) & np.uint64(0x7f << (7 * _k))
+
+    _out &= (np.uint64(1) << (np.uint64(7) * _lens.astype(np.uint64))) - np.uint64(1)
+
+    return _out
+
+##############################################################################
+#                                                                            #
+# Blocks                                                                     #
+#                                                                            #
+##############################################################################
+
+"""
+Smallest number of decimals that represents every price exactly
+"""
+def _digits_(_prices):
+
+    for _d in range(_MAX_DIGITS + 1):
+        _scale = 10.0 ** _d
+        if np.array_equal(np.round(_prices * _scale) / _scale, _prices):
+            return _d
+
+    return _MAX_DIGITS
+
+"""
+Encode ticks (TIMESTAMPS ns int64, BIDS, ASKS) into one block: bid and
+spread in integer points, each stored (like the timestamps) as zigzag
+varint deltas from the previous tick. Time deltas are stored in units of
+their GCD, so ms / s resolution history costs no more than it needs.
+_digits None = detect.
+"""
+def _encode_block_(_ts, _bids, _asks, _digits=None):
+
+    _ts = np.asarray(_ts, dtype=np.int64)
+    _bids = np.asarray(_bids, dtype=np.float64)
+    _asks = np.asarray(_asks, dtype=np.float64)
+
+    if _digits is None:
+        _digits = max(_digits_(_bids), _digits_(_asks))
+
+    _scale = 10.0 ** _digits
+    _bid_pts = np.round(_bids * _scale).astype(np.int64)
+    _spread_pts = np.round(_asks * _scale).astype(np.int64) - _bid_pts
+
+    _dts = np.diff(_ts)
+    _unit = int(np.gcd.reduce(_dts)) if len(_dts) else 1
+    _unit = max(_unit, 1)
+
+    _streams = [_varint_encode_(_zigzag_(_d)).tobytes()
+                for _d in (_dts // _unit, np.diff(_bid_pts), np.diff(_spread_pts))]
+
+    return _BLOCK.pack(len(_ts), _digits, int(_ts[0]), _unit, int(_bid_pts[0]), int(_spread_pts[0]),
+                       *[len(_s) for _s in _streams]) + b''.join(_streams)
+
+"""
+Decode a block (bytes / buffer at its header) into (TIMESTAMPS, BIDS, ASKS)
+"""
+def _decode_block_(_buf, _offset=0):
+
+    _n, _digits, _t0, _unit, _b0, _s0, _lt, _lb, _ls = _BLOCK.unpack_from(_buf, _offset)
+
+    _out = np.empty((3, _n), dtype=np.int64)
+    _out[:, 0] = (_t0, _b0, _s0)
+
+    # Streams one by one: price deltas usually take the one-byte fast path
+    _start = _offset + _BLOCK.size
+
+    for _row, _len in enumerate((_lt, _lb, _ls)):
+        _raw = np.frombuffer(_buf, dtype=np.uint8, count=_len, offset=_start)
+        _out[_row, 1:] = _unzigzag_(_varint_decode_(_raw))
+        _start += _len
+
+    if _unit != 1:
+        _out[0, 1:] *= _unit
+
+    np.cumsum(_out, axis=1, out=_out)
+
+    _scale = 10.0 ** _digits
+    _bids = _out[1] / _scale
+    _asks = (_out[1] + _out[2]) / _scale
+
+    return _out[0], _bids, _asks
+
+##############################################################################
+
+class DWX_ZMQ_Tick_Writer():
+
+    """
+    Writes one symbol's ticks to a compressed tick file.
+
+    Ticks are buffered and encoded _block_ticks at a time; _close_() writes
+    the last block and the block index. A file whose writer never closed
+    (crash) is still readable up to its last complete block.
+
+        _writer = DWX_ZMQ_Tick_Writer('EURUSD.ticks', 'EURUSD')
+        _writer._append_(time_ns(), 1.10001, 1.10003)
+        _writer._write_(_timestamps, _bids, _asks)      # arrays
+        _writer._close_()
+
+    Prices are stored as integer points at the fewest decimals that hold
+    every price of a block exactly (at most 8), or at _digits if given.
+    """
+    def __init__(self, _path, _symbol, _digits=None, _block_ticks=16384):
+
+        self._path = _path
+        self._symbol = _symbol
+        self._digits = _digits
+        self._block_ticks = _block_ticks
+
+        self._file = open(_path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, _symbol.encode()))
+
+        self._index = []
+        self._ts, self._bids, self._asks = [], [], []
+        self._ticks = 0
+
+        self._lock = Lock()
+
+    ##########################################################################
+
+    def _append_(self, _ts, _bid, _ask):
+
+        with self._lock:
+
+            self._ts.append(_ts)
+            self._bids.append(_bid)
+            self._asks.append(_ask)
+
+            if len(self._ts) >= self._block_ticks:
+                self._flush_()
+
+    def _write_(self, _ts, _bids, _asks):
+
+        _ts = np.asarray(_ts, dtype=np.int64)
+        _bids = np.asarray(_bids, dtype=np.float64)
+        _asks = np.asarray(_asks, dtype=np.float64)
+
+        _k = self._block_ticks
+
+        with self._lock:
+
+            # Top up the buffered block first
+            if self._ts:
+
+                _top = min(_k - len(self._ts), len(_ts))
+
+                self._ts.extend(_ts[:_top].tolist())
+                self._bids.extend(_bids[:_top].tolist())
+                self._asks.extend(_asks[:_top].tolist())
+
+                _ts, _bids, _asks = _ts[_top:], _bids[_top:], _asks[_top:]
+
+                if len(self._ts) >= _k:
+                    self._flush_()
+
+            # Whole blocks straight from the arrays
+            while len(_ts) >= _k:
+                self._put_block_(_ts[:_k], _bids[:_k], _asks[:_k])
+                _ts, _bids, _asks = _ts[_k:], _bids[_k:], _asks[_k:]
+
+            self._ts.extend(_ts.tolist())
+            self._bids.extend(_bids.tolist())
+            self._asks.extend(_asks.tolist())
+
+    ##########################################################################
+
+    """
+    Encode up to _block_ticks buffered ticks as one block (lock held)
+    """
+    def _flush_(self):
+
+        if not self._ts:
+            return
+
+        _k = self._block_ticks
+
+        self._put_block_(np.array(self._ts[:_k], dtype=np.int64),
+                         np.array(self._bids[:_k]), np.array(self._asks[:_k]))
+
+        del self._ts[:_k], self._bids[:_k], self._asks[:_k]
+
+    def _put_block_(self, _ts, _bids, _asks):
+
+        _block = _encode_block_(_ts, _bids, _asks, self._digits)
+
+        self._index.append((self._file.tell(), len(_ts), _ts[0], _ts[-1]))
+        self._file.write(_block)
+        self._ticks += len(_ts)
+
+    ##########################################################################
+
+    def _close_(self):
+
+        with self._lock:
+
+            if self._file.closed:
+                return
+
+            while self._ts:
+                self._flush_()
+
+            _offset = self._file.tell()
+            self._file.write(np.array(self._index, dtype=_INDEX).tobytes())
+            self._file.write(_FOOTER.pack(_offset, len(self._index), _MAGIC))
+            self._file.close()
+
+    ##########################################################################
+
+class DWX_ZMQ_Tick_Reader():
+
+    """
+    Random access to a tick file written by DWX_ZMQ_Tick_Writer.
+
+        _reader = DWX_ZMQ_Tick_Reader('EURUSD.ticks')
+        _ts, _bids, _asks = _reader._read_()                # everything
+        _ts, _bids, _asks = _reader._read_(_start, _end)    # [start, end) ns
+
+    Only the blocks overlapping the requested range are decoded.
+    """
+    def __init__(self, _path):
+
+        self._path = _path
+
+        with open(_path, 'rb') as _f:
+            self._buf = _f.read()
+
+        _magic, _symbol = _HEADER.unpack_from(self._buf, 0)
+
+        if _magic != _MAGIC:
+            raise ValueError("[TICKS] {} is not a tick file".format(_path))
+
+        self._symbol = _symbol.rstrip(b'\x00').decode()
+        self._index = self._load_index_()
+
+    ##########################################################################
+
+    def _load_index_(self):
+
+        if len(self._buf) >= _HEADER.size + _FOOTER.size:
+
+            _offset, _blocks, _magic = _FOOTER.unpack_from(self._buf, len(self._buf) - _FOOTER.size)
+
+            if _magic == _MAGIC:
+                return np.frombuffer(self._buf, dtype=_INDEX, count=_blocks, offset=_offset)
+
+        # Never closed: walk the block headers
+        _index = []
+        _offset = _HEADER.size
+
+        while _offset + _BLOCK.size <= len(self._buf):
+
+            _n, _digits, _t0, _unit, _b0, _s0, _lt, _lb, _ls = _BLOCK.unpack_from(self._buf, _offset)
+            _end = _offset + _BLOCK.size + _lt + _lb + _ls
+
+            if _n == 0 or _end > len(self._buf):
+                break
+
+            # Last timestamp: the first plus the sum of the time deltas
+            _raw = np.frombuffer(self._buf, dtype=np.uint8, count=_lt, offset=_offset + _BLOCK.size)
+            _last = _t0 + _unit * int(_unzigzag_(_varint_decode_(_raw)).sum())
+
+            _index.append((_offset, _n, _t0, _last))
+            _offset = _end
+
+        return np.array(_index, dtype=_INDEX)
+
+    ##########################################################################
+
+    def _ticks_(self):
+        return int(self._index['_ticks'].sum())
+
+    def _block_(self, _i):
+        return _decode_block_(self._buf, int(self._index['_offset'][_i]))
+
+    def _read_(self, _start=None, _end=None):
+
+        _first = 0 if _start is None else int(np.searchsorted(self._index['_last'], _start, side='left'))
+        _stop = len(self._index) if _end is None else int(np.searchsorted(self._index['_first'], _end, side='left'))
+
+        _blocks = [self._block_(_i) for _i in range(_first, _stop)]
+
+        if not _blocks:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0))
+
+        _ts, _bids, _asks = (np.concatenate(_c) for _c in zip(*_blocks))
+
+        if _start is not None or _end is not None:
+            _lo = 0 if _start is None else np.searchsorted(_ts, _start, side='left')
+            _hi = len(_ts) if _end is None else np.searchsorted(_ts, _end, side='left')
+            _ts, _bids, _asks = _ts[_lo:_hi], _bids[_lo:_hi], _asks[_lo:_hi]
+
+        return _ts, _bids, _asks
+
+    ##########################################################################
+
+class DWX_ZMQ_Tick_Recorder():
+
+    """
+    Records every tick the connector receives into one tick file per
+    symbol, timestamped on arrival (time.time_ns()). _directory is laid
+    out as a DWX_ZMQ_History_Store (_directory/SYMBOL/ticks/START_NS.ticks).
+
+        _recorder = DWX_ZMQ_Tick_Recorder(self._zmq, 'history/')
+        ..
+        _recorder._stop_()                  # closes the files
+    """
+    def __init__(self, _zmq, _directory, _block_ticks=16384):
+
+        self._zmq = _zmq
+        self._directory = _directory
+        self._block_ticks = _block_ticks
+        self._start = time_ns()
+
+        os.makedirs(_directory, exist_ok=True)
+
+        self._writers = {}
+        self._lock = Lock()
+
+        self._zmq._DWX_ZMQ_ADD_TICK_HANDLER_(self._on_tick_)
+
+    ##########################################################################
+
+    def _on_tick_(self, _symbol, _bid, _ask):
+
+        _writer = self._writers.get(_symbol)
+
+        if _writer is None:
+            with self._lock:
+                _writer = self._writers.get(_symbol)
+                if _writer is None:
+                    _path = _tick_path_(self._directory, _symbol, self._start)
+                    _writer = DWX_ZMQ_Tick_Writer(_path, _symbol, _block_ticks=self._block_ticks)
+                    self._writers[_symbol] = _writer
+
+        _writer._append_(time_ns(), _bid, _ask)
+
+    ##########################################################################
+
+    def _paths_(self):
+        return {_s: _w._path for _s, _w in self._writers.items()}
+
+    def _stop_(self):
+
+        self._zmq._DWX_ZMQ_REMOVE_TICK_HANDLER_(self._on_tick_)
+
+        with self._lock:
+            for _writer in self._writers.values():
+                _writer._close_()
+
+    ##########################################################################
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+    DWX_ZMQ_Timer_Wheel.py
+    --
+    @author: Darwinex Labs (www.darwinex.com)
+
+    Copyright (c) 2019 onwards, Darwinex. All rights reserved.
+
+    Licensed under the BSD 3-Clause License, you may not use this file except
+    in compliance with the License.
+
+    You may obtain a copy of the License at:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+from math import ceil
+from threading import Thread, Condition
+from time import monotonic
+
+class DWX_ZMQ_Timer_Wheel():
+
+    """
+    Hierarchical timer wheel for time-based order expiry.
+
+    Level 0 has 2**_bits slots of _resolution seconds each, every higher
+    level covers 2**_bits slots of the level below. Scheduling and
+    cancelling a timer are O(1) (a dict insert/delete in one slot); timers
+    in a higher level are cascaded down once when their slot comes round.
+
+    Callbacks run on the wheel thread: keep them short (e.g. hand the
+    ticket to a trader's queue) and never block on a trading lock.
+    """
+    def __init__(self,
+                 _resolution=0.01,      # seconds per tick
+                 _bits=8,               # 256 slots per level
+                 _levels=3):            # 256**3 ticks ~ 46 hours at 10 ms
+
+        self._resolution = _resolution
+        self._bits = _bits
+        self._mask = (1 << _bits) - 1
+        self._levels = _levels
+
+        # [level][slot] -> {KEY: (EXPIRY_TICK, CALLBACK, ARGS)}
+        self._wheels = [[{} for _s in range(1 << _bits)] for _l in range(_levels)]
+
+        # {KEY: (LEVEL, SLOT)} for O(1) cancel
+        self._where = {}
+
+        self._tick = 0
+        self._start = monotonic()
+
+        self._cond = Condition()
+        self._ACTIVE = True
+
+        self._thread = Thread(name='DWX_ZMQ_Timer_Wheel', target=self._run_)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##########################################################################
+
+    def _insert_(self, _key, _expiry, _callback, _args):
+
+        # Called with self._cond held
+        _delta = max(_expiry - self._tick, 1)
+        _at = _expiry
+
+        for _level in range(self._levels):
+            if _delta < (1 << (self._bits * (_level + 1))):
+                break
+        else:
+            # Beyond the wheel's range: park in the furthest top level slot,
+            # it is re-inserted (with its real expiry) when cascaded
+            _level = self._levels - 1
+            _at = self._tick + (1 << (self._bits * self._levels)) - 1
+
+        _slot = (_at >> (self._bits * _level)) & self._mask
+
+        self._wheels[_level][_slot][_key] = (_expiry, _callback, _args)
+        self._where[_key] = (_level, _slot)
+
+    ##########################################################################
+
+    """
+    Call _callback(*_args) in _delay seconds; re-scheduling a key replaces
+    its previous timer.
+    """
+    def _schedule_(self, _key, _delay, _callback, *_args):
+
+        with self._cond:
+
+            self._remove_(_key)
+
+            _now_tick = int((monotonic() - self._start) / self._resolution)
+            _expiry = max(_now_tick, self._tick) + max(1, int(ceil(_delay / self._resolution)))
+
+            self._insert_(_key, _expiry, _callback, _args)
+
+    ##########################################################################
+
+    def _remove_(self, _key):
+
+        _where = self._where.pop(_key, None)
+
+        if _where is not None:
+            del self._wheels[_where[0]][_where[1]][_key]
+
+        return _where is not None
+
+    """
+    Cancel a pending timer (e.g. the trade was closed by SL/TP); returns
+    False if it had already fired or never existed.
+    """
+    def _cancel_(self, _key):
+
+        with self._cond:
+            return self._remove_(_key)
+
+    ##########################################################################
+
+    def _cascade_(self, _level):
+
+        # Move every timer of the current slot at _level one level down
+        _slot = (self._tick >> (self._bits * _level)) & self._mask
+        _timers = self._wheels[_level][_slot]
+        self._wheels[_level][_slot] = {}
+
+        for _key, (_expiry, _callback, _args) in _timers.items():
+            self._insert_(_key, _expiry, _callback, _args)
+
+    ##########################################################################
+
+    def _advance_(self):
+
+        # Called with self._cond held, returns the timers due on this tick
+        self._tick += 1
+
+        # Levels whose lower levels all wrapped on this tick, cascaded from
+        # the top down so timers can fall through several levels at once
+        _top = 0
+
+        for _level in range(1, self._levels):
+            if (self._tick & ((1 << (self._bits * _level)) - 1)) != 0:
+                break
+            _top = _level
+
+        for _level in range(_top, 0, -1):
+            self._cascade_(_level)
+
+        _slot = self._tick & self._mask
+        _due = self._wheels[0][_slot]
+        self._wheels[0][_slot] = {}
+
+        _fired = []
+
+        for _key, (_expiry, _callback, _args) in _due.items():
+
+            del self._where[_key]
+
+            if _expiry <= self._tick:
+                _fired.append((_callback, _args))
+            else:
+                self._insert_(_key, _expiry, _callback, _args)
+
+        return _fired
+
+    ##########################################################################
+
+    def _run_(self):
+
+        while self._ACTIVE:
+
+            _fired = []
+
+            with self._cond:
+
+                _now_tick = int((monotonic() - self._start) / self._resolution)
+
+                # Catch up on every tick we slept through
+                while self._tick < _now_tick:
+                    _fired += self._advance_()
+
+                if not _fired:
+                    self._cond.wait((self._tick + 1) * self._resolution
+                                    - (monotonic() - self._start))
+
+            # Run callbacks outside the wheel lock
+            for _callback, _args in _fired:
+                try:
+                    _callback(*_args)
+                except Exception as ex:
+                    _exstr = "Exception Type {0}. Args:\n{1!r}"
+                    _msg = _exstr.format(type(ex).__name__, ex.args)
+                    print(_msg)
+
+    ##########################################################################
+
+    def __len__(self):
+        return len(self._where)
+
+    ##########################################################################
+
+    def _stop_(self):
+
+        with self._cond:
+            self._ACTIVE = False
+            self._cond.notify_all()
+
+        self._thread.join()
+
+    ##########################################################################
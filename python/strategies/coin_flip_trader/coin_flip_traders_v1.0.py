@@ -21,6 +21,15 @@
         3) Flip a coin - random.randombits(1) - to decide on a BUY or SELL
         
         4) Keep trading until the market is closed (_market_open = False)
+    
+    Each trader can also run in its own process (DWX_ZMQ_Process_Runner),
+    against a shared memory quote board and command ring:
+        
+        _runner = DWX_ZMQ_Process_Runner(_coin_flip_trader_,
+                                         _symbols=[('EURUSD',0.01), ('GDAXI',0.01)])
+        _runner._run_()
+        ...
+        _runner._stop_()
     --
     
     @author: Darwinex Labs (www.darwinex.com)
@@ -43,9 +52,14 @@
 #############################################################################
 
 from python.strategies.coin_flip_trader.base.DWX_ZMQ_Strategy import DWX_ZMQ_Strategy
+from python.modules.DWX_ZMQ_Timer_Wheel import DWX_ZMQ_Timer_Wheel
+from python.modules.DWX_ZMQ_PnL_Engine import DWX_ZMQ_PnL_Engine
+from python.modules.DWX_ZMQ_Risk_Gate import DWX_ZMQ_Risk_Gate
+from python.modules.DWX_ZMQ_Dashboard import DWX_ZMQ_Dashboard_Feed, DWX_ZMQ_Dashboard
 
-from pandas import Timedelta, to_datetime
-from threading import Thread, Lock
+from datetime import datetime, timedelta, timezone
+from queue import Queue, Empty
+from threading import Thread, Lock, Event
 from time import sleep
 import random
 
@@ -66,12 +80,17 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
                  _verbose=False, 
                  
                  _max_trades=1,
-                 _close_t_delta=5):
+                 _close_t_delta=5,
+                 _dashboard=False,                  # live price / P&L plots
+                 _risk_limits=None,                 # DWX_ZMQ_Risk_Gate limits, e.g.
+                                                    # {'_max_open_trades': 20}
+                 _zmq=None):                        # Connector to use (default: a new one)
         
         super().__init__(_name,
                          _symbols,
                          _broker_gmt,
-                         _verbose)
+                         _verbose,
+                         _zmq=_zmq)
         
         # This strategy's variables
         self._traders = []
@@ -84,9 +103,34 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
         # lock for acquire/release of ZeroMQ connector
         self._lock = Lock()
         
+        # Trade expiry: one timer per open ticket instead of scanning every
+        # open trade on every cycle. Due tickets land in their trader's queue
+        # and wake the trader up.
+        self._wheel = DWX_ZMQ_Timer_Wheel()
+        self._expired = {_symbol[0]: Queue() for _symbol in self._symbols}
+        self._timed = {_symbol[0]: set() for _symbol in self._symbols}
+        self._wake = {_symbol[0]: Event() for _symbol in self._symbols}
+        
+        # Open P&L of every position, repriced on each tick
+        self._pnl = DWX_ZMQ_PnL_Engine(self._zmq)
+        
+        # Account-wide pre-trade checks on every OPEN (refused OPENs are
+        # never sent, the traders simply carry on)
+        self._gate = None
+        
+        if _risk_limits:
+            self._gate = DWX_ZMQ_Risk_Gate(self._zmq, **_risk_limits)
+        
+        # Plots are drawn by another process, fed off the trading threads
+        self._feed = None
+        
+        if _dashboard:
+            self._feed = DWX_ZMQ_Dashboard_Feed(self._zmq, self._pnl)
+            DWX_ZMQ_Dashboard._spawn_(_symbols=[_s[0] for _s in _symbols])
+        
     ##########################################################################
     
-    def _run_(self):
+    def _run_(self, _updates=True):
         
         """
         Logic:
@@ -114,6 +158,10 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
             
             self._traders.append(_t)
         
+        # One line of live updates per process is plenty
+        if not _updates:
+            return
+        
         print('\n\n+--------------+\n+ LIVE UPDATES +\n+--------------+\n')
         
         # _verbose can print too much information.. so let's start a thread
@@ -129,17 +177,11 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
     
     def _updater_(self, _delay=0.1):
         
+        # Reads only: never holds up the traders by taking self._lock
         while self._market_open:
             
-            try:
-                # Acquire lock
-                self._lock.acquire()
-                
-                print('\r{}'.format(str(self._zmq._get_response_())), end='', flush=True)
-                
-            finally:
-                # Release lock
-                self._lock.release()
+            print('\r{} | Open P&L: {:.2f}'.format(str(self._zmq._get_response_()),
+                                                   self._pnl._account_pnl_()), end='', flush=True)
         
             sleep(self._delay)
             
@@ -174,68 +216,152 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
                 
                 # Acquire lock
                 self._lock.acquire()
-            
-                #############################
-                # SECTION - GET OPEN TRADES #
-                #############################
-                
-                _ot = self._reporting._get_open_trades_('{}_Trader'.format(_symbol[0]),
-                                                        self._delay,
-                                                        10)
                 
-                # Reset cycle if nothing received
-                if self._zmq._valid_response_(_ot) == False:
-                    continue
-                
-                ###############################
-                # SECTION - CLOSE OPEN TRADES #
-                ###############################
-                
-                for i in _ot.index:
-                    
-                    if abs((Timedelta((to_datetime('now') + Timedelta(self._broker_gmt,'h')) - to_datetime(_ot.at[i,'_open_time'])).total_seconds())) > self._close_t_delta:
-                        
-                        _ret = self._execution._execute_({'_action': 'CLOSE',
-                                                          '_ticket': i,
-                                                          '_comment': '{}_Trader'.format(_symbol[0])},
-                                                          self._verbose,
-                                                          self._delay,
-                                                          10)
-                       
-                        # Reset cycle if nothing received
-                        if self._zmq._valid_response_(_ret) == False:
-                            break
-                        
-                        # Sleep between commands to MetaTrader
-                        sleep(self._delay)
-                
-                ##############################
-                # SECTION - OPEN MORE TRADES #
-                ##############################
-                
-                if _ot.shape[0] < _max_trades:
-                    
-                    # Randomly generate 1 (OP_BUY) or 0 (OP_SELL)
-                    # using random.getrandbits()
-                    _default_order['_type'] = random.getrandbits(1)
-                    
-                    # Send instruction to MetaTrader
-                    _ret = self._execution._execute_(_default_order,
-                                                     self._verbose,
-                                                     self._delay,
-                                                     10)
-                  
-                    # Reset cycle if nothing received
-                    if self._zmq._valid_response_(_ret) == False:
-                        break
+                _cycle = self._trader_step_(_symbol, _max_trades, _default_order)
                 
             finally:
                 
                 # Release lock
                 self._lock.release()
             
-            # Sleep between cycles
+            # Nothing received: stop, or retry straight away
+            if _cycle is False:
+                break
+            
+            if _cycle is None:
+                continue
+            
+            # Sleep between cycles, waking early if a trade expires
+            self._wake[_symbol[0]].wait(self._delay)
+            self._wake[_symbol[0]].clear()
+            
+    ##########################################################################
+    
+    """
+    One trading cycle for _symbol, called with self._lock held. Returns
+    True when the cycle completed, None to retry at once (no reply
+    received) and False to stop the trader (OPEN not confirmed).
+    """
+    def _trader_step_(self, _symbol, _max_trades, _default_order):
+        
+        ###############################
+        # SECTION - CLOSE OPEN TRADES #
+        ###############################
+        
+        # Close whatever the timer wheel reported as due, straight away
+        while True:
+            
+            try:
+                _ticket = self._expired[_symbol[0]].get_nowait()
+            except Empty:
+                break
+            
+            _ret = self._execution._execute_({'_action': 'CLOSE',
+                                              '_ticket': _ticket,
+                                              '_comment': '{}_Trader'.format(_symbol[0])},
+                                              self._verbose,
+                                              self._delay,
+                                              10)
+           
+            # Nothing received: try again _close_t_delta later. If it was
+            # closed meanwhile (SL/TP, by hand), the open trades report
+            # below no longer lists it and _sync_timers_ cancels the retry.
+            if self._zmq._valid_response_(_ret) == False:
+                self._arm_timer_(_symbol[0], _ticket, self._close_t_delta)
+                continue
+            
+            self._timed[_symbol[0]].discard(_ticket)
+            self._pnl._remove_(_ticket)
+            
+            # Sleep between commands to MetaTrader
             sleep(self._delay)
+        
+        #############################
+        # SECTION - GET OPEN TRADES #
+        #############################
+        
+        _ot = self._reporting._get_open_trades_('{}_Trader'.format(_symbol[0]),
+                                                self._delay,
+                                                10)
+        
+        # Reset cycle if nothing received
+        if self._zmq._valid_response_(_ot) == False:
+            return None
+        
+        # Arm timers for tickets we haven't seen yet (e.g. opened
+        # before a restart) and drop those closed by SL/TP
+        self._sync_timers_(_symbol[0], _ot)
+        
+        ##############################
+        # SECTION - OPEN MORE TRADES #
+        ##############################
+        
+        if _ot.shape[0] < _max_trades:
+            
+            # Randomly generate 1 (OP_BUY) or 0 (OP_SELL)
+            # using random.getrandbits()
+            _default_order['_type'] = random.getrandbits(1)
+            
+            # Send instruction to MetaTrader
+            _ret = self._execution._execute_(_default_order,
+                                             self._verbose,
+                                             self._delay,
+                                             10)
+          
+            # Refused by the risk gate (nothing sent): carry on
+            if _ret is None and self._execution._rejection is not None:
+                return True
+            
+            # Reset cycle if nothing received
+            if self._zmq._valid_response_(_ret) == False:
+                return False
+            
+            # Order confirmed: arm its expiry and track its P&L
+            if '_ticket' in _ret:
+                self._arm_timer_(_symbol[0], _ret['_ticket'], self._close_t_delta)
+                self._pnl._add_(_ret['_ticket'], _symbol[0], _default_order['_type'],
+                                _symbol[1], _ret['_open_price'], _ret['_magic'],
+                                _default_order['_comment'])
+        
+        return True
+            
+    ##########################################################################
+    
+    def _arm_timer_(self, _symbol, _ticket, _delay):
+        
+        self._timed[_symbol].add(_ticket)
+        self._wheel._schedule_(_ticket, _delay, self._expire_, _symbol, _ticket)
+        
+    ##########################################################################
+    
+    # Timer wheel thread: hand the ticket to its trader and wake it up
+    def _expire_(self, _symbol, _ticket):
+        
+        self._expired[_symbol].put(_ticket)
+        self._wake[_symbol].set()
+        
+    ##########################################################################
+    
+    def _sync_timers_(self, _symbol, _ot):
+        
+        _open = set(_ot.index)
+        
+        # Closed by SL/TP (or by hand): cancel their timers
+        for _ticket in self._timed[_symbol] - _open:
+            self._wheel._cancel_(_ticket)
+            self._timed[_symbol].discard(_ticket)
+            self._pnl._remove_(_ticket)
+        
+        # Unknown tickets: expire relative to their broker-time open time
+        _now = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=self._broker_gmt)
+        
+        for _ticket in _open - self._timed[_symbol]:
+            
+            _age = (_now - datetime.strptime(_ot.at[_ticket,'_open_time'], '%Y.%m.%d %H:%M:%S')).total_seconds()
+            self._arm_timer_(_symbol, _ticket, max(self._close_t_delta - abs(_age), 0))
+            self._pnl._add_(_ticket, _symbol, _ot.at[_ticket,'_type'], _ot.at[_ticket,'_lots'],
+                            _ot.at[_ticket,'_open_price'], _ot.at[_ticket,'_magic'],
+                            _ot.at[_ticket,'_comment'])
             
     ##########################################################################
     
@@ -251,15 +377,44 @@ class coin_flip_traders(DWX_ZMQ_Strategy):
             
             print('\n[{}] .. and that\'s a wrap! Time to head home.\n'.format(_t.getName()))
         
-        # Kill the updater too        
-        self._updater_.join()
+        # Kill the updater, the timer wheel and the P&L engine too
+        if isinstance(self._updater_, Thread):
+            self._updater_.join()
+            print('\n\n{} .. wait for me.... I\'m going home too! xD\n'.format(self._updater_.getName()))
+        
+        self._wheel._stop_()
+        self._pnl._stop_()
         
-        print('\n\n{} .. wait for me.... I\'m going home too! xD\n'.format(self._updater_.getName()))
+        if self._feed is not None:
+            self._feed._stop_()
+        
+        if self._gate is not None:
+            self._gate._stop_()
         
         # Send mass close instruction to MetaTrader in case anything's left.
         self._zmq._DWX_MTX_CLOSE_ALL_TRADES_()
         
+        # Hand a shared connector back to the manager
+        self._release_()
+        
     ##########################################################################
 
-a=coin_flip_traders()
-a._run_()
\ No newline at end of file
+"""
+Trader process for DWX_ZMQ_Process_Runner: one symbol's coin flip trader,
+trading through the process's DWX_ZMQ_Remote_Connector until _stop is set
+(pass _risk_limits to the runner, which gates every trader's OPENs)
+"""
+def _coin_flip_trader_(_zmq, _symbol, _stop):
+    
+    _traders = coin_flip_traders(_symbols=[_symbol], _zmq=_zmq)
+    _traders._run_(_updates=False)
+    
+    _stop.wait()
+    _traders._stop_()
+
+##############################################################################
+
+if __name__ == '__main__':
+    
+    a=coin_flip_traders()
+    a._run_()
@@ -205,7 +205,7 @@ class scalper_trader(DWX_ZMQ_Strategy):
                         
                         #Getting current price
                         Temp_CurrBidAsk = self._zmq._Market_Data_DB['EURUSD'].items()
-                        CurrBidAsk = list(Temp_CurrBidAsk)[-1][1]
+                        CurrBidAsk = Temp_CurrBidAsk[-1][1]
                         newstimepricehigh = (CurrBidAsk[0] + CurrBidAsk[1])/2 + 0.0012
                         newstimepricelow = newstimepricehigh - 0.0024
                         
@@ -240,8 +240,8 @@ class scalper_trader(DWX_ZMQ_Strategy):
                     
                 elif currenttime > newstime:
                     Temp_CurrBidAsk2 = self._zmq._Market_Data_DB['EURUSD'].items()                    
-                    CurrBidAsk2 = list(Temp_CurrBidAsk2)[-1][1]
-                    CurrBidAsk3 = list(Temp_CurrBidAsk2)[-2][1]
+                    CurrBidAsk2 = Temp_CurrBidAsk2[-1][1]
+                    CurrBidAsk3 = Temp_CurrBidAsk2[-2][1]
                     currentprice = (CurrBidAsk2[0] + CurrBidAsk2[1])/2
                     previousprice = (CurrBidAsk3[0] + CurrBidAsk3[1])/2
                     
@@ -207,7 +207,7 @@ class scalper_trader(DWX_ZMQ_Strategy):
                     try:                        
                         #Getting current price
                         Temp_CurrBidAsk = self._zmq._Market_Data_DB[_symbol[0]].items()
-                        CurrBidAsk = list(Temp_CurrBidAsk)[-1][1]
+                        CurrBidAsk = Temp_CurrBidAsk[-1][1]
                         newstimepricehigh = (CurrBidAsk[0] + CurrBidAsk[1])/2 + 0.0012
                         newstimepricelow = newstimepricehigh - 0.0024
                         
@@ -246,8 +246,8 @@ class scalper_trader(DWX_ZMQ_Strategy):
                 elif currenttime > newstime:
                     try:
                         Temp_CurrBidAsk2 = self._zmq._Market_Data_DB[_symbol[0]].items()                    
-                        CurrBidAsk2 = list(Temp_CurrBidAsk2)[-1][1]
-                        CurrBidAsk3 = list(Temp_CurrBidAsk2)[-10][1]
+                        CurrBidAsk2 = Temp_CurrBidAsk2[-1][1]
+                        CurrBidAsk3 = Temp_CurrBidAsk2[-10][1]
                         currentprice = (CurrBidAsk2[0] + CurrBidAsk2[1])/2
                         previousprice = (CurrBidAsk3[0] + CurrBidAsk3[1])/2
                     except:
@@ -323,6 +323,9 @@ class scalper_trader(DWX_ZMQ_Strategy):
         # Send mass close instruction to MetaTrader in case anything's left.
         self._zmq._DWX_MTX_CLOSE_ALL_TRADES_()
         
+        # Hand a shared connector back to the manager
+        self._release_()
+        
     ##########################################################################
 
 
@@ -38,14 +38,41 @@ class DWX_ZMQ_Strategy(object):
                            ('STOXX50E',0.10),
                            ('XAUUSD',0.01)],
                  _broker_gmt=3,                 # Darwinex GMT offset
-                 _verbose=False):               # Print ZeroMQ messages
+                 _verbose=False,                # Print ZeroMQ messages
+                 _manager=None,                 # DWX_ZMQ_Connection_Manager (optional)
+                 _terminal=None,                # Terminal name in _manager
+                 _busy_poll=False,              # Connector low latency mode
+                 _poll_cpus=None,               # CPUs for the connector's poll thread
+                 _poll_priority=None):          # Poll thread nice value
                  
         self._name = _name
         self._symbols = _symbols
         self._broker_gmt = _broker_gmt
+        self._manager = _manager
         
-        # Not entirely necessary here.
-        self._zmq = DWX_ZeroMQ_Connector(_verbose=_verbose)
+        # Share one socket set per terminal when a manager is given,
+        # otherwise open a private connector as before.
+        if _manager is not None:
+
+            # The shared connector is set up by the manager, for all its users
+            if _busy_poll or _poll_cpus is not None or _poll_priority is not None:
+                raise ValueError("[{}] _busy_poll/_poll_cpus/_poll_priority can't be "
+                                 "combined with _manager".format(_name))
+
+            # One connector trades every symbol: they must share a terminal
+            _routes = {_manager._route_(_terminal, _symbol=_s[0]) for _s in _symbols}
+
+            if len(_routes) > 1:
+                raise ValueError("[{}] Symbols route to several terminals ({}), "
+                                 "run one strategy per terminal".format(_name, ', '.join(sorted(_routes))))
+
+            self._zmq = _manager._acquire_(_terminal=_terminal,
+                                           _symbol=_symbols[0][0])
+        else:
+            self._zmq = DWX_ZeroMQ_Connector(_verbose=_verbose,
+                                             _busy_poll=_busy_poll,
+                                             _poll_cpus=_poll_cpus,
+                                             _poll_priority=_poll_priority)
         
         # Modules
         self._execution = DWX_ZMQ_Execution(self._zmq)
@@ -60,3 +87,15 @@ class DWX_ZMQ_Strategy(object):
         """
          
     ##########################################################################
+    
+    def _release_(self):
+        
+        """
+        Give a connector acquired from _manager back (its sockets are shut
+        down with its last user). Called at the end of _stop_().
+        """
+        if self._manager is not None:
+            self._manager._release_(self._zmq)
+            self._manager = None
+        
+    ##########################################################################
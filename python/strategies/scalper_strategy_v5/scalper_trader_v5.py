@@ -43,10 +43,16 @@
 #############################################################################
 
 from python.strategies.scalper_strategy_v5.base.DWX_ZMQ_Strategy import DWX_ZMQ_Strategy
+from python.api.DWX_ZeroMQ_Connector_v2_0_1_RC8 import _DWX_ZMQ_PIN_THREAD_
+from python.modules.DWX_ZMQ_Command_Scheduler import DWX_ZMQ_Command_Scheduler
+from python.modules.DWX_ZMQ_News_Calendar import (DWX_ZMQ_News_Calendar,
+                                                  DWX_ZMQ_News_Scheduler,
+                                                  PRE_EVENT, EVENT, EXIT)
+from python.modules.DWX_ZMQ_Straddle_Evaluator import DWX_ZMQ_Straddle_Evaluator, IDLE
+from python.modules.DWX_ZMQ_State_Snapshot import DWX_ZMQ_State_Snapshot
 
-from pandas import Timedelta
 from threading import Thread, Lock
-from time import sleep
+from time import sleep, time
 from datetime import datetime
 
 
@@ -58,12 +64,52 @@ class scalper_trader(DWX_ZMQ_Strategy):
                  _broker_gmt=3,
                  _verbose=False, 
                  _max_trades=2,
-                 _close_t_delta=5):
+                 _close_t_delta=5,
+                 _max_commands_per_sec=10,
+                 _calendar=None,                         # DWX_ZMQ_News_Calendar or CSV/JSON path
+                 _newstime=datetime(2020,5,16,14,49),    # used if no _calendar given
+                 _b_height=0.0012,                       # barrier height, 12 pips
+                 _pre_event=120,                         # place straddle 2 mins before news
+                 _post_event=300,                        # close straddle 5 mins after news
+                 _time_buffer=60,                        # latest placement after PRE_EVENT (s)
+                 _trail_interval=0.1,                    # seconds between trailing evaluations
+                 _snapshot_path=None,                    # straddle state file (default: <_name>.state.npy)
+                 _busy_poll=False,                       # low latency: spinning poll, trail on tick
+                 _poll_cpus=None,                        # CPUs for the connector's poll thread
+                 _trader_cpus=None,                      # CPUs for the trader / evaluator threads
+                 _priority=None):                        # nice value for all of them (e.g. -10)
         
         super().__init__(_name,
                          _symbols,
                          _broker_gmt,
-                         _verbose)
+                         _verbose,
+                         _busy_poll=_busy_poll,
+                         _poll_cpus=_poll_cpus,
+                         _poll_priority=_priority)
+        
+        # Trailing stops fire a MODIFY on every new extreme: queue them so
+        # only the latest SL/TP per ticket is sent, CLOSEs go first and the
+        # broker rate limit is respected.
+        self._scheduler = DWX_ZMQ_Command_Scheduler(self._zmq,
+                                                    _max_rate=_max_commands_per_sec)
+        
+        # Straddle state is memory-mapped to disk as it changes, so a
+        # restarted process picks up its orders instead of placing more.
+        if _snapshot_path is None:
+            _snapshot_path = '{}.state.npy'.format(_name)
+        
+        self._snapshot = DWX_ZMQ_State_Snapshot(_snapshot_path,
+                                                [_s[0] for _s in _symbols])
+        
+        # Trailing for every symbol is evaluated from ticks in one vectorised
+        # pass, so watching 100 instruments costs about the same as one.
+        self._evaluator = DWX_ZMQ_Straddle_Evaluator(self._zmq,
+                                                     [_s[0] for _s in _symbols],
+                                                     _interval=_trail_interval,
+                                                     _snapshot=self._snapshot,
+                                                     _wake_on_tick=_busy_poll,
+                                                     _cpus=_trader_cpus,
+                                                     _priority=_priority)
         
         # This strategy's variables
         self._traders = []
@@ -73,6 +119,21 @@ class scalper_trader(DWX_ZMQ_Strategy):
         self._close_t_delta = _close_t_delta
         self._delay = _delay
         self._verbose = _verbose
+        self._b_height = _b_height
+        self._time_buffer = _time_buffer
+        self._trader_cpus = _trader_cpus
+        self._priority = _priority
+        
+        # News events: one scheduler thread wakes only the affected traders
+        if _calendar is None:
+            _calendar = DWX_ZMQ_News_Calendar._from_newstime_(_newstime,
+                                                              [_s[0] for _s in _symbols])
+        elif isinstance(_calendar, str):
+            _calendar = DWX_ZMQ_News_Calendar._from_file_(_calendar)
+            
+        self._news = DWX_ZMQ_News_Scheduler(_calendar, _pre_event, _post_event)
+        self._pre_event = _pre_event
+        self._post_event = _post_event
         
         # lock for acquire/release of ZeroMQ connector
         self._lock = Lock()
@@ -94,6 +155,9 @@ class scalper_trader(DWX_ZMQ_Strategy):
                 6) SL/TP = 10 pips each
         """
         
+        # Pick up straddles left by a previous run before trading
+        self._restore_()
+        
         # Launch traders!
         for _symbol in self._symbols:
             
@@ -122,17 +186,10 @@ class scalper_trader(DWX_ZMQ_Strategy):
     
     def _updater_(self, _delay=0.1):
         
+        # Reads only: never holds up the traders by taking self._lock
         while self._market_open:
             
-            try:
-                # Acquire lock
-                self._lock.acquire()
-                
-                print('\r{}'.format(str(self._zmq._get_response_())), end='', flush=True)
-                
-            finally:
-                # Release lock
-                self._lock.release()
+            print('\r{}'.format(str(self._zmq._get_response_())), end='', flush=True)
         
             sleep(self._delay)
             
@@ -140,11 +197,11 @@ class scalper_trader(DWX_ZMQ_Strategy):
     
     def _trader_(self, _symbol, _max_trades):
         
-        # newstime to be edited
-        newstime = datetime(2020,5,16,14,49)
+        if self._trader_cpus is not None or self._priority is not None:
+            _DWX_ZMQ_PIN_THREAD_(self._trader_cpus, self._priority, _symbol[0] + '_Trader')
         
         # barrier height is adjustable, set to 12 pips by default
-        b_height = 0.0012
+        b_height = self._b_height
         
         # Note: Just for this example, only the Order Type is dynamic.
         
@@ -185,138 +242,242 @@ class scalper_trader(DWX_ZMQ_Strategy):
             
         self._zmq._DWX_MTX_SUBSCRIBE_MARKETDATA_(_symbol=_symbol[0])
         
-        newstimepricehigh = None
-        newstimepricelow = None
-        buystopticket = None
-        sellstopticket = None
-        value_sell = None
-        value_buy = None
+        # Only this symbol's news boundaries wake this trader up
+        self._news._register_(_symbol[0])
         
-        #instantiate a price list for the trailing stop
-        pricelist = []
+        # Straddle state for the current event (None = no straddle),
+        # restored from the snapshot after a restart
+        _state = self._restored_state_(_symbol[0])
         
         while self._market_open:
-                try:
-                    # Acquire Lock
-                    self._lock.acquire()
-                    
-                    print("Entering the Lock, ", _symbol[0])
+            
+            # Sleep until the next PRE_EVENT / EVENT / EXIT boundary (the
+            # evaluator trails the stops in between)
+            _wake = self._news._wait_(_symbol[0], 1)
+            
+            if _wake is None:
+                continue
+            
+            _phase, _event = _wake
+            
+            # Whether the live straddle (if any) is this event's
+            _own = _state is not None and _state['eventtime'] == _event['_time']
+            
+            if _phase == PRE_EVENT:
+                
+                # Already placed before a restart
+                if _own:
+                    print("[{}] {} straddle restored".format(_symbol[0], _event['_title']))
+                    continue
+                
+                # An earlier event's straddle is still out: it keeps the
+                # symbol until its own EXIT
+                if _state is not None:
+                    print("[{}] {} skipped, straddle still out".format(_symbol[0], _event['_title']))
+                    continue
+                
+                print("[{}] {} in {}s, placing straddle".format(_symbol[0], _event['_title'], self._pre_event))
+                
+                # Too late to place it safely (e.g. restarted mid-window)
+                if time() - (_event['_time'] - self._pre_event) > self._time_buffer:
+                    continue
                 
-                    newstimeminus2 = newstime - Timedelta(minutes=2)
-                    currenttime = datetime.now()
-                    timedifftoorder = currenttime - newstimeminus2
-                    time_buffer = 60
-                    fiveminsbuffer = newstime + Timedelta(minutes=5)
+                _placed = self._place_straddle_(_symbol, _default_order_1, _default_order_2)
                 
-                    _ot = self._reporting._get_open_trades_('{}_Trader'.format(_symbol[0]),self._delay,10)
+                if _placed is not None:
+                    _state = _placed
+                    _state['eventtime'] = _event['_time']
                     
-                    # Reset cycle if nothing received
-                    if self._zmq._valid_response_(_ot) == False:
-                        continue
+                    self._snapshot._set_(_symbol[0], _event_time=_event['_time'])
+                    self._evaluator._arm_(_symbol[0],
+                                          _state['buystopticket'],
+                                          _state['sellstopticket'],
+                                          _state['newstimepricehigh'],
+                                          _state['newstimepricelow'],
+                                          b_height)
+                    self._snapshot._flush_()
+                
+            elif _phase == EVENT:
+                print("[{}] {} is out, trailing".format(_symbol[0], _event['_title']))
+                
+                if _own:
+                    self._evaluator._trail_(_symbol[0])
+                    self._snapshot._flush_()
+                
+            elif _phase == EXIT:
+                print("[{}] {} over, closing straddle".format(_symbol[0], _event['_title']))
+                
+                if _own:
+                    self._evaluator._disarm_(_symbol[0])
+                    self._close_straddle_(_state)
+                    self._snapshot._clear_(_symbol[0])
+                    self._snapshot._flush_()
                     
-                    #If there are zero orders and the current time is 2 minutes from news time
-                    if _ot.shape[0] == 0 and 0 < timedifftoorder.total_seconds() < time_buffer:
-                        print("zero orders and before newstime")
-                        try:
-                            
-                            #Getting current price
-                            CurrBidAsk = self._zmq._Curr_Bid_Ask[_symbol[0]]
-                            newstimepricehigh = (CurrBidAsk[0] + CurrBidAsk[1])/2 + b_height
-                            newstimepricelow = newstimepricehigh - 2*b_height
-                            
-                            #setting price for order form 1
-                            _default_order_1['_price'] = newstimepricehigh
-                            
-                            #set buy stop using order form 1
-                            _ret = self._execution._execute_(_default_order_1,
-                                                             self._verbose,
-                                                             self._delay,
-                                                             10)
+                    _state = None
     
-                            #setting price for order form 2
-                            _default_order_2['_price'] = newstimepricelow
-                             
-                            
-                            #set sell stop using order form 2
-                            _retto = self._execution._execute_(_default_order_2,
-                                                             self._verbose,
-                                                             self._delay,
-                                                             10)
-                            
-                            #get ticket for this buy stop
-                            buystopticket = _ret['_ticket'] 
-                            
-                            #get ticket for the sell stop
-                            sellstopticket = _retto['_ticket']
-                            newstimeprice=(newstimepricehigh+newstimepricelow)/2
-                            pricelist.append(newstimeprice)
-                            
-                        
-                        except:     
-                            continue
-                        
-                        
-                    elif currenttime > newstime:
-                        print("currenttime > newstime")
-                        try:
-                            #Temp_CurrBidAsk2 = self._zmq._Market_Data_DB[_symbol[0]].items()                    
-                            CurrBidAsk2 = self._zmq._Curr_Bid_Ask[_symbol[0]]
-                            currentprice = (CurrBidAsk2[0] + CurrBidAsk2[1])/2
-                            pricelist.append(currentprice)
-                        
-                        except:
-                            continue
+    ##########################################################################
     
-                            
-                        if currentprice < newstimepricelow:
-                            if len(pricelist)>=2 and pricelist[-1] == min(pricelist):
-                                try:
-                                    value_sell = round(((currentprice - (newstimepricelow-0.0012))*100000),2)
-                                    self._zmq._DWX_MTX_MODIFY_TRADE_BY_TICKET_(sellstopticket,value_sell,10000)
-                                except:
-                                    pass
-                                
-                            try:
-                                self._zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(buystopticket)
-                            except:
-                                pass                         
-                            
-                            
-                            continue
-                            
-                        elif currentprice > newstimepricehigh:
-                            if len(pricelist)>=2 and pricelist[-1] == max(pricelist):
-                                try:
-                                    value_buy = round(((newstimepricehigh - (currentprice - 0.0012))*100000),2)
-                                    self._zmq._DWX_MTX_MODIFY_TRADE_BY_TICKET_(buystopticket,value_buy,10000)
-                                except:
-                                    pass
-                                
-                            try:
-                                self._zmq._DWX_MTX_CLOSE_TRADE_BY_TICKET_(sellstopticket)
-                            except:
-                                pass
-                            
-                            continue
-                            
-                        
-                        elif currenttime > fiveminsbuffer:
-                            self._zmq._DWX_MTX_CLOSE_ALL_TRADES_()
-                            break
-                        
-                        else:
-                            continue
-                                                    
-                    else:                    
-                        continue
+    def _place_straddle_(self, _symbol, _default_order_1, _default_order_2):
+        
+        b_height = self._b_height
+        
+        try:
+            # Acquire Lock
+            self._lock.acquire()
+            
+            _ot = self._reporting._get_open_trades_('{}_Trader'.format(_symbol[0]),self._delay,10)
+            
+            # Nothing received, or this trader already has orders out
+            if self._zmq._valid_response_(_ot) == False or _ot.shape[0] > 0:
+                return None
+            
+            #Getting current price
+            CurrBidAsk = self._zmq._Curr_Bid_Ask.get(_symbol[0])
+            
+            # No quote yet
+            if CurrBidAsk is None:
+                return None
+            
+            newstimepricehigh = (CurrBidAsk[0] + CurrBidAsk[1])/2 + b_height
+            newstimepricelow = newstimepricehigh - 2*b_height
+            
+            #setting price for order form 1
+            _default_order_1['_price'] = newstimepricehigh
+            
+            #set buy stop using order form 1
+            _ret = self._execution._execute_(_default_order_1,
+                                             self._verbose,
+                                             self._delay,
+                                             10)
+            
+            # Not placed (no reply, refused or rejected by the terminal)
+            if _ret is None or '_ticket' not in _ret:
+                return None
+            
+            #setting price for order form 2
+            _default_order_2['_price'] = newstimepricelow
+            
+            #set sell stop using order form 2
+            _retto = self._execution._execute_(_default_order_2,
+                                               self._verbose,
+                                               self._delay,
+                                               10)
+            
+            # Never leave half a straddle out: take the buy stop back
+            if _retto is None or '_ticket' not in _retto:
                 
-                finally:
+                _ret_close = self._execution._execute_({'_action': 'CLOSE',
+                                                        '_ticket': _ret['_ticket'],
+                                                        '_comment': _default_order_1['_comment']},
+                                                        self._verbose,
+                                                        self._delay,
+                                                        10)
                 
-                    # Release lock
-                    self._lock.release()
+                if _ret_close is None:
+                    print("[{}] Sell stop not placed, buy stop {} may still be out".format(_symbol[0], _ret['_ticket']))
                 
-                # delay cycle
-                sleep(1)
+                return None
+            
+            #get tickets for the buy stop and the sell stop
+            return {'buystopticket': _ret['_ticket'],
+                    'sellstopticket': _retto['_ticket'],
+                    'newstimepricehigh': newstimepricehigh,
+                    'newstimepricelow': newstimepricelow}
+            
+        finally:
+            # Release lock
+            self._lock.release()
+    
+    ##########################################################################
+    
+    """
+    Reconcile straddles found in the snapshot with the terminal, using a
+    single open trades report for all symbols: legs no longer open are
+    marked closed, straddles with nothing left open (or whose event is
+    over) are dropped.
+    """
+    def _restore_(self):
+        
+        _restored = [_s for _s in self._snapshot._symbols
+                     if self._snapshot._get_(_s)['_state'] != IDLE]
+        
+        if not _restored:
+            return
+        
+        try:
+            self._lock.acquire()
+            
+            _ot = self._reporting._get_open_trades_(None, self._delay, 10)
+            
+            # No report: keep the snapshot as it is
+            if self._zmq._valid_response_(_ot) == False:
+                print("[KERNEL] No open trades report, {} straddle(s) restored unreconciled".format(len(_restored)))
+                return
+            
+            _open = set(_ot.index)
+            
+        finally:
+            self._lock.release()
+        
+        for _symbol in _restored:
+            
+            _record = self._snapshot._get_(_symbol)
+            
+            _buy_open = _record['_buy'] in _open
+            _sell_open = _record['_sell'] in _open
+            
+            _over = time() > _record['_event_time'] + self._post_event
+            
+            if _over and (_buy_open or _sell_open):
+                self._close_straddle_(self._restored_state_(_symbol))
+            
+            if _over or not (_buy_open or _sell_open):
+                self._snapshot._clear_(_symbol)
+                continue
+            
+            self._snapshot._set_(_symbol,
+                                 _buy_closed=not _buy_open,
+                                 _sell_closed=not _sell_open)
+            
+            print("[{}] Restored straddle {}/{}".format(_symbol, _record['_buy'], _record['_sell']))
+        
+        self._snapshot._flush_()
+    
+    ##########################################################################
+    
+    def _restored_state_(self, _symbol):
+        
+        _record = self._snapshot._get_(_symbol)
+        
+        if _record['_state'] == IDLE:
+            return None
+        
+        return {'buystopticket': _record['_buy'],
+                'sellstopticket': _record['_sell'],
+                'newstimepricehigh': _record['_high'],
+                'newstimepricelow': _record['_low'],
+                'eventtime': _record['_event_time']}
+    
+    ##########################################################################
+    
+    def _close_straddle_(self, _state):
+        
+        # Only this trader's tickets - other symbols may be mid-event
+        try:
+            self._lock.acquire()
+            
+            _ret = self._execution._execute_commands_([('CLOSE', _state['buystopticket'], 0, 0),
+                                                       ('CLOSE', _state['sellstopticket'], 0, 0)],
+                                                      self._verbose,
+                                                      self._delay,
+                                                      10)
+            
+            if _ret is None:
+                print("[KERNEL] No reply closing straddle {}/{}".format(_state['buystopticket'],
+                                                                      _state['sellstopticket']))
+            
+        finally:
+            self._lock.release()
 
     ##########################################################################  
     def _stop_(self):
@@ -331,16 +492,22 @@ class scalper_trader(DWX_ZMQ_Strategy):
             
             print('\n[{}] .. and that\'s a wrap! Time to head home.\n'.format(_t.getName()))
         
-        # Kill the updater too        
+        # Kill the updater, the news scheduler and the evaluator too
         self._updater_.join()
+        self._news._stop_()
+        self._evaluator._stop_()
         
         print('\n\n{} .. wait for me.... I\'m going home too! xD\n'.format(self._updater_.getName()))
         
         # Send mass close instruction to MetaTrader in case anything's left.
         self._zmq._DWX_MTX_CLOSE_ALL_TRADES_()
         
+        # Hand a shared connector back to the manager
+        self._release_()
+        
     ##########################################################################
 
-
-a = scalper_trader()
-a._run_()
\ No newline at end of file
+if __name__ == '__main__':
+    
+    a = scalper_trader()
+    a._run_()